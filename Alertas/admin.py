@@ -3,7 +3,13 @@ from django.contrib import admin
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import Alerta, ConfiguracionAlerta, HistorialAlerta
+from .models import (
+    Alerta,
+    ConfiguracionAlerta,
+    HistorialAlerta,
+    PerfilConfiguracionAlerta,
+)
+from comun.models import VersionTabla
 
 
 @admin.register(Alerta)
@@ -86,6 +92,7 @@ class AlertaAdmin(admin.ModelAdmin):
 
     def marcar_como_leidas(self, request, queryset):
         updated = queryset.update(estado="LEIDA", fecha_lectura=timezone.now())
+        VersionTabla.incrementar("alertas")
         self.message_user(request, f"{updated} alertas marcadas como leídas.")
 
     marcar_como_leidas.short_description = "Marcar como leídas"
@@ -94,6 +101,7 @@ class AlertaAdmin(admin.ModelAdmin):
         updated = queryset.update(
             estado="ATENDIDA", fecha_atencion=timezone.now(), activa=False
         )
+        VersionTabla.incrementar("alertas")
         self.message_user(request, f"{updated} alertas marcadas como atendidas.")
 
     marcar_como_atendidas.short_description = "Marcar como atendidas"
@@ -102,6 +110,7 @@ class AlertaAdmin(admin.ModelAdmin):
         updated = queryset.update(
             estado="DESCARTADA", fecha_resolucion=timezone.now(), activa=False
         )
+        VersionTabla.incrementar("alertas")
         self.message_user(request, f"{updated} alertas descartadas.")
 
     descartar_alertas.short_description = "Descartar alertas"
@@ -148,6 +157,26 @@ class ConfiguracionAlertaAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+@admin.register(PerfilConfiguracionAlerta)
+class PerfilConfiguracionAlertaAdmin(admin.ModelAdmin):
+    list_display = ["nombre", "version", "en_uso", "fecha_creacion", "fecha_aplicacion"]
+    list_filter = ["en_uso", "nombre"]
+    readonly_fields = ["en_uso", "fecha_creacion", "fecha_aplicacion"]
+    actions = ["aplicar_perfil"]
+
+    def aplicar_perfil(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, "Seleccione un único perfil para aplicar.")
+            return
+        perfil = queryset.get()
+        actualizadas = perfil.aplicar(request.user)
+        self.message_user(
+            request, f"Perfil {perfil} aplicado a {actualizadas} configuraciones."
+        )
+
+    aplicar_perfil.short_description = "Aplicar perfil seleccionado"
+
+
 @admin.register(HistorialAlerta)
 class HistorialAlertaAdmin(admin.ModelAdmin):
     list_display = [
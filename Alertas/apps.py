@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class AlertasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Alertas'
+
+    def ready(self):
+        from comun.signals import conectar_invalidacion, conectar_version
+        from .eventos import conectar_eventos
+        from .models import Alerta, ConfiguracionAlerta
+
+        conectar_version(Alerta, "alertas")
+        conectar_invalidacion(Alerta, lambda instance, **kwargs: ["alertas"])
+        conectar_invalidacion(
+            ConfiguracionAlerta,
+            lambda instance, **kwargs: ["configuraciones_alerta"],
+        )
+        conectar_eventos()
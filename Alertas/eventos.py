@@ -0,0 +1,207 @@
+"""Feed de eventos de alertas para el endpoint SSE.
+
+Dos tipos de evento:
+
+- ``alerta_creada``: una fila nueva en ``Alerta``.
+- ``alerta_transicion``: una fila nueva en ``HistorialAlerta`` (cambios de
+  estado registrados por ``Alerta.marcar_como_leida`` y compañía).
+
+En el proceso que hace la escritura, las señales publican el evento al
+confirmar la transacción. Para los eventos escritos por otros workers, el
+feed consulta cada ``ALERTAS_EVENTOS_INTERVALO`` segundos las filas con id
+mayor que el último visto: una consulta por clave primaria y tabla por
+intervalo y proceso, sin importar cuántos clientes haya conectados.
+
+El id se asigna al insertar pero la fila solo es visible al confirmar, así
+que una transacción más lenta puede confirmar un id menor que otro ya
+visto. Cada consulta relee además las filas de los últimos
+``ALERTAS_EVENTOS_RETRASO`` segundos por debajo del cursor (dentro de las
+``VENTANA_IDS`` anteriores) y los repetidos se descartan con ``Entregados``.
+"""
+import time
+from collections import deque
+from datetime import timedelta
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from comun.eventos import BusEventos
+
+from .models import Alerta, HistorialAlerta
+from .serializers import AlertaListSerializer, HistorialAlertaSerializer
+
+ALERTA = "alerta"
+HISTORIAL = "historial"
+# Filas como máximo por tabla en cada sondeo o recuperación
+LIMITE_FILAS = 500
+# Ids por debajo del cursor entre los que se buscan filas confirmadas tarde
+VENTANA_IDS = 1000
+
+
+def evento_creacion(alerta):
+    return {
+        "evento": "alerta_creada",
+        "tabla": ALERTA,
+        "id": alerta.pk,
+        "datos": AlertaListSerializer(alerta).data,
+    }
+
+
+def evento_transicion(historial):
+    return {
+        "evento": "alerta_transicion",
+        "tabla": HISTORIAL,
+        "id": historial.pk,
+        "datos": HistorialAlertaSerializer(historial).data,
+    }
+
+
+def leer_cursor(valor):
+    """Cursor ``{tabla: último id}`` a partir de un ``Last-Event-ID`` ``"<alerta>-<historial>"``"""
+    try:
+        alerta, historial = (int(parte) for parte in valor.split("-"))
+    except (AttributeError, ValueError):
+        return None
+    return {ALERTA: alerta, HISTORIAL: historial}
+
+
+def cursor_actual():
+    return {
+        ALERTA: Alerta.objects.aggregate(ultimo=Max("pk"))["ultimo"] or 0,
+        HISTORIAL: HistorialAlerta.objects.aggregate(ultimo=Max("pk"))["ultimo"] or 0,
+    }
+
+
+def eventos_desde(cursor):
+    """Eventos posteriores a ``cursor`` en orden de id dentro de cada tabla.
+
+    Incluye las filas recientes con id menor que el cursor (la del cursor ya
+    se entregó), que pueden estar ya entregadas: quien consume los eventos
+    descarta los repetidos.
+    """
+    limite = timezone.now() - timedelta(seconds=getattr(settings, "ALERTAS_EVENTOS_RETRASO", 30))
+    alertas = (
+        Alerta.objects.select_related("producto", "creada_por")
+        .filter(
+            Q(pk__gt=cursor[ALERTA]) | Q(pk__lt=cursor[ALERTA], fecha_creacion__gte=limite),
+            pk__gt=cursor[ALERTA] - VENTANA_IDS,
+        )
+        .order_by("pk")[:LIMITE_FILAS]
+    )
+    historial = (
+        HistorialAlerta.objects.select_related("modificado_por")
+        .filter(
+            Q(pk__gt=cursor[HISTORIAL]) | Q(pk__lt=cursor[HISTORIAL], fecha_modificacion__gte=limite),
+            pk__gt=cursor[HISTORIAL] - VENTANA_IDS,
+        )
+        .order_by("pk")[:LIMITE_FILAS]
+    )
+    return [evento_creacion(alerta) for alerta in alertas] + [
+        evento_transicion(registro) for registro in historial
+    ]
+
+
+class FeedAlertas:
+    def __init__(self):
+        self.bus = BusEventos()
+        self._publicados = None
+        self._ultimo_sondeo = 0.0
+
+    @property
+    def intervalo(self):
+        return getattr(settings, "ALERTAS_EVENTOS_INTERVALO", 2)
+
+    def publicar(self, construir, instancia):
+        self.bus.publicar(construir(instancia))
+
+    async def sondear(self):
+        """Publicar las filas escritas por otros procesos.
+
+        Como mucho un sondeo por intervalo aunque lo pidan todas las
+        conexiones: la marca de tiempo se actualiza antes del primer
+        ``await``, así que las demás corrutinas del bucle no lo repiten.
+        """
+        ahora = time.monotonic()
+        if ahora - self._ultimo_sondeo < self.intervalo:
+            return
+        self._ultimo_sondeo = ahora
+        for evento in await sync_to_async(self._nuevos)():
+            self.bus.publicar(evento)
+
+    def _nuevos(self):
+        if self._publicados is None:
+            # Primer sondeo del proceso: empezar desde lo que ya existe. Las filas
+            # recientes que la relectura por retraso volvería a traer (y la del
+            # cursor) se dan por publicadas
+            cursor = cursor_actual()
+            self._publicados = Entregados(cursor)
+            for evento in eventos_desde({tabla: ultimo - 1 for tabla, ultimo in cursor.items()}):
+                self._publicados.nuevo(evento)
+            return []
+        return [
+            evento for evento in eventos_desde(self._publicados.cursor)
+            if self._publicados.nuevo(evento)
+        ]
+
+    def reiniciar(self):
+        self._publicados = None
+        self._ultimo_sondeo = 0.0
+
+
+feed_alertas = FeedAlertas()
+
+
+class Entregados:
+    """Eventos ya enviados a una conexión.
+
+    Un evento puede llegar dos veces (por la señal local y por el sondeo, o
+    en la recuperación inicial y en directo). Se recuerdan las últimas
+    claves en lugar de comparar con el último id porque el sondeo puede
+    traer ids menores que uno ya publicado localmente.
+    """
+
+    def __init__(self, cursor, memoria=2000):
+        self.cursor = dict(cursor)
+        self._orden = deque(maxlen=memoria)
+        self._claves = set()
+
+    def nuevo(self, evento):
+        clave = (evento["tabla"], evento["id"])
+        if clave in self._claves:
+            return False
+        if len(self._orden) == self._orden.maxlen:
+            self._claves.discard(self._orden[0])
+        self._orden.append(clave)
+        self._claves.add(clave)
+        self.cursor[evento["tabla"]] = max(self.cursor[evento["tabla"]], evento["id"])
+        return True
+
+    @property
+    def ultimo_id(self):
+        return f"{self.cursor[ALERTA]}-{self.cursor[HISTORIAL]}"
+
+
+def _al_confirmar(construir, instance, **kwargs):
+    # Sin conexiones abiertas en este proceso no hay nada que serializar
+    if feed_alertas.bus.suscriptores:
+        transaction.on_commit(partial(feed_alertas.publicar, construir, instance))
+
+
+def _alerta_guardada(sender, instance, created, **kwargs):
+    if created:
+        _al_confirmar(evento_creacion, instance)
+
+
+def _historial_guardado(sender, instance, created, **kwargs):
+    if created:
+        _al_confirmar(evento_transicion, instance)
+
+
+def conectar_eventos():
+    post_save.connect(_alerta_guardada, sender=Alerta, dispatch_uid="eventos-alerta")
+    post_save.connect(_historial_guardado, sender=HistorialAlerta, dispatch_uid="eventos-historial")
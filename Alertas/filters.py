@@ -1,6 +1,6 @@
 import django_filters
-from django.db.models import Q, F
-from .models import Alerta, ConfiguracionAlerta
+from django.db.models import Q
+from .models import Alerta, ConfiguracionAlerta, condicion_auto_resoluble, condicion_urgente
 
 class AlertaFilter(django_filters.FilterSet):
     search = django_filters.CharFilter(method='filter_search')
@@ -11,6 +11,10 @@ class AlertaFilter(django_filters.FilterSet):
     producto_nombre = django_filters.CharFilter(field_name='producto__nombre', lookup_expr='icontains')
     urgente = django_filters.BooleanFilter(method='filter_urgente')
     auto_resolubles = django_filters.BooleanFilter(method='filter_auto_resolubles')
+    # ``nivel`` ordena por severidad (BAJA < MEDIA < ALTA < URGENTE), no alfabéticamente
+    ordering = django_filters.OrderingFilter(
+        fields=(('nivel_rango', 'nivel'), ('fecha_creacion', 'fecha_creacion'))
+    )
     
     class Meta:
         model = Alerta
@@ -34,28 +38,18 @@ class AlertaFilter(django_filters.FilterSet):
         )
     
     def filter_urgente(self, queryset, name, value):
-        """Filtrar alertas urgentes"""
+        """Filtrar alertas urgentes (mismo criterio que ``Alerta.es_urgente``)"""
         from django.utils import timezone
-        from datetime import timedelta
         
         if value:
-            return queryset.filter(
-                Q(nivel='URGENTE') |
-                Q(nivel='ALTA', fecha_creacion__lte=timezone.now()-timedelta(days=2))
-            )
+            return queryset.filter(condicion_urgente(timezone.now()))
         return queryset
     
     def filter_auto_resolubles(self, queryset, name, value):
         """Filtrar alertas que pueden auto-resolverse"""
         if value:
             # Solo alertas de stock que pueden auto-resolverse
-            return queryset.filter(
-                tipo__in=['STOCK_CRITICO', 'STOCK_AGOTADO'],
-                producto__isnull=False
-            ).filter(
-                Q(tipo='STOCK_CRITICO', producto__stock_actual__gt=F('producto__stock_minimo')) |
-                Q(tipo='STOCK_AGOTADO', producto__stock_actual__gt=0)
-            )
+            return queryset.filter(condicion_auto_resoluble())
         return queryset
 
 class ConfiguracionAlertaFilter(django_filters.FilterSet):
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from Alertas.models import ConfiguracionAlerta
 from Alertas.services import AlertaService
 
 
@@ -16,6 +17,12 @@ class Command(BaseCommand):
         alerta_service = AlertaService()
         tipo = options.get("tipo")
 
+        creadas = ConfiguracionAlerta.crear_faltantes()
+        if creadas:
+            self.stdout.write(
+                f"Configuraciones creadas con el perfil predeterminado: {len(creadas)}"
+            )
+
         self.stdout.write("Iniciando revisión automática de alertas...")
 
         if tipo:
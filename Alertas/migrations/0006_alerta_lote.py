@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Alertas', '0005_remove_alerta_datos_adicionales'),
+        ('Productos', '0002_loteproducto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alerta',
+            name='lote',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alertas', to='Productos.loteproducto'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:02
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Alertas', '0006_alerta_lote'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilConfiguracionAlerta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('descripcion', models.TextField(blank=True)),
+                ('activa', models.BooleanField(default=True)),
+                ('auto_generar', models.BooleanField(default=True)),
+                ('nivel_predeterminado', models.CharField(choices=[('BAJA', 'Baja'), ('MEDIA', 'Media'), ('ALTA', 'Alta'), ('URGENTE', 'Urgente')], default='MEDIA', max_length=20)),
+                ('enviar_correo', models.BooleanField(default=False)),
+                ('correo_destinatarios', models.TextField(blank=True, help_text='Emails separados por coma')),
+                ('dias_aviso_vencimiento', models.PositiveIntegerField(default=30, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(365)])),
+                ('porcentaje_stock_critico', models.DecimalField(decimal_places=2, default=Decimal('20.00'), max_digits=5, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(100)])),
+                ('intervalo_revision_horas', models.PositiveIntegerField(default=24, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(168)])),
+                ('en_uso', models.BooleanField(default=False)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_aplicacion', models.DateTimeField(blank=True, null=True)),
+                ('creado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Perfil de Configuración de Alertas',
+                'verbose_name_plural': 'Perfiles de Configuración de Alertas',
+                'ordering': ['nombre', '-version'],
+                'constraints': [models.UniqueConstraint(fields=('nombre', 'version'), name='perfil_alerta_version_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Alertas', '0007_perfilconfiguracionalerta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alerta',
+            name='nivel_rango',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(nivel='BAJA', then=models.Value(1)), models.When(nivel='MEDIA', then=models.Value(2)), models.When(nivel='ALTA', then=models.Value(3)), models.When(nivel='URGENTE', then=models.Value(4)), default=models.Value(0)), output_field=models.PositiveSmallIntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='alerta',
+            index=models.Index(fields=['estado', '-nivel_rango', '-fecha_creacion'], name='Alertas_ale_estado_cc6ff5_idx'),
+        ),
+    ]
@@ -1,7 +1,66 @@
-from django.db import models
+from decimal import Decimal
+
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import BigIntegerField, BooleanField, Case, ExpressionWrapper, F, IntegerField, Q, Value, When
+from django.db.models.functions import Floor
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
-from Productos.models import Producto
+from Productos.models import Producto, LoteProducto
+
+
+# Microsegundos por día: la resta de fechas en SQLite y MySQL devuelve microsegundos
+MICROSEGUNDOS_DIA = 24 * 60 * 60 * 1_000_000
+
+
+def condicion_urgente(ahora):
+    """``Q`` equivalente a ``Alerta.es_urgente`` en el instante ``ahora``.
+
+    ``dias_pendiente > N`` se expresa como ``fecha_creacion <= ahora - (N + 1) días``
+    para que la condición use los índices de ``nivel``/``estado``/``fecha_creacion``.
+    """
+    return (
+        Q(nivel="URGENTE")
+        | Q(estado="PENDIENTE", nivel="ALTA", fecha_creacion__lte=ahora - timedelta(days=3))
+        | Q(estado="PENDIENTE", nivel="MEDIA", fecha_creacion__lte=ahora - timedelta(days=8))
+    )
+
+
+def condicion_auto_resoluble():
+    """``Q`` equivalente a ``Alerta.puede_auto_resolver``"""
+    return Q(tipo="STOCK_CRITICO", producto__stock_actual__gt=F("producto__stock_minimo")) | Q(
+        tipo="STOCK_AGOTADO", producto__stock_actual__gt=0
+    )
+
+
+class AlertaQuerySet(models.QuerySet):
+    def con_urgencia(self, ahora=None):
+        """Anotar ``dias_pendiente`` y ``es_urgente`` calculados por la base de datos"""
+        ahora = ahora or timezone.now()
+        transcurrido = ExpressionWrapper(Value(ahora) - F("fecha_creacion"), output_field=BigIntegerField())
+        return self.annotate(
+            dias_pendiente=Case(
+                When(estado="PENDIENTE", then=Floor(transcurrido / Value(MICROSEGUNDOS_DIA))),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            es_urgente=Case(
+                When(condicion_urgente(ahora), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        )
+
+    def con_auto_resolucion(self):
+        """Anotar ``puede_auto_resolver`` sin cargar el producto de cada alerta"""
+        return self.annotate(
+            puede_auto_resolver=Case(
+                When(condicion_auto_resoluble(), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        )
 
 
 class Alerta(models.Model):
@@ -23,6 +82,8 @@ class Alerta(models.Model):
         ("ALTA", "Alta"),
         ("URGENTE", "Urgente"),
     ]
+    # Severidad numérica de cada nivel: ordenar por ``nivel`` es alfabético
+    RANGO_NIVEL = {"BAJA": 1, "MEDIA": 2, "ALTA": 3, "URGENTE": 4}
 
     ESTADO_ALERTA_CHOICES = [
         ("PENDIENTE", "Pendiente"),
@@ -40,6 +101,14 @@ class Alerta(models.Model):
         blank=True,
     )
 
+    lote = models.ForeignKey(
+        LoteProducto,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="alertas",
+    )
+
     movimiento = models.ForeignKey(
         "movimientos.Movimiento",
         on_delete=models.SET_NULL,
@@ -63,6 +132,16 @@ class Alerta(models.Model):
     estado = models.CharField(
         max_length=20, choices=ESTADO_ALERTA_CHOICES, default="PENDIENTE"
     )
+    # Columna calculada por la base de datos: siempre coincide con ``nivel``,
+    # también tras ``update()`` y ``bulk_create()``
+    nivel_rango = models.GeneratedField(
+        expression=Case(
+            *[When(nivel=nivel, then=Value(rango)) for nivel, rango in RANGO_NIVEL.items()],
+            default=Value(0),
+        ),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+    )
 
     # Mensaje y detalles
     titulo = models.CharField(max_length=200)
@@ -120,8 +199,11 @@ class Alerta(models.Model):
             models.Index(fields=["activa"]),
             models.Index(fields=["fecha_creacion"]),
             models.Index(fields=["producto", "tipo", "activa"]),
+            models.Index(fields=["estado", "-nivel_rango", "-fecha_creacion"]),
         ]
 
+    objects = AlertaQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.titulo}"
 
@@ -133,27 +215,33 @@ class Alerta(models.Model):
             if usuario:
                 self.leida_por = usuario
             self.save()
+            self._registrar_transicion("PENDIENTE", usuario)
 
     def marcar_como_atendida(self, usuario=None):
         """Marca la alerta como atendida"""
+        anterior = self.estado
         self.estado = "ATENDIDA"
         self.fecha_atencion = timezone.now()
         if usuario:
             self.atendida_por = usuario
         self.activa = False
         self.save()
+        self._registrar_transicion(anterior, usuario)
 
     def descartar(self, usuario=None):
         """Descarta la alerta"""
+        anterior = self.estado
         self.estado = "DESCARTADA"
         self.fecha_resolucion = timezone.now()
         self.activa = False
         if usuario:
             self.atendida_por = usuario
         self.save()
+        self._registrar_transicion(anterior, usuario)
 
     def reactivar(self):
         """Reactivar una alerta"""
+        anterior = self.estado
         self.estado = "PENDIENTE"
         self.activa = True
         self.fecha_lectura = None
@@ -162,29 +250,73 @@ class Alerta(models.Model):
         self.leida_por = None
         self.atendida_por = None
         self.save()
+        self._registrar_transicion(anterior)
+
+    def _registrar_transicion(self, estado_anterior, usuario=None):
+        """Guardar el cambio de estado en el historial.
+
+        Es también la fuente de los eventos ``alerta_transicion`` que los
+        demás workers leen por sondeo (ver ``Alertas.eventos``).
+        """
+        if estado_anterior != self.estado:
+            HistorialAlerta.objects.create(
+                alerta=self,
+                campo_modificado="estado",
+                valor_anterior=estado_anterior,
+                valor_nuevo=self.estado,
+                modificado_por=usuario,
+            )
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Los valores anotados por AlertaQuerySet ya no corresponden a la fila
+        for nombre in ("_dias_pendiente", "_es_urgente", "_puede_auto_resolver"):
+            self.__dict__.pop(nombre, None)
 
     @property
     def dias_pendiente(self):
         """Calcula los días que la alerta ha estado pendiente"""
-        if self.estado == "PENDIENTE":
-            delta = timezone.now() - self.fecha_creacion
-            return delta.days
-        return 0
+        if "_dias_pendiente" in self.__dict__:
+            return self._dias_pendiente
+        return self.calcular_dias_pendiente(self.estado, self.fecha_creacion, timezone.now())
+
+    @dias_pendiente.setter
+    def dias_pendiente(self, valor):
+        # Valor anotado por ``AlertaQuerySet.con_urgencia``
+        self._dias_pendiente = valor
 
     @property
     def es_urgente(self):
         """Determina si la alerta es urgente basado en nivel y tiempo"""
-        if self.nivel == "URGENTE":
+        if "_es_urgente" in self.__dict__:
+            return self._es_urgente
+        return self.calcular_es_urgente(self.nivel, self.dias_pendiente)
+
+    @es_urgente.setter
+    def es_urgente(self, valor):
+        self._es_urgente = valor
+
+    @staticmethod
+    def calcular_dias_pendiente(estado, fecha_creacion, ahora):
+        if estado == "PENDIENTE":
+            return (ahora - fecha_creacion).days
+        return 0
+
+    @staticmethod
+    def calcular_es_urgente(nivel, dias_pendiente):
+        if nivel == "URGENTE":
             return True
-        elif self.nivel == "ALTA" and self.dias_pendiente > 2:
+        elif nivel == "ALTA" and dias_pendiente > 2:
             return True
-        elif self.nivel == "MEDIA" and self.dias_pendiente > 7:
+        elif nivel == "MEDIA" and dias_pendiente > 7:
             return True
         return False
 
     @property
     def puede_auto_resolver(self):
         """Determina si la alerta puede resolverse automáticamente"""
+        if "_puede_auto_resolver" in self.__dict__:
+            return self._puede_auto_resolver
         # Por ejemplo, si el stock se normaliza, la alerta de stock crítico puede auto-resolverse
         if self.tipo == "STOCK_CRITICO" and self.producto:
             return self.producto.stock_actual > self.producto.stock_minimo
@@ -192,6 +324,25 @@ class Alerta(models.Model):
             return self.producto.stock_actual > 0
         return False
 
+    @puede_auto_resolver.setter
+    def puede_auto_resolver(self, valor):
+        # Valor anotado por ``AlertaQuerySet.con_auto_resolucion``
+        self._puede_auto_resolver = valor
+
+
+# Perfil predeterminado de las configuraciones de alertas. Lo usan los
+# valores por defecto de los campos, el reseteo y la carga inicial.
+VALORES_PREDETERMINADOS = {
+    "activa": True,
+    "auto_generar": True,
+    "nivel_predeterminado": "MEDIA",
+    "enviar_correo": False,
+    "correo_destinatarios": "",
+    "dias_aviso_vencimiento": 30,
+    "porcentaje_stock_critico": Decimal("20.00"),
+    "intervalo_revision_horas": 24,
+}
+
 
 class ConfiguracionAlerta(models.Model):
     """Configuración para tipos específicos de alertas"""
@@ -201,28 +352,30 @@ class ConfiguracionAlerta(models.Model):
     )
 
     # Configuración de generación
-    activa = models.BooleanField(default=True)
-    auto_generar = models.BooleanField(default=True)
+    activa = models.BooleanField(default=VALORES_PREDETERMINADOS["activa"])
+    auto_generar = models.BooleanField(default=VALORES_PREDETERMINADOS["auto_generar"])
     nivel_predeterminado = models.CharField(
-        max_length=20, choices=Alerta.NIVEL_ALERTA_CHOICES, default="MEDIA"
+        max_length=20,
+        choices=Alerta.NIVEL_ALERTA_CHOICES,
+        default=VALORES_PREDETERMINADOS["nivel_predeterminado"],
     )
 
     # Configuración de notificaciones
-    enviar_correo = models.BooleanField(default=False)
+    enviar_correo = models.BooleanField(default=VALORES_PREDETERMINADOS["enviar_correo"])
     correo_destinatarios = models.TextField(
         blank=True, help_text="Emails separados por coma"
     )
 
     # Configuración específica por tipo
     dias_aviso_vencimiento = models.PositiveIntegerField(
-        default=30,
+        default=VALORES_PREDETERMINADOS["dias_aviso_vencimiento"],
         validators=[MinValueValidator(1), MaxValueValidator(365)],
         help_text="Días de anticipación para alertas de vencimiento",
     )
     porcentaje_stock_critico = models.DecimalField(
         max_digits=5,
         decimal_places=2,
-        default=20.00,
+        default=VALORES_PREDETERMINADOS["porcentaje_stock_critico"],
         validators=[MinValueValidator(1), MaxValueValidator(100)],
         help_text="Porcentaje sobre stock mínimo para considerar crítico",
     )
@@ -235,7 +388,7 @@ class ConfiguracionAlerta(models.Model):
 
     # Frecuencia de revisión
     intervalo_revision_horas = models.PositiveIntegerField(
-        default=24,
+        default=VALORES_PREDETERMINADOS["intervalo_revision_horas"],
         validators=[MinValueValidator(1), MaxValueValidator(168)],  # Máximo 1 semana
         help_text="Horas entre revisiones automáticas",
     )
@@ -252,6 +405,112 @@ class ConfiguracionAlerta(models.Model):
     def __str__(self):
         return f"Configuración - {self.get_tipo_alerta_display()}"
 
+    @classmethod
+    def crear_faltantes(cls):
+        """Crear con el perfil predeterminado las configuraciones que falten"""
+        existentes = set(cls.objects.values_list("tipo_alerta", flat=True))
+        nuevas = [
+            cls(tipo_alerta=tipo, **VALORES_PREDETERMINADOS)
+            for tipo, _ in Alerta.TIPO_ALERTA_CHOICES
+            if tipo not in existentes
+        ]
+        if not nuevas:
+            return []
+
+        from .services import configuraciones_alerta
+
+        creadas = cls.objects.bulk_create(nuevas, ignore_conflicts=True)
+        configuraciones_alerta.invalidar()
+        return creadas
+
+    @classmethod
+    def aplicar_valores(cls, valores, usuario=None):
+        """Aplicar ``valores`` a todas las configuraciones con un solo UPDATE"""
+        return cls.objects.update(
+            **valores, actualizado_por=usuario, fecha_actualizacion=timezone.now()
+        )
+
+
+class PerfilConfiguracionAlerta(models.Model):
+    """Perfil versionado de valores para todas las configuraciones de alertas"""
+
+    nombre = models.CharField(max_length=100)
+    version = models.PositiveIntegerField(default=1)
+    descripcion = models.TextField(blank=True)
+
+    activa = models.BooleanField(default=VALORES_PREDETERMINADOS["activa"])
+    auto_generar = models.BooleanField(default=VALORES_PREDETERMINADOS["auto_generar"])
+    nivel_predeterminado = models.CharField(
+        max_length=20,
+        choices=Alerta.NIVEL_ALERTA_CHOICES,
+        default=VALORES_PREDETERMINADOS["nivel_predeterminado"],
+    )
+    enviar_correo = models.BooleanField(default=VALORES_PREDETERMINADOS["enviar_correo"])
+    correo_destinatarios = models.TextField(
+        blank=True, help_text="Emails separados por coma"
+    )
+    dias_aviso_vencimiento = models.PositiveIntegerField(
+        default=VALORES_PREDETERMINADOS["dias_aviso_vencimiento"],
+        validators=[MinValueValidator(1), MaxValueValidator(365)],
+    )
+    porcentaje_stock_critico = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default=VALORES_PREDETERMINADOS["porcentaje_stock_critico"],
+        validators=[MinValueValidator(1), MaxValueValidator(100)],
+    )
+    intervalo_revision_horas = models.PositiveIntegerField(
+        default=VALORES_PREDETERMINADOS["intervalo_revision_horas"],
+        validators=[MinValueValidator(1), MaxValueValidator(168)],
+    )
+
+    # Solo un perfil está aplicado a la vez
+    en_uso = models.BooleanField(default=False)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_aplicacion = models.DateTimeField(null=True, blank=True)
+    creado_por = models.ForeignKey(
+        "auth.User", on_delete=models.SET_NULL, null=True, blank=True
+    )
+
+    class Meta:
+        verbose_name = "Perfil de Configuración de Alertas"
+        verbose_name_plural = "Perfiles de Configuración de Alertas"
+        ordering = ["nombre", "-version"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["nombre", "version"], name="perfil_alerta_version_unica"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} v{self.version}"
+
+    @property
+    def valores(self):
+        """Valores del perfil con las mismas claves que VALORES_PREDETERMINADOS"""
+        return {campo: getattr(self, campo) for campo in VALORES_PREDETERMINADOS}
+
+    def aplicar(self, usuario=None):
+        """Aplicar el perfil a todas las configuraciones de forma atómica.
+
+        Las configuraciones se actualizan con un solo UPDATE y el perfil queda
+        marcado como el único en uso dentro de la misma transacción. La caché
+        de configuraciones se invalida una sola vez, al confirmar.
+        """
+        from .services import configuraciones_alerta
+
+        with transaction.atomic():
+            actualizadas = ConfiguracionAlerta.aplicar_valores(self.valores, usuario)
+            PerfilConfiguracionAlerta.objects.filter(en_uso=True).exclude(
+                pk=self.pk
+            ).update(en_uso=False)
+            self.en_uso = True
+            self.fecha_aplicacion = timezone.now()
+            self.save(update_fields=["en_uso", "fecha_aplicacion"])
+            transaction.on_commit(configuraciones_alerta.invalidar)
+
+        return actualizadas
+
 
 class HistorialAlerta(models.Model):
     """Historial de cambios en alertas"""
@@ -1,6 +1,13 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import Alerta, ConfiguracionAlerta, HistorialAlerta
+from django.db.models import Max
+from comun.serializacion import SerializacionValores
+from .models import (
+    Alerta,
+    ConfiguracionAlerta,
+    HistorialAlerta,
+    PerfilConfiguracionAlerta,
+)
 
 
 class AlertaListSerializer(serializers.ModelSerializer):
@@ -39,6 +46,21 @@ class AlertaListSerializer(serializers.ModelSerializer):
             "auto_generada",
             "creada_por_username",
         ]
+        # Columnas de las propiedades del modelo (``only()`` en los listados)
+        columnas_requeridas = {
+            "dias_pendiente": ("estado", "fecha_creacion"),
+            "es_urgente": ("nivel", "estado", "fecha_creacion"),
+        }
+
+
+class AlertaListValores(SerializacionValores):
+    """Misma salida que ``AlertaListSerializer`` leyendo filas de ``values()``"""
+
+    serializer_class = AlertaListSerializer
+    campos_anotados = ("dias_pendiente", "es_urgente")
+
+    def anotar(self, queryset):
+        return queryset.con_urgencia()
 
 
 class AlertaDetailSerializer(serializers.ModelSerializer):
@@ -85,6 +107,11 @@ class AlertaDetailSerializer(serializers.ModelSerializer):
             "correo_enviado",
             "fecha_envio_correo",
         ]
+        columnas_requeridas = {
+            "dias_pendiente": ("estado", "fecha_creacion"),
+            "es_urgente": ("nivel", "estado", "fecha_creacion"),
+            "puede_auto_resolver": ("tipo", "producto__stock_actual", "producto__stock_minimo"),
+        }
 
     def validate(self, data):
         # Validar fechas coherentes
@@ -185,6 +212,43 @@ class ConfiguracionAlertaSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class PerfilConfiguracionAlertaSerializer(serializers.ModelSerializer):
+    creado_por_username = serializers.CharField(
+        source="creado_por.username", read_only=True, allow_null=True
+    )
+
+    class Meta:
+        model = PerfilConfiguracionAlerta
+        fields = "__all__"
+        read_only_fields = [
+            "version",
+            "en_uso",
+            "fecha_creacion",
+            "fecha_aplicacion",
+            "creado_por",
+        ]
+        # La versión la asigna create(); la restricción única la respalda la BD
+        validators = []
+
+    def validate_correo_destinatarios(self, value):
+        return ConfiguracionAlertaSerializer().validate_correo_destinatarios(value)
+
+    def create(self, validated_data):
+        # Cada perfil nuevo con un nombre existente es una versión nueva
+        ultima = PerfilConfiguracionAlerta.objects.filter(
+            nombre=validated_data["nombre"]
+        ).aggregate(ultima=Max("version"))["ultima"]
+        validated_data["version"] = (ultima or 0) + 1
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        if instance.en_uso:
+            raise serializers.ValidationError(
+                "No se puede modificar un perfil en uso; cree una nueva versión"
+            )
+        return super().update(instance, validated_data)
+
+
 class HistorialAlertaSerializer(serializers.ModelSerializer):
     modificado_por_username = serializers.CharField(
         source="modificado_por.username", read_only=True, allow_null=True
@@ -1,14 +1,85 @@
+from django.conf import settings
 from django.utils import timezone
 from django.db import models
+from django.db.models import Exists, OuterRef, Q
 from datetime import timedelta
 import logging
-from .models import Alerta, ConfiguracionAlerta, HistorialAlerta
+import threading
+import time
+from .models import Alerta, ConfiguracionAlerta, condicion_auto_resoluble
 from Productos.models import Producto
+from Productos.services import LoteService, inicio_dia
 from movimientos.models import Movimiento
+from movimientos.services import ajuste_pronostico
 from decimal import Decimal
+from comun import metricas
+from comun.cache import invalidar_tags, version_tag
+from comun.signals import invalidar_tras_escritura, version_tras_escritura
 
 logger = logging.getLogger(__name__)
 
+TAG_CONFIGURACIONES = "configuraciones_alerta"
+# Columnas de producto que leen las revisiones para decidir y redactar alertas
+COLUMNAS_PRODUCTO_REVISION = (
+    "id", "codigo", "nombre", "stock_actual", "stock_minimo", "unidad_medida", "fecha_vencimiento",
+)
+COLUMNAS_LOTE_REVISION = ("id", "lote", "fecha_vencimiento", "producto") + tuple(
+    f"producto__{columna}" for columna in COLUMNAS_PRODUCTO_REVISION
+)
+
+
+class CacheConfiguraciones:
+    """Caché de proceso con todas las configuraciones de alertas.
+
+    La tabla tiene una fila por tipo de alerta y casi nunca cambia, así que se
+    carga completa en una consulta y se reutiliza. Se recarga cuando cambia la
+    versión del tag de configuraciones (guardar una configuración lo invalida
+    vía señales) o al vencer ``ALERTAS_CONFIG_TTL`` segundos, que acota el
+    desfase entre procesos cuando el backend de caché no es compartido.
+
+    Las instancias devueltas son compartidas: no deben modificarse.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configuraciones = None
+        self._version = None
+        self._cargado_en = 0.0
+
+    def obtener(self, tipo_alerta):
+        return self._vigentes().get(tipo_alerta)
+
+    def invalidar(self):
+        """Descartar la copia local y avisar al resto de procesos"""
+        with self._lock:
+            self._configuraciones = None
+        invalidar_tags(TAG_CONFIGURACIONES)
+
+    def _vigentes(self):
+        version = version_tag(TAG_CONFIGURACIONES)
+        ttl = getattr(settings, "ALERTAS_CONFIG_TTL", 60)
+        with self._lock:
+            if (
+                self._configuraciones is None
+                or self._version != version
+                or time.monotonic() - self._cargado_en > ttl
+            ):
+                self._configuraciones = {
+                    config.tipo_alerta: config
+                    for config in ConfiguracionAlerta.objects.all()
+                }
+                self._version = version
+                self._cargado_en = time.monotonic()
+            return self._configuraciones
+
+
+configuraciones_alerta = CacheConfiguraciones()
+
+
+def obtener_configuracion(tipo_alerta):
+    """Configuración de un tipo de alerta desde la caché de proceso"""
+    return configuraciones_alerta.obtener(tipo_alerta)
+
 
 class AlertaService:
     """Servicio para la gestión de alertas"""
@@ -60,27 +131,45 @@ class AlertaService:
     def ejecutar_revision_automatica(self):
         """Ejecutar revisión automática de alertas"""
         resultados = {"alertas_creadas": 0, "alertas_resueltas": 0, "errores": []}
+        metricas.revisiones_alertas.inc()
 
         try:
             # Revisar stock crítico
-            resultados["stock_critico"] = self._revisar_stock_critico()
+            resultados["stock_critico"] = self._medir_revision(
+                "STOCK_CRITICO", self._revisar_stock_critico
+            )
             resultados["alertas_creadas"] += resultados["stock_critico"]["creadas"]
 
             # Revisar stock agotado
-            resultados["stock_agotado"] = self._revisar_stock_agotado()
+            resultados["stock_agotado"] = self._medir_revision(
+                "STOCK_AGOTADO", self._revisar_stock_agotado
+            )
             resultados["alertas_creadas"] += resultados["stock_agotado"]["creadas"]
 
             # Revisar productos próximos a vencer
-            resultados["proximos_vencer"] = self._revisar_proximos_vencer()
+            resultados["proximos_vencer"] = self._medir_revision(
+                "PROXIMO_VENCIMIENTO", self._revisar_proximos_vencer
+            )
             resultados["alertas_creadas"] += resultados["proximos_vencer"]["creadas"]
 
             # Revisar productos vencidos
-            resultados["productos_vencidos"] = self._revisar_productos_vencidos()
+            resultados["productos_vencidos"] = self._medir_revision(
+                "PRODUCTO_VENCIDO", self._revisar_productos_vencidos
+            )
             resultados["alertas_creadas"] += resultados["productos_vencidos"]["creadas"]
 
+            # Revisar el pronóstico de consumo (sin movimientos y cobertura baja)
+            resultados.update(self.revisar_pronostico())
+            resultados["alertas_creadas"] += (
+                resultados["sin_movimientos"]["creadas"] + resultados["inventario_bajo"]["creadas"]
+            )
+
             # Auto-resolver alertas
-            resultados["auto_resueltas"] = self._auto_resolver_alertas()
+            resultados["auto_resueltas"] = self._medir_revision(
+                "AUTO_RESOLUCION", self._auto_resolver_alertas
+            )
             resultados["alertas_resueltas"] += resultados["auto_resueltas"]["resueltas"]
+            metricas.alertas_resueltas.inc(resultados["auto_resueltas"]["resueltas"])
 
         except Exception as e:
             logger.error(f"Error en revisión automática: {str(e)}")
@@ -88,6 +177,14 @@ class AlertaService:
 
         return resultados
 
+    def _medir_revision(self, tipo, revisar):
+        """Ejecutar un paso de la revisión registrando su duración y alertas creadas"""
+        with metricas.duracion_revision.medir(tipo=tipo):
+            resultado = revisar()
+        if resultado.get("creadas"):
+            metricas.alertas_creadas.inc(resultado["creadas"], tipo=tipo)
+        return resultado
+
     def _revisar_stock_critico(self):
         """Revisar productos con stock crítico"""
         config = self._obtener_configuracion("STOCK_CRITICO")
@@ -97,7 +194,7 @@ class AlertaService:
         # Calcular umbral de stock crítico
         productos_criticos = Producto.objects.filter(
             activo=True, stock_actual__lte=models.F("stock_minimo"), stock_actual__gt=0
-        )
+        ).only(*COLUMNAS_PRODUCTO_REVISION)
 
         alertas_creadas = 0
         for producto in productos_criticos:
@@ -123,12 +220,6 @@ class AlertaService:
                     producto=producto,
                     auto_generada=True,
                     enviar_correo=config.enviar_correo,
-                    datos_adicionales={
-                        "stock_actual": float(producto.stock_actual),
-                        "stock_minimo": float(producto.stock_minimo),
-                        "porcentaje_stock": float(porcentaje_stock),
-                        "unidad_medida": producto.unidad_medida,
-                    },
                 )
                 alerta.save()
                 alertas_creadas += 1
@@ -144,7 +235,9 @@ class AlertaService:
         if not config or not config.activa:
             return {"creadas": 0, "existentes": 0}
 
-        productos_agotados = Producto.objects.filter(activo=True, stock_actual__lte=0)
+        productos_agotados = Producto.objects.filter(
+            activo=True, stock_actual__lte=0
+        ).only(*COLUMNAS_PRODUCTO_REVISION)
 
         alertas_creadas = 0
         for producto in productos_agotados:
@@ -164,10 +257,6 @@ class AlertaService:
                     producto=producto,
                     auto_generada=True,
                     enviar_correo=config.enviar_correo,
-                    datos_adicionales={
-                        "stock_actual": float(producto.stock_actual),
-                        "unidad_medida": producto.unidad_medida,
-                    },
                 )
                 alerta.save()
                 alertas_creadas += 1
@@ -178,131 +267,278 @@ class AlertaService:
         return {"creadas": alertas_creadas, "existentes": productos_agotados.count()}
 
     def _revisar_proximos_vencer(self):
-        """Revisar productos próximos a vencer"""
+        """Revisar lotes y productos próximos a vencer"""
         config = self._obtener_configuracion("PROXIMO_VENCIMIENTO")
         if not config or not config.activa:
             return {"creadas": 0, "existentes": 0}
 
-        fecha_limite = timezone.now().date() + timedelta(
-            days=config.dias_aviso_vencimiento
+        hoy = timezone.now().date()
+        fecha_limite = hoy + timedelta(days=config.dias_aviso_vencimiento)
+        lote_service = LoteService()
+
+        lotes_proximos_vencer = (
+            lote_service.lotes_proximos_vencer(config.dias_aviso_vencimiento)
+            .select_related("producto")
+            .only(*COLUMNAS_LOTE_REVISION)
         )
-        productos_proximos_vencer = Producto.objects.filter(
-            activo=True,
-            fecha_vencimiento__lte=fecha_limite,
-            fecha_vencimiento__gte=timezone.now().date(),
+        # Productos sin lotes registrados usan su fecha de vencimiento propia
+        productos_proximos_vencer = lote_service.productos_sin_lotes(
+            Producto.objects.filter(
+                activo=True,
+                fecha_vencimiento__lte=fecha_limite,
+                fecha_vencimiento__gte=hoy,
+            ).only(*COLUMNAS_PRODUCTO_REVISION)
         )
 
         alertas_creadas = 0
-        for producto in productos_proximos_vencer:
-            dias_restantes = (producto.fecha_vencimiento - timezone.now().date()).days
-            alerta_existente = Alerta.objects.filter(
-                producto=producto, tipo="PROXIMO_VENCIMIENTO", activa=True
-            ).exists()
-
-            if not alerta_existente or config.repetible:
-                nivel = "ALTA" if dias_restantes <= 7 else "MEDIA"
-
-                alerta = Alerta(
-                    tipo="PROXIMO_VENCIMIENTO",
-                    nivel=nivel,
-                    titulo=f"Producto Próximo a Vencer - {producto.nombre}",
-                    mensaje=(
-                        f"El producto {producto.nombre} ({producto.codigo}) vence el "
-                        f"{producto.fecha_vencimiento}. Quedan {dias_restantes} días."
-                    ),
-                    producto=producto,
-                    auto_generada=True,
-                    enviar_correo=config.enviar_correo,
-                    datos_adicionales={
-                        "fecha_vencimiento": producto.fecha_vencimiento.isoformat(),
-                        "dias_restantes": dias_restantes,
-                        "lote": producto.lote or "",
-                    },
-                )
-                alerta.save()
+        for producto, lote, fecha_vencimiento in self._vencimientos(
+            lotes_proximos_vencer, productos_proximos_vencer
+        ):
+            dias_restantes = (fecha_vencimiento - hoy).days
+            nivel = "ALTA" if dias_restantes <= 7 else "MEDIA"
+            referencia = f" (lote {lote.lote})" if lote else ""
+
+            alerta = self._crear_alerta_vencimiento(
+                config,
+                tipo="PROXIMO_VENCIMIENTO",
+                nivel=nivel,
+                producto=producto,
+                lote=lote,
+                titulo=f"Producto Próximo a Vencer - {producto.nombre}",
+                mensaje=(
+                    f"El producto {producto.nombre} ({producto.codigo}){referencia} vence el "
+                    f"{fecha_vencimiento}. Quedan {dias_restantes} días."
+                ),
+            )
+            if alerta:
                 alertas_creadas += 1
 
-                if config.enviar_correo:
-                    self._enviar_correo_alerta(alerta)
-
         return {
             "creadas": alertas_creadas,
-            "existentes": productos_proximos_vencer.count(),
+            "existentes": lotes_proximos_vencer.count()
+            + productos_proximos_vencer.count(),
         }
 
     def _revisar_productos_vencidos(self):
-        """Revisar productos vencidos"""
+        """Revisar lotes y productos vencidos"""
         config = self._obtener_configuracion("PRODUCTO_VENCIDO")
         if not config or not config.activa:
             return {"creadas": 0, "existentes": 0}
 
-        productos_vencidos = Producto.objects.filter(
-            activo=True, fecha_vencimiento__lt=timezone.now().date()
+        lote_service = LoteService()
+        lotes_vencidos = (
+            lote_service.lotes_vencidos().select_related("producto").only(*COLUMNAS_LOTE_REVISION)
+        )
+        productos_vencidos = lote_service.productos_sin_lotes(
+            Producto.objects.filter(
+                activo=True, fecha_vencimiento__lt=timezone.now().date()
+            ).only(*COLUMNAS_PRODUCTO_REVISION)
         )
 
         alertas_creadas = 0
-        for producto in productos_vencidos:
-            alerta_existente = Alerta.objects.filter(
-                producto=producto, tipo="PRODUCTO_VENCIDO", activa=True
-            ).exists()
-
-            if not alerta_existente or config.repetible:
-                alerta = Alerta(
-                    tipo="PRODUCTO_VENCIDO",
-                    nivel="URGENTE",
-                    titulo=f"Producto Vencido - {producto.nombre}",
-                    mensaje=(
-                        f"El producto {producto.nombre} ({producto.codigo}) está vencido desde "
-                        f"{producto.fecha_vencimiento}. Se recomienda retirarlo del inventario."
-                    ),
-                    producto=producto,
-                    auto_generada=True,
-                    enviar_correo=config.enviar_correo,
-                    datos_adicionales={
-                        "fecha_vencimiento": producto.fecha_vencimiento.isoformat(),
-                        "lote": producto.lote or "",
-                    },
-                )
-                alerta.save()
+        for producto, lote, fecha_vencimiento in self._vencimientos(
+            lotes_vencidos, productos_vencidos
+        ):
+            referencia = f" (lote {lote.lote})" if lote else ""
+
+            alerta = self._crear_alerta_vencimiento(
+                config,
+                tipo="PRODUCTO_VENCIDO",
+                nivel="URGENTE",
+                producto=producto,
+                lote=lote,
+                titulo=f"Producto Vencido - {producto.nombre}",
+                mensaje=(
+                    f"El producto {producto.nombre} ({producto.codigo}){referencia} está vencido desde "
+                    f"{fecha_vencimiento}. Se recomienda retirarlo del inventario."
+                ),
+            )
+            if alerta:
                 alertas_creadas += 1
 
-                if config.enviar_correo:
-                    self._enviar_correo_alerta(alerta)
+        return {
+            "creadas": alertas_creadas,
+            "existentes": lotes_vencidos.count() + productos_vencidos.count(),
+        }
+
+    def revisar_pronostico(self):
+        """Alertas que se derivan de ``PronosticoConsumo``"""
+        return {
+            "sin_movimientos": self._medir_revision(
+                "SIN_MOVIMIENTOS", self._revisar_sin_movimientos
+            ),
+            "inventario_bajo": self._medir_revision(
+                "INVENTARIO_BAJO", self._revisar_inventario_bajo
+            ),
+        }
 
-        return {"creadas": alertas_creadas, "existentes": productos_vencidos.count()}
+    def _revisar_sin_movimientos(self):
+        """Productos con stock que no se mueven desde hace ``PRONOSTICO_DIAS_SIN_MOVIMIENTOS`` días"""
+        config = self._obtener_configuracion("SIN_MOVIMIENTOS")
+        if not config or not config.activa:
+            return {"creadas": 0, "existentes": 0}
+
+        dias = ajuste_pronostico("DIAS_SIN_MOVIMIENTOS")
+        limite = timezone.localdate() - timedelta(days=dias)
+        # Solo productos con pronóstico calculado: sin él no se sabe si se mueven
+        productos = Producto.objects.filter(
+            Q(pronostico__ultimo_movimiento__lt=limite)
+            | Q(pronostico__ultimo_movimiento__isnull=True, fecha_creacion__lt=inicio_dia(limite)),
+            activo=True,
+            stock_actual__gt=0,
+            pronostico__isnull=False,
+        )
+
+        def alerta(fila):
+            ultimo = fila["pronostico__ultimo_movimiento"]
+            desde = f"desde el {ultimo}" if ultimo else "desde su alta"
+            return Alerta(
+                tipo="SIN_MOVIMIENTOS",
+                nivel=config.nivel_predeterminado,
+                titulo=f"Sin Movimientos - {fila['nombre']}",
+                mensaje=(
+                    f"El producto {fila['nombre']} ({fila['codigo']}) no registra movimientos {desde}. "
+                    f"Stock inmovilizado: {fila['stock_actual']} {fila['unidad_medida']}."
+                ),
+                producto_id=fila["id"],
+                auto_generada=True,
+                enviar_correo=config.enviar_correo,
+            )
+
+        return self._crear_alertas_en_bloque(config, "SIN_MOVIMIENTOS", productos, alerta)
+
+    def _revisar_inventario_bajo(self):
+        """Productos que, al consumo pronosticado, se quedarán sin stock pronto.
+
+        Avisa con ``PRONOSTICO_DIAS_COBERTURA`` días de cobertura o menos a
+        los productos que aún están por encima del stock mínimo; por debajo
+        ya los cubre la alerta de stock crítico.
+        """
+        config = self._obtener_configuracion("INVENTARIO_BAJO")
+        if not config or not config.activa:
+            return {"creadas": 0, "existentes": 0}
+
+        horizonte = ajuste_pronostico("DIAS_COBERTURA")
+        productos = Producto.objects.filter(
+            activo=True,
+            stock_actual__gt=models.F("stock_minimo"),
+            pronostico__dias_cobertura__lte=horizonte,
+        )
+
+        def alerta(fila):
+            cobertura = fila["pronostico__dias_cobertura"]
+            return Alerta(
+                tipo="INVENTARIO_BAJO",
+                nivel="ALTA" if cobertura <= Decimal(horizonte) / 2 else "MEDIA",
+                titulo=f"Inventario Bajo - {fila['nombre']}",
+                mensaje=(
+                    f"Al consumo actual, el stock de {fila['nombre']} ({fila['codigo']}) "
+                    f"cubre {cobertura} días. Stock actual: {fila['stock_actual']} "
+                    f"{fila['unidad_medida']}, consumo estimado "
+                    f"{fila['pronostico__consumo_suavizado']} {fila['unidad_medida']}/día."
+                ),
+                producto_id=fila["id"],
+                auto_generada=True,
+                enviar_correo=config.enviar_correo,
+            )
+
+        return self._crear_alertas_en_bloque(config, "INVENTARIO_BAJO", productos, alerta)
+
+    def _crear_alertas_en_bloque(self, config, tipo, productos, construir):
+        """Crear con un ``bulk_create`` una alerta ``tipo`` por producto.
+
+        Sin ``config.repetible`` se excluyen en la misma consulta los
+        productos que ya tienen una alerta activa del tipo. ``bulk_create`` no
+        envía ``post_save``: la versión de la tabla y la caché de alertas se
+        actualizan aquí, y el feed de eventos las recoge en su sondeo.
+        """
+        existentes = productos.count()
+        if not config.repetible:
+            productos = productos.exclude(
+                Exists(Alerta.objects.filter(producto=OuterRef("pk"), tipo=tipo, activa=True))
+            )
+        filas = productos.values(
+            "id", "codigo", "nombre", "stock_actual", "unidad_medida",
+            "pronostico__ultimo_movimiento", "pronostico__dias_cobertura",
+            "pronostico__consumo_suavizado",
+        )
+        alertas = [construir(fila) for fila in filas]
+        if not alertas:
+            return {"creadas": 0, "existentes": existentes}
+
+        Alerta.objects.bulk_create(alertas, batch_size=500)
+        version_tras_escritura("alertas")
+        invalidar_tras_escritura("alertas")
+
+        if config.enviar_correo:
+            # MySQL no devuelve los ids de bulk_create: se leen las pendientes de envío
+            pendientes = Alerta.objects.filter(
+                tipo=tipo,
+                producto_id__in=[alerta.producto_id for alerta in alertas],
+                enviar_correo=True,
+                correo_enviado=False,
+            )
+            for alerta in pendientes:
+                self._enviar_correo_alerta(alerta)
+
+        return {"creadas": len(alertas), "existentes": existentes}
+
+    def _vencimientos(self, lotes, productos):
+        """Unificar lotes y productos sin lotes como (producto, lote, fecha)"""
+        for lote in lotes:
+            yield lote.producto, lote, lote.fecha_vencimiento
+        for producto in productos:
+            yield producto, None, producto.fecha_vencimiento
+
+    def _crear_alerta_vencimiento(self, config, tipo, nivel, producto, lote, titulo, mensaje):
+        """Crear una alerta de vencimiento para un lote o producto si corresponde"""
+        alerta_existente = Alerta.objects.filter(
+            producto=producto, lote=lote, tipo=tipo, activa=True
+        ).exists()
+
+        if alerta_existente and not config.repetible:
+            return None
+
+        alerta = Alerta(
+            tipo=tipo,
+            nivel=nivel,
+            titulo=titulo,
+            mensaje=mensaje,
+            producto=producto,
+            lote=lote,
+            auto_generada=True,
+            enviar_correo=config.enviar_correo,
+        )
+        alerta.save()
+
+        if config.enviar_correo:
+            self._enviar_correo_alerta(alerta)
+
+        return alerta
 
     def _auto_resolver_alertas(self):
         """Auto-resolver alertas cuando se cumplan las condiciones"""
+        # La condición se evalúa en SQL: no se carga el producto de cada alerta
+        # y solo se leen las columnas que cambia marcar_como_atendida, que
+        # guarda únicamente esas (save() con campos diferidos)
         alertas_auto_resolubles = Alerta.objects.filter(
-            activa=True,
-            tipo__in=["STOCK_CRITICO", "STOCK_AGOTADO"],
-            producto__isnull=False,
-        )
+            condicion_auto_resoluble(), activa=True
+        ).only("id", "estado", "fecha_atencion", "atendida_por", "activa")
 
         alertas_resueltas = 0
         for alerta in alertas_auto_resolubles:
-            if alerta.puede_auto_resolver:
-                alerta.marcar_como_atendida()
-                alertas_resueltas += 1
-
-                # Crear historial
-                HistorialAlerta.objects.create(
-                    alerta=alerta,
-                    campo_modificado="estado",
-                    valor_anterior=alerta.estado,
-                    valor_nuevo="ATENDIDA",
-                    modificado_por=None,  # Sistema
-                )
+            # marcar_como_atendida registra el cambio en el historial
+            alerta.marcar_como_atendida()
+            alertas_resueltas += 1
 
         return {"resueltas": alertas_resueltas}
 
     def _obtener_configuracion(self, tipo_alerta):
         """Obtener configuración para un tipo de alerta"""
-        try:
-            return ConfiguracionAlerta.objects.get(tipo_alerta=tipo_alerta)
-        except ConfiguracionAlerta.DoesNotExist:
+        config = obtener_configuracion(tipo_alerta)
+        if config is None:
             logger.warning(f"Configuración no encontrada para {tipo_alerta}")
-            return None
+        return config
 
     def _determinar_nivel_stock(self, porcentaje_stock, config):
         """Determinar nivel de alerta basado en porcentaje de stock"""
@@ -1,14 +1,26 @@
-from django.test import TestCase
+import asyncio
+import json
+import re
+from contextlib import asynccontextmanager
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
 
 from django.test import TestCase
 from django.contrib.auth.models import User
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from rest_framework import status
 from datetime import datetime, timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from .models import Alerta, ConfiguracionAlerta
-from Productos.models import Producto, CategoriaProducto
+from .eventos import feed_alertas
+from .models import Alerta, ConfiguracionAlerta, HistorialAlerta, PerfilConfiguracionAlerta
+from .serializers import AlertaListSerializer, AlertaListValores
+from .services import AlertaService
+from Productos.models import Producto, CategoriaProducto, LoteProducto
 
 
 class AlertaModelTests(TestCase):
@@ -144,6 +156,19 @@ class AlertaAPITests(APITestCase):
         self.assertEqual(self.alerta.estado, "LEIDA")
         self.assertIsNotNone(self.alerta.fecha_lectura)
 
+    def test_lista_alertas_condicional(self):
+        """Test para GET condicional de alertas invalidado por señales"""
+        url = "/api/alertas/alertas/"
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alerta.marcar_como_leida(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_resumen_alertas(self):
         """Test para endpoint de resumen de alertas"""
         url = "/api/alertas/alertas/resumen/"
@@ -190,6 +215,9 @@ class AlertaServiceTests(TestCase):
         )
 
         # Crear configuraciones
+        from .services import configuraciones_alerta
+
+        self.addCleanup(configuraciones_alerta.invalidar)
         ConfiguracionAlerta.objects.create(
             tipo_alerta="STOCK_CRITICO", activa=True, auto_generar=True
         )
@@ -225,5 +253,586 @@ class AlertaServiceTests(TestCase):
             ).exists()
         )
 
+    def test_revision_vencimiento_por_lote(self):
+        """Test para alertas de vencimiento generadas por cada lote"""
+        from .services import AlertaService
+
+        ConfiguracionAlerta.objects.create(
+            tipo_alerta="PROXIMO_VENCIMIENTO", activa=True, repetible=False
+        )
+        hoy = timezone.now().date()
+        lote_cercano = LoteProducto.objects.create(
+            producto=self.producto_critico,
+            lote="L-01",
+            cantidad=5,
+            fecha_vencimiento=hoy + timedelta(days=3),
+        )
+        LoteProducto.objects.create(
+            producto=self.producto_critico,
+            lote="L-02",
+            cantidad=5,
+            fecha_vencimiento=hoy + timedelta(days=120),
+        )
+
+        alerta_service = AlertaService()
+        resultados = alerta_service._revisar_proximos_vencer()
+
+        self.assertEqual(resultados["creadas"], 1)
+        alerta = Alerta.objects.get(tipo="PROXIMO_VENCIMIENTO")
+        self.assertEqual(alerta.lote, lote_cercano)
+        self.assertEqual(alerta.nivel, "ALTA")
+
+        # Sin repetición no se duplica la alerta del mismo lote
+        self.assertEqual(alerta_service._revisar_proximos_vencer()["creadas"], 0)
+
+    @override_settings(PRONOSTICO_DIAS_SIN_MOVIMIENTOS=90, PRONOSTICO_DIAS_COBERTURA=14)
+    def test_revision_pronostico_en_bloque(self):
+        """Alertas de productos sin movimientos y de cobertura baja creadas en bloque"""
+        from movimientos.models import PronosticoConsumo
+
+        ConfiguracionAlerta.objects.create(
+            tipo_alerta="SIN_MOVIMIENTOS", activa=True, repetible=False, nivel_predeterminado="BAJA"
+        )
+        ConfiguracionAlerta.objects.create(
+            tipo_alerta="INVENTARIO_BAJO", activa=True, repetible=False
+        )
+        hoy = timezone.localdate()
+
+        def producto(codigo, stock, ultimo, cobertura):
+            nuevo = Producto.objects.create(
+                codigo=codigo, nombre=f"Producto {codigo}", categoria=self.categoria,
+                stock_actual=stock, stock_minimo=10, unidad_medida="KG",
+                precio_compra=10, precio_venta=15,
+            )
+            PronosticoConsumo.objects.create(
+                producto=nuevo, consumo_promedio=1, consumo_suavizado=1,
+                dias_cobertura=cobertura, ultimo_movimiento=ultimo, fecha_calculo=timezone.now(),
+            )
+            return nuevo
+
+        quieto = producto("QUIETO001", 50, hoy - timedelta(days=120), None)
+        urgente = producto("URGENTE001", 30, hoy, 3)
+        pronto = producto("PRONTO001", 30, hoy, 10)
+        producto("HOLGADO001", 30, hoy, 40)
+        # Por debajo del mínimo ya lo cubre la alerta de stock crítico
+        producto("BAJO001", 5, hoy, 2)
+
+        alerta_service = AlertaService()
+        with CaptureQueriesContext(connection) as consultas:
+            resultados = alerta_service.revisar_pronostico()
+        inserciones = [q for q in consultas.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserciones), 2)
+
+        self.assertEqual(resultados["sin_movimientos"]["creadas"], 1)
+        self.assertEqual(resultados["inventario_bajo"]["creadas"], 2)
+        sin_movimientos = Alerta.objects.get(tipo="SIN_MOVIMIENTOS")
+        self.assertEqual(sin_movimientos.producto, quieto)
+        self.assertEqual(sin_movimientos.nivel, "BAJA")
+        niveles = dict(
+            Alerta.objects.filter(tipo="INVENTARIO_BAJO").values_list("producto", "nivel")
+        )
+        self.assertEqual(niveles, {urgente.pk: "ALTA", pronto.pk: "MEDIA"})
+
+        # Sin repetición la segunda revisión no duplica
+        resultados = alerta_service.revisar_pronostico()
+        self.assertEqual(resultados["sin_movimientos"]["creadas"], 0)
+        self.assertEqual(resultados["inventario_bajo"]["creadas"], 0)
+
+
+class ConfiguracionCacheTests(TestCase):
+    def setUp(self):
+        from .services import configuraciones_alerta
+
+        self.cache = configuraciones_alerta
+        self.addCleanup(self.cache.invalidar)
+        self.config = ConfiguracionAlerta.objects.create(
+            tipo_alerta="STOCK_CRITICO", activa=True, auto_generar=True
+        )
+        ConfiguracionAlerta.objects.create(tipo_alerta="STOCK_AGOTADO")
+        self.categoria = CategoriaProducto.objects.create(
+            nombre="Semillas Config", tipo="SEMILLA"
+        )
+
+    def test_configuraciones_en_una_consulta(self):
+        """Test para carga única de todas las configuraciones"""
+        with self.assertNumQueries(1):
+            self.cache.obtener("STOCK_CRITICO")
+            self.cache.obtener("STOCK_AGOTADO")
+            self.cache.obtener("PRODUCTO_VENCIDO")
+
+    def test_guardar_producto_sin_consultar_configuracion(self):
+        """Test para ruta de escritura sin consultas de configuración"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.cache.obtener("STOCK_CRITICO")
+        with CaptureQueriesContext(connection) as consultas:
+            Producto.objects.create(
+                codigo="CONF001",
+                nombre="Producto Config",
+                categoria=self.categoria,
+                stock_actual=1,
+                stock_minimo=10,
+                unidad_medida="KG",
+                precio_compra=10,
+                precio_venta=15,
+            )
+        tabla = ConfiguracionAlerta._meta.db_table
+        self.assertFalse(any(tabla in q["sql"] for q in consultas.captured_queries))
+        self.assertTrue(Alerta.objects.filter(tipo="STOCK_CRITICO").exists())
+
+    def test_guardar_configuracion_invalida_cache(self):
+        """Test para recarga tras guardar una configuración"""
+        self.assertTrue(self.cache.obtener("STOCK_CRITICO").activa)
+        self.config.activa = False
+        self.config.save()
+        self.assertFalse(self.cache.obtener("STOCK_CRITICO").activa)
+
+    def test_resetear_configuraciones_invalida_cache(self):
+        """Test para recarga tras resetear configuraciones"""
+        self.config.activa = False
+        self.config.save()
+        self.assertFalse(self.cache.obtener("STOCK_CRITICO").activa)
+
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.post(
+                    "/api/alertas/configuraciones/resetear_configuraciones/"
+                )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        tabla = ConfiguracionAlerta._meta.db_table
+        self.assertEqual(
+            [q["sql"].split()[0] for q in consultas.captured_queries if tabla in q["sql"]],
+            ["UPDATE"],
+        )
+        with self.assertNumQueries(1):
+            self.assertTrue(self.cache.obtener("STOCK_CRITICO").activa)
+
+    def test_activar_perfil_versionado(self):
+        """Test para versiones de perfil aplicadas de forma atómica"""
+        datos = {"nombre": "temporada-seca", "dias_aviso_vencimiento": 45}
+        v1 = self.client.post("/api/alertas/perfiles/", datos).data
+        v2 = self.client.post(
+            "/api/alertas/perfiles/", {**datos, "dias_aviso_vencimiento": 60}
+        ).data
+        self.assertEqual((v1["version"], v2["version"]), (1, 2))
+
+        self.cache.obtener("STOCK_CRITICO")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/alertas/perfiles/{v2['id']}/activar/")
+        self.assertEqual(response.data["configuraciones_actualizadas"], 2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.cache.obtener("STOCK_CRITICO").dias_aviso_vencimiento, 60)
+            self.assertEqual(self.cache.obtener("STOCK_AGOTADO").dias_aviso_vencimiento, 60)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/alertas/perfiles/{v1['id']}/activar/")
+        self.assertEqual(
+            list(
+                PerfilConfiguracionAlerta.objects.filter(en_uso=True).values_list(
+                    "version", flat=True
+                )
+            ),
+            [1],
+        )
+        self.assertEqual(self.cache.obtener("STOCK_CRITICO").dias_aviso_vencimiento, 45)
+
+
+class AlertaAsincronaTests(APITestCase):
+    """Las vistas ASGI devuelven lo mismo que las de DRF"""
+
+    def setUp(self):
+        categoria = CategoriaProducto.objects.create(nombre="Semillas async", tipo="SEMILLA")
+        producto = Producto.objects.create(
+            codigo="ASY001",
+            nombre="Producto async",
+            categoria=categoria,
+            stock_actual=5,
+            stock_minimo=10,
+            unidad_medida="KG",
+            precio_compra=10.50,
+            precio_venta=15.75,
+        )
+        for numero, (nivel, estado) in enumerate(
+            [("URGENTE", "PENDIENTE"), ("ALTA", "LEIDA"), ("MEDIA", "ATENDIDA")] * 4
+        ):
+            alerta = Alerta.objects.create(
+                tipo="STOCK_CRITICO" if numero % 2 else "STOCK_AGOTADO",
+                nivel=nivel,
+                estado=estado,
+                titulo=f"Alerta async {numero}",
+                mensaje="Mensaje",
+                producto=producto,
+            )
+            if estado == "ATENDIDA":
+                Alerta.objects.filter(pk=alerta.pk).update(
+                    fecha_resolucion=alerta.fecha_creacion + timedelta(days=numero)
+                )
+
+    async def test_lista_igual_que_drf(self):
+        for consulta in ("", "?page=2", "?nivel=URGENTE", "?urgente=true&incluir_inactivas=true"):
+            sincrona = await self.async_client.get(f"/api/alertas/alertas/{consulta}")
+            asincrona = await self.async_client.get(f"/api/alertas/async/alertas/{consulta}")
+            self.assertEqual(asincrona.status_code, 200)
+            self.assertEqual(
+                json.loads(asincrona.content)["results"], json.loads(sincrona.content)["results"]
+            )
+        self.assertEqual(
+            (await self.async_client.get("/api/alertas/async/alertas/?producto=abc")).status_code, 400
+        )
+
+    async def test_resumen_igual_que_drf(self):
+        sincrona = await self.async_client.get("/api/alertas/alertas/resumen/")
+        asincrona = await self.async_client.get("/api/alertas/async/alertas/resumen/")
+        self.assertEqual(asincrona.content, sincrona.content)
+        self.assertEqual(json.loads(asincrona.content)["alertas_pendientes"], 4)
+
+
+
+class AlertaSerializacionValoresTests(APITestCase):
+    """El listado por values() produce los mismos bytes que AlertaListSerializer"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(username="valores", password="x")
+        categoria = CategoriaProducto.objects.create(nombre="Semillas valores", tipo="SEMILLA")
+        producto = Producto.objects.create(
+            codigo="VAL001",
+            nombre="Producto valores",
+            categoria=categoria,
+            stock_actual=5,
+            stock_minimo=10,
+            unidad_medida="KG",
+            precio_compra=10.50,
+            precio_venta=15.75,
+        )
+        casos = [
+            ("URGENTE", "PENDIENTE", 0), ("ALTA", "PENDIENTE", 3), ("ALTA", "PENDIENTE", 1),
+            ("MEDIA", "PENDIENTE", 8), ("MEDIA", "LEIDA", 8), ("BAJA", "ATENDIDA", 30),
+        ]
+        for numero, (nivel, estado, dias) in enumerate(casos):
+            alerta = Alerta.objects.create(
+                tipo="STOCK_CRITICO",
+                nivel=nivel,
+                estado=estado,
+                titulo=f"Alerta valores {numero}",
+                mensaje="Mensaje \u2028 con ñ",
+                producto=producto if numero % 2 else None,
+                creada_por=self.usuario if numero % 3 else None,
+            )
+            Alerta.objects.filter(pk=alerta.pk).update(
+                fecha_creacion=timezone.now() - timedelta(days=dias, hours=1)
+            )
+
+    def test_misma_salida_que_el_serializer(self):
+        queryset = Alerta.objects.select_related("producto", "creada_por").order_by("id")
+        rapida = AlertaListValores()
+        with self.assertNumQueries(1):
+            datos = rapida.representar(rapida.consulta(queryset))
+        self.assertEqual(
+            [(fila["dias_pendiente"], fila["es_urgente"]) for fila in datos],
+            [(0, True), (3, True), (1, False), (8, True), (0, False), (0, False)],
+        )
+        self.assertEqual(
+            JSONRenderer().render(datos),
+            JSONRenderer().render(AlertaListSerializer(queryset, many=True).data),
+        )
+
+    def test_endpoint_igual_con_y_sin_serializacion_valores(self):
+        for consulta in ("", "?nivel=ALTA", "?urgente=true"):
+            rapida = self.client.get(f"/api/alertas/alertas/{consulta}")
+            with override_settings(SERIALIZACION_VALORES=False):
+                estandar = self.client.get(f"/api/alertas/alertas/{consulta}")
+            self.assertEqual(rapida.status_code, status.HTTP_200_OK)
+            self.assertEqual(rapida.content, estandar.content)
+
+
+class AlertaUrgenciaSQLTests(APITestCase):
+    """Urgencia, días pendientes y severidad calculados por la base de datos"""
+
+    def setUp(self):
+        categoria = CategoriaProducto.objects.create(nombre="Semillas rango", tipo="SEMILLA")
+        self.producto = Producto.objects.create(
+            codigo="RAN001",
+            nombre="Producto rango",
+            categoria=categoria,
+            stock_actual=50,
+            stock_minimo=10,
+            unidad_medida="KG",
+            precio_compra=10.50,
+            precio_venta=15.75,
+        )
+        casos = [
+            ("BAJA", "PENDIENTE", 20), ("URGENTE", "LEIDA", 0), ("ALTA", "PENDIENTE", 3),
+            ("ALTA", "PENDIENTE", 2), ("MEDIA", "PENDIENTE", 8), ("MEDIA", "ATENDIDA", 9),
+        ]
+        for numero, (nivel, estado, dias) in enumerate(casos):
+            alerta = Alerta.objects.create(
+                tipo="STOCK_CRITICO" if numero % 2 else "STOCK_AGOTADO",
+                nivel=nivel,
+                estado=estado,
+                titulo=f"Alerta rango {numero}",
+                mensaje="Mensaje",
+                producto=self.producto if numero < 4 else None,
+            )
+            Alerta.objects.filter(pk=alerta.pk).update(
+                fecha_creacion=timezone.now() - timedelta(days=dias, hours=1)
+            )
+
+    def test_anotaciones_igual_que_propiedades(self):
+        anotadas = list(Alerta.objects.con_urgencia().con_auto_resolucion())
+        for alerta in anotadas:
+            fresca = Alerta.objects.select_related("producto").get(pk=alerta.pk)
+            self.assertEqual(
+                (alerta.dias_pendiente, alerta.es_urgente, alerta.puede_auto_resolver),
+                (fresca.dias_pendiente, fresca.es_urgente, fresca.puede_auto_resolver),
+            )
+        self.assertEqual(sum(alerta.es_urgente for alerta in anotadas), 3)
+
+    def test_nivel_rango_sigue_al_nivel(self):
+        alerta = Alerta.objects.get(titulo="Alerta rango 0")
+        self.assertEqual(alerta.nivel_rango, 1)
+        Alerta.objects.filter(pk=alerta.pk).update(nivel="URGENTE")
+        self.assertEqual(Alerta.objects.get(pk=alerta.pk).nivel_rango, 4)
+
+    def test_ordenar_por_severidad(self):
+        response = self.client.get("/api/alertas/alertas/?ordering=-nivel&incluir_inactivas=true")
+        niveles = [fila["nivel"] for fila in response.data["results"]]
+        self.assertEqual(niveles, ["URGENTE", "ALTA", "ALTA", "MEDIA", "MEDIA", "BAJA"])
+
+    def test_filtro_urgente_y_pendientes_urgentes(self):
+        response = self.client.get("/api/alertas/alertas/?urgente=true")
+        self.assertEqual(
+            sorted(fila["titulo"] for fila in response.data["results"]),
+            ["Alerta rango 1", "Alerta rango 2", "Alerta rango 4"],
+        )
+        self.assertTrue(all(fila["es_urgente"] for fila in response.data["results"]))
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get("/api/alertas/alertas/pendientes_urgentes/")
+        self.assertEqual(
+            [fila["titulo"] for fila in response.data["results"]], ["Alerta rango 2", "Alerta rango 4"]
+        )
+        pagina = next(
+            consulta["sql"] for consulta in consultas.captured_queries
+            if 'FROM "Alertas_alerta"' in consulta["sql"] and "LIMIT" in consulta["sql"]
+        )
+        self.assertIn('ORDER BY "Alertas_alerta"."nivel_rango" DESC', pagina)
+
+    def test_auto_resolver_sin_cargar_productos(self):
+        Producto.objects.filter(pk=self.producto.pk).update(stock_actual=5)
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = AlertaService()._auto_resolver_alertas()
+        # Con stock 5 (mínimo 10) se resuelven las de stock agotado, no las de stock crítico
+        self.assertEqual(resultado, {"resueltas": 2})
+        self.assertFalse(
+            any('FROM "Productos_producto"' in consulta["sql"] for consulta in consultas.captured_queries)
+        )
+        # Solo se leen y se guardan las columnas que cambia la transición
+        seleccion, actualizacion = consultas.captured_queries[0]["sql"], consultas.captured_queries[1]["sql"]
+        self.assertNotIn('"mensaje"', seleccion)
+        self.assertTrue(actualizacion.startswith("UPDATE"))
+        self.assertNotIn('"mensaje"', actualizacion)
+
+
+def _columnas_leidas(sql):
+    """Columnas ``tabla.columna`` de la lista SELECT de una consulta"""
+    seleccion = sql.split(" FROM ", 1)[0]
+    return {f"{tabla}.{columna}" for tabla, columna in re.findall(r'"(\w+)"\."(\w+)"', seleccion)}
+
+
+class AlertaPlanConsultaTests(APITestCase):
+    """Cada acción de AlertaViewSet une y lee solo lo que serializa"""
+
+    def setUp(self):
+        usuario = User.objects.create_user(username="plan", password="x", email="plan@example.com")
+        categoria = CategoriaProducto.objects.create(nombre="Semillas plan", tipo="SEMILLA")
+        producto = Producto.objects.create(
+            codigo="PLN001",
+            nombre="Producto plan",
+            descripcion="Descripción larga",
+            categoria=categoria,
+            stock_actual=5,
+            stock_minimo=10,
+            unidad_medida="KG",
+            precio_compra=10.50,
+            precio_venta=15.75,
+        )
+        self.alerta = Alerta.objects.create(
+            tipo="STOCK_CRITICO", nivel="URGENTE", titulo="Alerta plan", mensaje="Mensaje",
+            producto=producto, creada_por=usuario,
+        )
+        self.alerta.marcar_como_leida(usuario)
+        Alerta.objects.create(tipo="STOCK_AGOTADO", nivel="ALTA", titulo="Otra", mensaje="Mensaje")
+
+    def _consultas(self, metodo, url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = getattr(self.client, metodo)(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sql = [consulta["sql"] for consulta in consultas.captured_queries]
+        lecturas = [consulta for consulta in sql if consulta.startswith("SELECT")]
+        self.assertFalse(any("Alertas_historialalerta" in consulta for consulta in lecturas))
+        return response, sql
+
+    def test_list_lee_solo_las_columnas_del_listado(self):
+        for valores in (True, False):
+            with self.subTest(serializacion_valores=valores), override_settings(SERIALIZACION_VALORES=valores):
+                _, sql = self._consultas("get", "/api/alertas/alertas/")
+                # versión de alertas, versión de productos, conteo y página
+                self.assertEqual(len(sql), 4)
+                columnas = _columnas_leidas(sql[-1])
+                self.assertTrue({
+                    "Alertas_alerta.mensaje", "Productos_producto.nombre", "auth_user.username",
+                } <= columnas)
+                self.assertFalse({
+                    "Alertas_alerta.lote_id", "Alertas_alerta.proveedor_id", "Alertas_alerta.leida_por_id",
+                    "Alertas_alerta.fecha_envio_correo", "Productos_producto.descripcion",
+                    "auth_user.password",
+                } & columnas)
+                self.assertEqual(sql[-1].count(" JOIN "), 2)
+
+    def test_detalle_une_los_usuarios_sin_leer_sus_credenciales(self):
+        response, sql = self._consultas("get", f"/api/alertas/alertas/{self.alerta.pk}/")
+        self.assertEqual(len(sql), 1)
+        self.assertEqual(response.data["leida_por_username"], "plan")
+        self.assertTrue(response.data["es_urgente"])
+        self.assertFalse(response.data["puede_auto_resolver"])
+        columnas = _columnas_leidas(sql[0])
+        self.assertIn("Alertas_alerta.fecha_envio_correo", columnas)
+        self.assertEqual(
+            {columna for columna in columnas if columna.startswith("Productos_producto.")},
+            {"Productos_producto.id", "Productos_producto.nombre", "Productos_producto.codigo",
+             "Productos_producto.stock_actual", "Productos_producto.stock_minimo"},
+        )
+        self.assertFalse({"auth_user.password", "auth_user.email"} & columnas)
+
+    def test_transicion_lee_guarda_y_registra(self):
+        otra = Alerta.objects.get(titulo="Otra")
+        response, sql = self._consultas("post", f"/api/alertas/alertas/{otra.pk}/marcar_leida/")
+        # lectura con joins, UPDATE de la alerta e INSERT en el historial
+        self.assertEqual([consulta.split(" ", 1)[0] for consulta in sql], ["SELECT", "UPDATE", "INSERT"])
+        self.assertEqual(response.data["estado"], "LEIDA")
+        self.assertEqual(response.data["dias_pendiente"], 0)
+
+    def test_resumen_y_limpieza_sin_joins(self):
+        _, sql = self._consultas("get", "/api/alertas/alertas/resumen/")
+        self.assertFalse(any(" JOIN " in consulta for consulta in sql))
+
+        Alerta.objects.filter(pk=self.alerta.pk).update(
+            estado="ATENDIDA", fecha_creacion=timezone.now() - timedelta(days=120)
+        )
+        response, sql = self._consultas("post", "/api/alertas/alertas/limpiar_antiguas/")
+        self.assertEqual(response.data["alertas_eliminadas"], 1)
+        self.assertFalse(any(" JOIN " in consulta for consulta in sql))
+        seleccion = next(consulta for consulta in sql if consulta.startswith('SELECT "Alertas_alerta"'))
+        self.assertEqual(_columnas_leidas(seleccion), {"Alertas_alerta.id"})
+
+
+@override_settings(ALERTAS_EVENTOS_INTERVALO=0.01)
+class EventosAlertasTests(APITestCase):
+    def setUp(self):
+        feed_alertas.reiniciar()
+        self.addCleanup(feed_alertas.reiniciar)
+        categoria = CategoriaProducto.objects.create(nombre="Semillas SSE", tipo="SEMILLA")
+        self.producto = Producto.objects.create(
+            codigo="SSE001",
+            nombre="Producto SSE",
+            categoria=categoria,
+            stock_actual=5,
+            stock_minimo=10,
+            unidad_medida="KG",
+            precio_compra=10,
+            precio_venta=15,
+        )
+        self.alerta = Alerta.objects.create(
+            tipo="STOCK_CRITICO", nivel="ALTA", titulo="Previa", mensaje="Previa", producto=self.producto
+        )
+
+    @asynccontextmanager
+    async def abrir(self, **extra):
+        response = await self.async_client.get("/api/alertas/async/alertas/eventos/", **extra)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        flujo = aiter(response.streaming_content)
+        try:
+            self.assertTrue((await anext(flujo)).startswith(b"retry: "))
+            yield flujo
+        finally:
+            # Cerrar el generador de la vista para que cancele su suscripción
+            await response._iterator.aclose()
+
+    async def siguiente_evento(self, flujo):
+        while True:
+            fragmento = (await asyncio.wait_for(anext(flujo), 5)).decode()
+            if not fragmento.startswith(":"):
+                lineas = dict(linea.split(": ", 1) for linea in fragmento.strip().splitlines())
+                return lineas["id"], lineas["event"], json.loads(lineas["data"])
+
+    def crear_alerta(self, titulo):
+        return Alerta.objects.create(
+            tipo="STOCK_CRITICO", nivel="ALTA", titulo=titulo, mensaje=titulo, producto=self.producto
+        )
+
+    def confirmar(self, funcion, *args):
+        """Ejecutar ``funcion`` y sus on_commit en el hilo del ORM"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return funcion(*args)
+
+    # Sin sondeos tras el inicial: los eventos solo llegan por las señales
+    @override_settings(ALERTAS_EVENTOS_INTERVALO=60)
+    async def test_creacion_y_transicion_en_directo(self):
+        async with self.abrir() as flujo:
+            nueva = await sync_to_async(self.confirmar)(self.crear_alerta, "Nueva")
+            _, evento, datos = await self.siguiente_evento(flujo)
+            self.assertEqual((evento, datos["titulo"]), ("alerta_creada", "Nueva"))
+
+            await sync_to_async(self.confirmar)(nueva.marcar_como_leida)
+            id_evento, evento, datos = await self.siguiente_evento(flujo)
+        self.assertEqual(evento, "alerta_transicion")
+        self.assertEqual((datos["valor_anterior"], datos["valor_nuevo"]), ("PENDIENTE", "LEIDA"))
+        historial = await HistorialAlerta.objects.aget()
+        self.assertEqual(id_evento, f"{nueva.pk}-{historial.pk}")
+
+    async def test_sondeo_entrega_escrituras_de_otros_procesos(self):
+        async with self.abrir() as flujo:
+            # Sin ejecutar on_commit la señal no publica: solo el sondeo la ve
+            await sync_to_async(self.crear_alerta)("Otro worker")
+            _, evento, datos = await self.siguiente_evento(flujo)
+        self.assertEqual((evento, datos["titulo"]), ("alerta_creada", "Otro worker"))
+
+    async def test_reconexion_recupera_desde_last_event_id(self):
+        await sync_to_async(self.crear_alerta)("Perdida")
+        async with self.abrir(headers={"Last-Event-ID": f"{self.alerta.pk}-0"}) as flujo:
+            _, evento, datos = await self.siguiente_evento(flujo)
+        self.assertEqual((evento, datos["titulo"]), ("alerta_creada", "Perdida"))
+
+    def test_sondeo_entrega_filas_confirmadas_tarde(self):
+        """Una fila con id menor que el cursor, confirmada después, también se publica"""
+        from .eventos import eventos_desde
+
+        feed_alertas._nuevos()
+        base = self.alerta.pk
+        Alerta.objects.create(
+            pk=base + 5, tipo="STOCK_CRITICO", nivel="ALTA", titulo="Rápida", mensaje="Rápida",
+            producto=self.producto,
+        )
+        self.assertEqual([e["datos"]["titulo"] for e in feed_alertas._nuevos()], ["Rápida"])
+
+        # Su transacción reservó el id antes pero confirmó después
+        Alerta.objects.create(
+            pk=base + 2, tipo="STOCK_CRITICO", nivel="ALTA", titulo="Lenta", mensaje="Lenta",
+            producto=self.producto,
+        )
+        self.assertEqual([e["datos"]["titulo"] for e in feed_alertas._nuevos()], ["Lenta"])
+        self.assertEqual(feed_alertas._nuevos(), [])
+
+        # Una reconexión con el cursor de "Rápida" también la recupera
+        titulos = [e["datos"]["titulo"] for e in eventos_desde({"alerta": base + 5, "historial": 0})]
+        self.assertIn("Lenta", titulos)
 
-# Create your tests here.
+        # Fuera de la ventana de retraso ya no se relee
+        with override_settings(ALERTAS_EVENTOS_RETRASO=0):
+            titulos = [e["datos"]["titulo"] for e in eventos_desde({"alerta": base + 5, "historial": 0})]
+        self.assertNotIn("Lenta", titulos)
@@ -1,12 +1,22 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AlertaViewSet, ConfiguracionAlertaViewSet, HistorialAlertaViewSet
+from . import views_async
+from .views import (
+    AlertaViewSet,
+    ConfiguracionAlertaViewSet,
+    PerfilConfiguracionAlertaViewSet,
+    HistorialAlertaViewSet,
+)
 
 router = DefaultRouter()
 router.register(r'alertas', AlertaViewSet, basename='alertas')
 router.register(r'configuraciones', ConfiguracionAlertaViewSet, basename='configuraciones')
+router.register(r'perfiles', PerfilConfiguracionAlertaViewSet, basename='perfiles')
 router.register(r'historial', HistorialAlertaViewSet, basename='historial')
 
 urlpatterns = [
+    path('async/alertas/', views_async.lista_alertas, name='alertas-async-lista'),
+    path('async/alertas/resumen/', views_async.resumen_alertas, name='alertas-async-resumen'),
+    path('async/alertas/eventos/', views_async.eventos_alertas, name='alertas-eventos'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
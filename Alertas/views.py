@@ -5,28 +5,71 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Avg, F, ExpressionWrapper, fields
+from django.db.models import Count, Avg, F, ExpressionWrapper, fields
 from django.db.models.functions import TruncMonth, Coalesce
 from django.utils import timezone
+from django.db import transaction
 from datetime import timedelta
 from rest_framework.permissions import AllowAny
 import json
 
-from .models import Alerta, ConfiguracionAlerta, HistorialAlerta
+from .models import (
+    Alerta,
+    ConfiguracionAlerta,
+    HistorialAlerta,
+    PerfilConfiguracionAlerta,
+    VALORES_PREDETERMINADOS,
+    condicion_urgente,
+)
 from .serializers import (
     AlertaListSerializer,
+    AlertaListValores,
     AlertaDetailSerializer,
     ConfiguracionAlertaSerializer,
+    PerfilConfiguracionAlertaSerializer,
     HistorialAlertaSerializer, 
     AlertaStatsSerializer,
     CrearAlertaManualSerializer,
 )
 from .filters import AlertaFilter
-from .services import AlertaService
+from .services import AlertaService, configuraciones_alerta
 from rest_framework.pagination import PageNumberPagination
+from comun.cache import cachear_respuesta
+from comun.condicional import respuesta_condicional
+from comun.models import VersionTabla
+from comun.replicas import lectura_replica
+from comun.planes_consulta import PlanConsulta, PlanConsultaMixin
+from comun.serializacion import ListaValoresMixin
+from Productos.views import version_productos
+
+
+def version_alertas():
+    """Versión de la lista de alertas.
+
+    Combina el contador de la tabla de alertas (incrementado por señales),
+    la versión de productos (nombre y código se muestran en la lista) y el
+    minuto actual, porque ``dias_pendiente`` y ``es_urgente`` cambian con
+    el tiempo aunque no haya escrituras.
+    """
+    version, fecha_version = VersionTabla.obtener("alertas")
+    token_productos, fecha_productos = version_productos()
+    minuto = timezone.now().replace(second=0, microsecond=0)
+    ultima = max(
+        fecha for fecha in (fecha_version, fecha_productos, minuto) if fecha
+    )
+    return f"{version}-{token_productos}-{minuto.isoformat()}", ultima
+
+
+# Toda la alerta y, de las relaciones, lo que muestra ``AlertaDetailSerializer``
+PLAN_DETALLE = PlanConsulta(
+    relaciones=("producto", "creada_por", "leida_por", "atendida_por"),
+    # ``puede_auto_resolver`` sale del producto ya unido: no hace falta anotarlo
+    anotaciones=("con_urgencia",),
+    serializer=AlertaDetailSerializer,
+)
 
 
-class AlertaViewSet(viewsets.ModelViewSet):
+class AlertaViewSet(PlanConsultaMixin, ListaValoresMixin, viewsets.ModelViewSet):
     queryset = Alerta.objects.all()
     permission_classes = []  # Sin autenticación requerida
     class StandardResultsSetPagination(PageNumberPagination):
@@ -35,16 +78,29 @@ class AlertaViewSet(viewsets.ModelViewSet):
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = AlertaFilter
+    serializacion_valores = {"list": AlertaListValores}
+    # El resto de acciones (resumen, create...) usa el plan por defecto: sin joins
+    planes_consulta = {
+        "list": PlanConsulta(
+            relaciones=("producto", "creada_por"),
+            anotaciones=("con_urgencia",),
+            serializer=AlertaListSerializer,
+        ),
+        "retrieve": PLAN_DETALLE,
+        "update": PLAN_DETALLE,
+        "partial_update": PLAN_DETALLE,
+        "pendientes_urgentes": PLAN_DETALLE,
+        "marcar_leida": PLAN_DETALLE,
+        "marcar_atendida": PLAN_DETALLE,
+        "descartar": PLAN_DETALLE,
+        "reactivar": PLAN_DETALLE,
+        # Los receptores de post_delete solo necesitan la clave primaria
+        "destroy": PlanConsulta(columnas=("id",)),
+        "limpiar_antiguas": PlanConsulta(columnas=("id",)),
+    }
 
     def get_queryset(self):
-        queryset = Alerta.objects.select_related(
-            "producto",
-            "creada_por",
-            "leida_por",
-            "atendida_por",
-            "proveedor",
-            "movimiento",
-        ).prefetch_related("historial")
+        queryset = self.aplicar_plan_consulta(Alerta.objects.all())
 
         # Filtrar por alertas activas por defecto, a menos que se especifique lo contrario
         if self.request.query_params.get("incluir_inactivas") != "true":
@@ -57,6 +113,10 @@ class AlertaViewSet(viewsets.ModelViewSet):
             return AlertaListSerializer
         return AlertaDetailSerializer
 
+    @respuesta_condicional(version_alertas)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         user = (
             self.request.user if getattr(self.request, "user", None) and self.request.user.is_authenticated else None
@@ -103,6 +163,7 @@ class AlertaViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
+    @lectura_replica
     def resumen(self, request):
         """Resumen de estadísticas de alertas"""
         # Alertas por estado
@@ -111,17 +172,8 @@ class AlertaViewSet(viewsets.ModelViewSet):
         alertas_leidas = self.get_queryset().filter(estado="LEIDA").count()
         alertas_atendidas = self.get_queryset().filter(estado="ATENDIDA").count()
 
-        # Alertas urgentes (nivel URGENTE o ALTA con más de 2 días)
-        alertas_urgentes = (
-            self.get_queryset()
-            .filter(
-                Q(nivel="URGENTE")
-                | Q(
-                    nivel="ALTA", fecha_creacion__lte=timezone.now() - timedelta(days=2)
-                )
-            )
-            .count()
-        )
+        # Alertas urgentes (mismo criterio que ``Alerta.es_urgente``)
+        alertas_urgentes = self.get_queryset().filter(condicion_urgente(timezone.now())).count()
 
         # Alertas por tipo
         por_tipo = (
@@ -191,16 +243,11 @@ class AlertaViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"])
     def pendientes_urgentes(self, request):
         """Alertas pendientes y urgentes"""
+        # Orden por severidad numérica: usa el índice (estado, -nivel_rango, -fecha_creacion)
         alertas_urgentes = (
             self.get_queryset()
-            .filter(estado="PENDIENTE")
-            .filter(
-                Q(nivel="URGENTE")
-                | Q(
-                    nivel="ALTA", fecha_creacion__lte=timezone.now() - timedelta(days=2)
-                )
-            )
-            .order_by("-nivel", "-fecha_creacion")
+            .filter(condicion_urgente(timezone.now()), estado="PENDIENTE")
+            .order_by("-nivel_rango", "-fecha_creacion")
         )
 
         page = self.paginate_queryset(alertas_urgentes)
@@ -276,6 +323,14 @@ class ConfiguracionAlertaViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["activa", "auto_generar"]
 
+    @cachear_respuesta(["configuraciones_alerta"])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cachear_respuesta(["configuraciones_alerta"])
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_update(self, serializer):
         user = (
             self.request.user if getattr(self.request, "user", None) and self.request.user.is_authenticated else None
@@ -285,25 +340,46 @@ class ConfiguracionAlertaViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["post"])
     def resetear_configuraciones(self, request):
         """Resetear configuraciones a valores por defecto"""
-        configuraciones = ConfiguracionAlerta.objects.all()
-
-        for config in configuraciones:
-            config.activa = True
-            config.auto_generar = True
-            config.nivel_predeterminado = "MEDIA"
-            config.enviar_correo = False
-            config.correo_destinatarios = ""
-            config.dias_aviso_vencimiento = 30
-            config.porcentaje_stock_critico = 20.00
-            config.intervalo_revision_horas = 24
-            config.actualizado_por = (
-                request.user if getattr(request, "user", None) and request.user.is_authenticated else None
-            )
-            config.save()
+        usuario = (
+            request.user if getattr(request, "user", None) and request.user.is_authenticated else None
+        )
+        with transaction.atomic():
+            ConfiguracionAlerta.aplicar_valores(VALORES_PREDETERMINADOS, usuario)
+            PerfilConfiguracionAlerta.objects.filter(en_uso=True).update(en_uso=False)
+            transaction.on_commit(configuraciones_alerta.invalidar)
 
         return Response({"mensaje": "Configuraciones reseteadas a valores por defecto"})
 
 
+class PerfilConfiguracionAlertaViewSet(viewsets.ModelViewSet):
+    queryset = PerfilConfiguracionAlerta.objects.all()
+    serializer_class = PerfilConfiguracionAlertaSerializer
+    permission_classes = []  # Sin autenticación requerida
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["nombre", "en_uso"]
+
+    def perform_create(self, serializer):
+        user = (
+            self.request.user if getattr(self.request, "user", None) and self.request.user.is_authenticated else None
+        )
+        serializer.save(creado_por=user)
+
+    @action(detail=True, methods=["post"])
+    def activar(self, request, pk=None):
+        """Aplicar este perfil a todas las configuraciones de alertas"""
+        perfil = self.get_object()
+        user = request.user if getattr(request, "user", None) and request.user.is_authenticated else None
+        actualizadas = perfil.aplicar(user)
+
+        return Response(
+            {
+                "mensaje": f"Perfil {perfil} aplicado",
+                "configuraciones_actualizadas": actualizadas,
+                "perfil": self.get_serializer(perfil).data,
+            }
+        )
+
+
 class HistorialAlertaViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = HistorialAlertaSerializer
     permission_classes = []  # Sin autenticación requerida
@@ -315,5 +391,9 @@ class HistorialAlertaViewSet(viewsets.ReadOnlyModelViewSet):
             "alerta", "modificado_por"
         ).order_by("-fecha_modificacion")
 
+    @lectura_replica
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 
 # Create your views here.
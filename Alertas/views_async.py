@@ -0,0 +1,163 @@
+"""Variantes asíncronas (ASGI) de las lecturas principales de alertas.
+
+Devuelven el mismo JSON que ``AlertaViewSet.list`` y
+``AlertaViewSet.resumen``. Servir con ``config.asgi``. Incluye además el
+flujo SSE de alertas nuevas y cambios de estado.
+"""
+import asyncio
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Avg, Count, ExpressionWrapper, F, Q, fields
+from django.db.models.functions import TruncMonth
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from comun.asincrono import filtrar, paginar, renderizar_json, respuesta_json
+from comun.replicas import lectura_replica
+
+from .eventos import Entregados, cursor_actual, eventos_desde, feed_alertas, leer_cursor
+from .filters import AlertaFilter
+from .models import Alerta, condicion_urgente
+from .serializers import AlertaListSerializer, AlertaStatsSerializer
+from .views import AlertaViewSet
+
+
+def _alertas(request):
+    queryset = Alerta.objects.select_related("producto", "creada_por")
+    if request.GET.get("incluir_inactivas") != "true":
+        queryset = queryset.filter(activa=True)
+    return queryset
+
+
+async def _agrupar(queryset, campo):
+    filas = queryset.values(campo).annotate(total=Count("id")).order_by("-total")
+    return {fila[campo]: fila["total"] async for fila in filas}
+
+
+@require_GET
+async def lista_alertas(request):
+    """Listado paginado de alertas con los filtros de ``AlertaFilter``"""
+    queryset, errores = await filtrar(AlertaFilter, request, _alertas(request).con_urgencia())
+    if errores:
+        return respuesta_json(errores, status=400)
+    datos, status = await paginar(
+        request, queryset, AlertaListSerializer,
+        AlertaViewSet.StandardResultsSetPagination.page_size,
+    )
+    return respuesta_json(datos, status=status)
+
+
+@require_GET
+@lectura_replica
+async def resumen_alertas(request):
+    """Resumen de estadísticas de alertas con los agregados lanzados a la vez.
+
+    Los contadores por estado, las urgentes y el tiempo medio de resolución
+    salen de un único ``aaggregate``; las agrupaciones por tipo, nivel y mes
+    se piden a la vez con ``asyncio.gather``.
+    """
+    alertas = _alertas(request)
+    ahora = timezone.now()
+
+    async def por_mes():
+        filas = (
+            alertas.filter(fecha_creacion__gte=ahora - timedelta(days=180))
+            .annotate(mes=TruncMonth("fecha_creacion"))
+            .values("mes")
+            .annotate(total=Count("id"))
+            .order_by("mes")
+        )
+        return {fila["mes"].strftime("%Y-%m"): fila["total"] async for fila in filas}
+
+    totales, por_tipo, por_nivel, ultimos_meses = await asyncio.gather(
+        alertas.aaggregate(
+            total_alertas=Count("id"),
+            alertas_pendientes=Count("id", filter=Q(estado="PENDIENTE")),
+            alertas_leidas=Count("id", filter=Q(estado="LEIDA")),
+            alertas_atendidas=Count("id", filter=Q(estado="ATENDIDA")),
+            alertas_urgentes=Count("id", filter=condicion_urgente(ahora)),
+            tiempo_promedio=Avg(
+                ExpressionWrapper(
+                    F("fecha_resolucion") - F("fecha_creacion"),
+                    output_field=fields.DurationField(),
+                ),
+                filter=Q(fecha_resolucion__isnull=False),
+            ),
+        ),
+        _agrupar(alertas, "tipo"),
+        _agrupar(alertas, "nivel"),
+        por_mes(),
+    )
+
+    tiempo_promedio = totales.pop("tiempo_promedio")
+    tiempo_promedio_dias = tiempo_promedio.total_seconds() / (24 * 3600) if tiempo_promedio else 0
+    datos = {
+        **totales,
+        "por_tipo": por_tipo,
+        "por_nivel": por_nivel,
+        "tiempo_promedio_resolucion": round(tiempo_promedio_dias, 2),
+        "alertas_ultimos_meses": ultimos_meses,
+    }
+    return respuesta_json(AlertaStatsSerializer(datos).data)
+
+
+def _formatear(evento, entregados):
+    datos = renderizar_json(evento["datos"]).decode()
+    return f"id: {entregados.ultimo_id}\nevent: {evento['evento']}\ndata: {datos}\n\n"
+
+
+async def _flujo_eventos(cursor):
+    # Suscribirse antes de leer la base de datos para no perder eventos
+    # publicados entre la consulta y la suscripción
+    suscripcion = feed_alertas.bus.suscribir()
+    latido = getattr(settings, "ALERTAS_EVENTOS_LATIDO", 15)
+    try:
+        # El primer sondeo del proceso fija desde dónde se sondea
+        await feed_alertas.sondear()
+        if cursor:
+            # Reconexión: recuperar lo ocurrido desde el último evento recibido
+            entregados = Entregados(cursor)
+            recuperados = await sync_to_async(eventos_desde)(cursor)
+        else:
+            entregados = Entregados(await sync_to_async(cursor_actual)())
+            recuperados = []
+
+        yield f"retry: {int(feed_alertas.intervalo * 1000)}\n\n"
+        for evento in recuperados:
+            if entregados.nuevo(evento):
+                yield _formatear(evento, entregados)
+
+        ultimo_envio = time.monotonic()
+        while not suscripcion.desbordada:
+            await feed_alertas.sondear()
+            evento = await suscripcion.siguiente(feed_alertas.intervalo)
+            if evento is not None and entregados.nuevo(evento):
+                ultimo_envio = time.monotonic()
+                yield _formatear(evento, entregados)
+            elif time.monotonic() - ultimo_envio >= latido:
+                # Comentario SSE: mantiene viva la conexión en proxies
+                ultimo_envio = time.monotonic()
+                yield ": latido\n\n"
+    finally:
+        feed_alertas.bus.cancelar(suscripcion)
+
+
+@require_GET
+async def eventos_alertas(request):
+    """Flujo SSE de alertas creadas y transiciones de estado.
+
+    Al reconectar, el navegador envía ``Last-Event-ID`` y el flujo empieza
+    por los eventos que se perdió. ``?desde=<alerta>-<historial>`` hace lo
+    mismo para clientes que no son ``EventSource``.
+    """
+    cursor = leer_cursor(request.headers.get("Last-Event-ID") or request.GET.get("desde"))
+    return StreamingHttpResponse(
+        _flujo_eventos(cursor),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
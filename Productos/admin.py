@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import CategoriaProducto, Producto, HistorialPrecio
+from .models import CategoriaProducto, Producto, LoteProducto, HistorialPrecio
 
 @admin.register(CategoriaProducto)
 class CategoriaProductoAdmin(admin.ModelAdmin):
@@ -13,8 +13,14 @@ class CategoriaProductoAdmin(admin.ModelAdmin):
         return obj.productos.count()
     total_productos.short_description = 'Total Productos'
 
+class LoteProductoInline(admin.TabularInline):
+    model = LoteProducto
+    extra = 0
+    fields = ['lote', 'cantidad', 'fecha_vencimiento', 'activo']
+
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
+    inlines = [LoteProductoInline]
     list_display = [
         'codigo', 'nombre', 'categoria', 'stock_actual', 'stock_minimo', 
         'estado_stock_colored', 'precio_compra', 'precio_venta', 'activo'
@@ -68,8 +74,16 @@ class ProductoAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         if not obj.creado_por:
             obj.creado_por = request.user
+        obj._usuario_cambio = request.user
         super().save_model(request, obj, form, change)
 
+@admin.register(LoteProducto)
+class LoteProductoAdmin(admin.ModelAdmin):
+    list_display = ['lote', 'producto', 'cantidad', 'fecha_vencimiento', 'activo', 'fecha_ingreso']
+    list_filter = ['activo', 'fecha_vencimiento', 'producto__categoria']
+    search_fields = ['lote', 'producto__codigo', 'producto__nombre']
+    readonly_fields = ['fecha_ingreso']
+
 @admin.register(HistorialPrecio)
 class HistorialPrecioAdmin(admin.ModelAdmin):
     list_display = ['producto', 'precio_compra_anterior', 'precio_compra_nuevo', 
@@ -1,6 +1,6 @@
 import django_filters
 from django.db.models import Q, F
-from .models import Producto, CategoriaProducto
+from .models import Producto, CategoriaProducto, LoteProducto
 
 class ProductoFilter(django_filters.FilterSet):
     search = django_filters.CharFilter(method='filter_search')
@@ -62,13 +62,13 @@ class ProductoFilter(django_filters.FilterSet):
         return queryset
     
     def filter_proximo_vencer(self, queryset, name, value):
-        """Filtrar productos próximos a vencer (30 días)"""
+        """Filtrar productos con algún lote próximo a vencer (30 días)"""
         from datetime import date, timedelta
+        from .services import LoteService
         if value:
             fecha_limite = date.today() + timedelta(days=30)
-            return queryset.filter(
-                fecha_vencimiento__lte=fecha_limite,
-                fecha_vencimiento__gte=date.today()
+            return LoteService().filtrar_productos_por_vencimiento(
+                queryset, gte=date.today(), lte=fecha_limite
             )
         return queryset
 
@@ -83,4 +83,16 @@ class CategoriaProductoFilter(django_filters.FilterSet):
         return queryset.filter(
             Q(nombre__icontains=value) |
             Q(descripcion__icontains=value)
-        )
\ No newline at end of file
+        )
+
+class LoteProductoFilter(django_filters.FilterSet):
+    producto_codigo = django_filters.CharFilter(field_name='producto__codigo', lookup_expr='icontains')
+    
+    class Meta:
+        model = LoteProducto
+        fields = {
+            'producto': ['exact'],
+            'lote': ['exact', 'icontains'],
+            'activo': ['exact'],
+            'fecha_vencimiento': ['exact', 'gte', 'lte'],
+        }
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:54
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def crear_lotes_iniciales(apps, schema_editor):
+    """Convertir el lote y vencimiento de cada producto en su primer lote"""
+    Producto = apps.get_model('Productos', 'Producto')
+    LoteProducto = apps.get_model('Productos', 'LoteProducto')
+
+    productos = Producto.objects.filter(
+        fecha_vencimiento__isnull=False, stock_actual__gt=0
+    ).only('id', 'codigo', 'lote', 'stock_actual', 'fecha_vencimiento')
+    LoteProducto.objects.bulk_create(
+        [
+            LoteProducto(
+                producto_id=producto.id,
+                lote=producto.lote or f"{producto.codigo}-INICIAL",
+                cantidad=producto.stock_actual,
+                fecha_vencimiento=producto.fecha_vencimiento,
+            )
+            for producto in productos.iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Productos', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lote', models.CharField(help_text='Número de lote', max_length=100)),
+                ('cantidad', models.DecimalField(decimal_places=3, default=0, help_text='Cantidad disponible en el lote', max_digits=12, validators=[django.core.validators.MinValueValidator(0)])),
+                ('fecha_vencimiento', models.DateField(blank=True, null=True)),
+                ('activo', models.BooleanField(default=True)),
+                ('fecha_ingreso', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Lote de Producto',
+                'verbose_name_plural': 'Lotes de Productos',
+                'ordering': ['fecha_vencimiento', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['activo', 'fecha_vencimiento'], name='Productos_p_activo_3e922f_idx'),
+        ),
+        migrations.AddField(
+            model_name='loteproducto',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lotes', to='Productos.producto'),
+        ),
+        migrations.AddIndex(
+            model_name='loteproducto',
+            index=models.Index(fields=['activo', 'fecha_vencimiento'], name='Productos_l_activo_fce11b_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='loteproducto',
+            constraint=models.UniqueConstraint(fields=('producto', 'lote'), name='lote_unico_por_producto'),
+        ),
+        migrations.RunPython(crear_lotes_iniciales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Productos', '0002_loteproducto'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loteproducto',
+            index=models.Index(fields=['producto', 'activo', 'fecha_vencimiento'], name='Productos_l_product_a10788_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Productos', '0004_producto_fecha_actualizacion_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historialprecio',
+            index=models.Index(fields=['producto', 'fecha_cambio'], name='Productos_h_product_3126fb_idx'),
+        ),
+    ]
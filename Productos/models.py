@@ -1,5 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Cast
 from django.core.validators import MinValueValidator
+from django.utils import timezone
+
+CAMPOS_PRECIO = ('precio_compra', 'precio_venta')
 
 class CategoriaProducto(models.Model):
     TIPO_CHOICES = [
@@ -24,6 +28,101 @@ class CategoriaProducto(models.Model):
     def __str__(self):
         return f"{self.nombre} ({self.get_tipo_display()})"
 
+class ProductoQuerySet(models.QuerySet):
+    def update_con_historial(self, usuario=None, **campos):
+        """``update()`` que registra en ``HistorialPrecio`` los cambios de precio.
+
+        Los precios actuales y los nuevos (las expresiones de ``campos``
+        evaluadas en el mismo SELECT) se leen bloqueando las filas; después
+        se aplica el ``update()`` en una sentencia y el historial se inserta
+        con un único ``bulk_create``. Sin campos de precio equivale a
+        ``update()``. En ambos casos se actualiza ``fecha_actualizacion``,
+        de la que depende el ETag de productos.
+        """
+        campos.setdefault('fecha_actualizacion', timezone.now())
+        precios = [campo for campo in CAMPOS_PRECIO if campo in campos]
+        if not precios:
+            return self.update(**campos)
+
+        salida = models.DecimalField(max_digits=12, decimal_places=2)
+        nuevos = {}
+        for campo in precios:
+            valor = campos[campo]
+            if not hasattr(valor, 'resolve_expression'):
+                valor = models.Value(valor, output_field=salida)
+            # Mismo redondeo que al guardar en la columna DECIMAL(12, 2)
+            nuevos[f'_nuevo_{campo}'] = Cast(valor, salida)
+
+        with transaction.atomic(using=self.db):
+            filas = list(
+                self.select_for_update()
+                .order_by()
+                .annotate(**nuevos)
+                .values_list('pk', *CAMPOS_PRECIO, *nuevos)
+            )
+            actualizados = self.update(**campos)
+
+            registros = []
+            for pk, *valores in filas:
+                anteriores = valores[:len(CAMPOS_PRECIO)]
+                actuales = dict(zip(CAMPOS_PRECIO, anteriores))
+                actuales.update(zip(precios, valores[len(CAMPOS_PRECIO):]))
+                registro = HistorialPrecio.desde_cambio(pk, anteriores, actuales.values(), usuario)
+                if registro is not None:
+                    registros.append(registro)
+            HistorialPrecio.objects.using(self.db).bulk_create(registros, batch_size=1000)
+
+        self._invalidar_cache(pk for pk, *_ in filas)
+        return actualizados
+
+    def bulk_update_con_historial(self, objs, fields, usuario=None, batch_size=None):
+        """``bulk_update()`` que registra los cambios de precio en un único ``bulk_create``.
+
+        Los precios anteriores son los que cada instancia tenía al cargarse;
+        solo los que se cargaron sin ellos se leen en una consulta.
+        """
+        objs = list(objs)
+        if not set(CAMPOS_PRECIO) & set(fields):
+            return self.bulk_update(objs, fields, batch_size=batch_size)
+
+        originales = {obj.pk: obj._precios_originales for obj in objs}
+        sin_original = [pk for pk, precios in originales.items() if precios is None]
+        if sin_original:
+            originales.update(
+                (pk, (compra, venta))
+                for pk, compra, venta in self.model._base_manager.using(self.db)
+                .filter(pk__in=sin_original)
+                .values_list('pk', *CAMPOS_PRECIO)
+            )
+
+        ahora = timezone.now()
+        for obj in objs:
+            obj.fecha_actualizacion = ahora
+        fields = [*fields, *(['fecha_actualizacion'] if 'fecha_actualizacion' not in fields else [])]
+
+        with transaction.atomic(using=self.db):
+            actualizados = self.bulk_update(objs, fields, batch_size=batch_size)
+            registros = []
+            for obj in objs:
+                registro = HistorialPrecio.desde_cambio(
+                    obj.pk, originales[obj.pk], obj.precios_actuales(), usuario
+                )
+                if registro is not None:
+                    registros.append(registro)
+            HistorialPrecio.objects.using(self.db).bulk_create(registros, batch_size=1000)
+
+        for obj in objs:
+            obj._precios_originales = obj.precios_actuales()
+        self._invalidar_cache(obj.pk for obj in objs)
+        return actualizados
+
+    def _invalidar_cache(self, pks):
+        # update() y bulk_update() no envían post_save
+        from comun.signals import invalidar_tras_escritura
+
+        invalidar_tras_escritura('productos', *(f'producto:{pk}' for pk in pks))
+
+
 class Producto(models.Model):
     UNIDAD_CHOICES = [
         ('KG', 'Kilogramos'),
@@ -103,22 +202,56 @@ class Producto(models.Model):
             models.Index(fields=['categoria']),
             models.Index(fields=['estado']),
             models.Index(fields=['fecha_vencimiento']),
+            models.Index(fields=['activo', 'fecha_vencimiento']),
+            models.Index(fields=['fecha_actualizacion']),
         ]
     
+    objects = ProductoQuerySet.as_manager()
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Precios registrados en base de datos, para el historial (None si no se conocen)
+        self._precios_originales = None
+        # Usuario al que se atribuye el próximo cambio de precio
+        self._usuario_cambio = None
+        # Stock registrado en base de datos (None si no se conoce)
+        self._stock_original = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        if all(campo in field_names for campo in CAMPOS_PRECIO):
+            instancia._precios_originales = instancia.precios_actuales()
+        if 'stock_actual' in field_names:
+            instancia._stock_original = instancia.stock_actual
+        return instancia
+    
     def __str__(self):
         return f"{self.codigo} - {self.nombre}"
     
-    @property
-    def estado_stock(self):
-        """Calcula el estado del stock basado en niveles mínimos y máximos"""
-        if self.stock_actual <= 0:
+    def precios_actuales(self):
+        """``(precio_compra, precio_venta)`` normalizados a ``Decimal``"""
+        return tuple(
+            self._meta.get_field(campo).to_python(getattr(self, campo))
+            for campo in CAMPOS_PRECIO
+        )
+    
+    @staticmethod
+    def calcular_estado_stock(stock_actual, stock_minimo, stock_maximo):
+        """Estado del stock a partir de los valores (compartido con la serialización por values())"""
+        if stock_actual <= 0:
             return 'AGOTADO'
-        elif self.stock_actual <= self.stock_minimo:
+        elif stock_actual <= stock_minimo:
             return 'CRITICO'
-        elif self.stock_actual >= self.stock_maximo and self.stock_maximo > 0:
+        elif stock_actual >= stock_maximo and stock_maximo > 0:
             return 'EXCESO'
         else:
             return 'NORMAL'
+
+    @property
+    def estado_stock(self):
+        """Calcula el estado del stock basado en niveles mínimos y máximos"""
+        return self.calcular_estado_stock(self.stock_actual, self.stock_minimo, self.stock_maximo)
     
     @property
     def necesita_reposicion(self):
@@ -151,6 +284,63 @@ class Producto(models.Model):
                 return 'PROXIMO_VENCER'
         return 'NORMAL'
 
+class LoteProducto(models.Model):
+    """Lote de un producto con su propia cantidad y fecha de vencimiento"""
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='lotes')
+    lote = models.CharField(max_length=100, help_text="Número de lote")
+    cantidad = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        default=0,
+        validators=[MinValueValidator(0)],
+        help_text="Cantidad disponible en el lote"
+    )
+    fecha_vencimiento = models.DateField(null=True, blank=True)
+    activo = models.BooleanField(default=True)
+    fecha_ingreso = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Lote de Producto'
+        verbose_name_plural = 'Lotes de Productos'
+        ordering = ['fecha_vencimiento', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'lote'], name='lote_unico_por_producto'),
+        ]
+        indexes = [
+            models.Index(fields=['activo', 'fecha_vencimiento']),
+            models.Index(fields=['producto', 'activo', 'fecha_vencimiento']),
+        ]
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Aporte al stock ya registrado en base de datos (0 para lotes nuevos)
+        self._aporte_stock_original = 0
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        if 'cantidad' in field_names and 'activo' in field_names:
+            instancia._aporte_stock_original = instancia.aporte_stock
+        else:
+            instancia._aporte_stock_original = None
+        return instancia
+    
+    def __str__(self):
+        return f"{self.producto.codigo} - Lote {self.lote}"
+    
+    @property
+    def aporte_stock(self):
+        """Cantidad con la que el lote contribuye al stock del producto"""
+        return self.cantidad if self.activo else 0
+    
+    @property
+    def dias_vencimiento(self):
+        """Calcula los días hasta el vencimiento del lote"""
+        if self.fecha_vencimiento:
+            from datetime import date
+            return (self.fecha_vencimiento - date.today()).days
+        return None
+
 class HistorialPrecio(models.Model):
     """Modelo para trackear cambios de precio"""
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='historial_precios')
@@ -165,6 +355,26 @@ class HistorialPrecio(models.Model):
         verbose_name = 'Historial de Precio'
         verbose_name_plural = 'Historial de Precios'
         ordering = ['-fecha_cambio']
+        indexes = [
+            # Series y filtros por producto en un rango de fechas
+            models.Index(fields=['producto', 'fecha_cambio']),
+        ]
     
     def __str__(self):
-        return f"Cambio precio {self.producto} - {self.fecha_cambio}"
\ No newline at end of file
+        return f"Cambio precio {self.producto} - {self.fecha_cambio}"
+    
+    @classmethod
+    def desde_cambio(cls, producto_id, anteriores, nuevos, usuario=None):
+        """Registro sin guardar para un cambio de ``(precio_compra, precio_venta)``,
+        o ``None`` si los precios no cambiaron"""
+        anteriores, nuevos = tuple(anteriores), tuple(nuevos)
+        if anteriores == nuevos:
+            return None
+        return cls(
+            producto_id=producto_id,
+            precio_compra_anterior=anteriores[0],
+            precio_compra_nuevo=nuevos[0],
+            precio_venta_anterior=anteriores[1],
+            precio_venta_nuevo=nuevos[1],
+            cambiado_por=usuario,
+        )
\ No newline at end of file
@@ -1,6 +1,9 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.utils import timezone
-from .models import CategoriaProducto, Producto, HistorialPrecio
+from comun.serializacion import SerializacionValores
+from .models import CategoriaProducto, Producto, LoteProducto, HistorialPrecio
 
 
 class CategoriaProductoSerializer(serializers.ModelSerializer):
@@ -55,6 +58,30 @@ class ProductoListSerializer(serializers.ModelSerializer):
             "valor_inventario",
             "activo",
         ]
+        # Columnas de las propiedades del modelo (``only()`` en los listados)
+        columnas_requeridas = {
+            "estado_stock": ("stock_actual", "stock_minimo", "stock_maximo"),
+            "necesita_reposicion": ("stock_actual", "stock_minimo"),
+            "valor_inventario": ("stock_actual", "precio_compra"),
+        }
+
+
+_valor_inventario = serializers.DecimalField(max_digits=12, decimal_places=2).to_representation
+
+
+class ProductoListValores(SerializacionValores):
+    """Misma salida que ``ProductoListSerializer`` leyendo filas de ``values()``"""
+
+    serializer_class = ProductoListSerializer
+    calculados = {
+        "estado_stock": lambda fila, contexto: Producto.calcular_estado_stock(
+            fila["stock_actual"], fila["stock_minimo"], fila["stock_maximo"]
+        ),
+        "necesita_reposicion": lambda fila, contexto: fila["stock_actual"] <= fila["stock_minimo"],
+        "valor_inventario": lambda fila, contexto: _valor_inventario(
+            fila["stock_actual"] * fila["precio_compra"]
+        ),
+    }
 
 
 class ProductoDetailSerializer(serializers.ModelSerializer):
@@ -171,33 +198,50 @@ class ProductoDetailSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
-        if "precio_compra" in validated_data or "precio_venta" in validated_data:
-            precio_compra_anterior = instance.precio_compra
-            precio_venta_anterior = instance.precio_venta
-
-            producto = super().update(instance, validated_data)
-
-            if (
-                precio_compra_anterior != producto.precio_compra
-                or precio_venta_anterior != producto.precio_venta
-            ):
-                # Solo registrar historial si hay usuario autenticado
-                request = self.context.get("request")
-                historial_data = {
-                    "producto": producto,
-                    "precio_compra_anterior": precio_compra_anterior,
-                    "precio_compra_nuevo": producto.precio_compra,
-                    "precio_venta_anterior": precio_venta_anterior,
-                    "precio_venta_nuevo": producto.precio_venta,
-                }
-                if request and request.user.is_authenticated:
-                    historial_data["cambiado_por"] = request.user
-                
-                HistorialPrecio.objects.create(**historial_data)
+        # El historial de precios lo registra el modelo al guardar
+        request = self.context.get("request")
+        if request and request.user.is_authenticated:
+            instance._usuario_cambio = request.user
+        return super().update(instance, validated_data)
 
-            return producto
 
-        return super().update(instance, validated_data)
+class LoteProductoSerializer(serializers.ModelSerializer):
+    producto_codigo = serializers.CharField(source="producto.codigo", read_only=True)
+    producto_nombre = serializers.CharField(source="producto.nombre", read_only=True)
+    dias_vencimiento = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = LoteProducto
+        fields = [
+            "id",
+            "producto",
+            "producto_codigo",
+            "producto_nombre",
+            "lote",
+            "cantidad",
+            "fecha_vencimiento",
+            "dias_vencimiento",
+            "activo",
+            "fecha_ingreso",
+        ]
+        read_only_fields = ["fecha_ingreso", "dias_vencimiento"]
+
+    def validate_cantidad(self, value):
+        if value < 0:
+            raise serializers.ValidationError("La cantidad del lote no puede ser negativa")
+        return value
+
+    def validate(self, data):
+        fecha_vencimiento = data.get("fecha_vencimiento")
+        if (
+            self.instance is None
+            and fecha_vencimiento
+            and fecha_vencimiento < timezone.now().date()
+        ):
+            raise serializers.ValidationError(
+                {"fecha_vencimiento": "No se puede registrar un lote ya vencido"}
+            )
+        return data
 
 
 class HistorialPrecioSerializer(serializers.ModelSerializer):
@@ -209,3 +253,88 @@ class HistorialPrecioSerializer(serializers.ModelSerializer):
     class Meta:
         model = HistorialPrecio
         fields = "__all__"
+
+
+class SeriePrecioParametrosSerializer(serializers.Serializer):
+    """Parámetros de la serie de precios: ``?productos=1,2&intervalo=semana``"""
+
+    MAXIMO_PRODUCTOS = 50
+
+    productos = serializers.CharField()
+    intervalo = serializers.ChoiceField(choices=["dia", "semana", "mes"], default="dia")
+    desde = serializers.DateTimeField(required=False)
+    hasta = serializers.DateTimeField(required=False)
+
+    def validate_productos(self, value):
+        try:
+            ids = list(dict.fromkeys(int(valor) for valor in value.split(",") if valor.strip()))
+        except ValueError:
+            raise serializers.ValidationError("Debe ser una lista de IDs separados por comas")
+        if not ids:
+            raise serializers.ValidationError("Indique al menos un producto")
+        if len(ids) > self.MAXIMO_PRODUCTOS:
+            raise serializers.ValidationError(
+                f"Se admiten como máximo {self.MAXIMO_PRODUCTOS} productos por consulta"
+            )
+        return ids
+
+    def validate(self, data):
+        if data.get("desde") and data.get("hasta") and data["desde"] >= data["hasta"]:
+            raise serializers.ValidationError(
+                {"hasta": "Debe ser posterior a la fecha desde"}
+            )
+        return data
+
+
+class PuntoSeriePrecioSerializer(serializers.Serializer):
+    periodo = serializers.DateField()
+    cambios = serializers.IntegerField()
+    precio_compra_ultimo = serializers.DecimalField(max_digits=12, decimal_places=2)
+    precio_compra_minimo = serializers.DecimalField(max_digits=12, decimal_places=2)
+    precio_compra_maximo = serializers.DecimalField(max_digits=12, decimal_places=2)
+    precio_venta_ultimo = serializers.DecimalField(max_digits=12, decimal_places=2)
+    precio_venta_minimo = serializers.DecimalField(max_digits=12, decimal_places=2)
+    precio_venta_maximo = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class SeriePrecioSerializer(serializers.Serializer):
+    producto = serializers.IntegerField()
+    puntos = PuntoSeriePrecioSerializer(many=True)
+
+
+class PorcentajeCategoriaSerializer(serializers.Serializer):
+    categoria = serializers.IntegerField()
+    porcentaje = serializers.DecimalField(
+        max_digits=6, decimal_places=2, min_value=Decimal("-99.99"), max_value=Decimal("1000")
+    )
+
+
+class RevisionPreciosSerializer(serializers.Serializer):
+    """``{"precio": "venta", "categorias": [{"categoria": 1, "porcentaje": "5.00"}]}``"""
+
+    CAMPOS = {
+        "compra": ("precio_compra",),
+        "venta": ("precio_venta",),
+        "ambos": ("precio_compra", "precio_venta"),
+    }
+
+    precio = serializers.ChoiceField(choices=list(CAMPOS), default="venta")
+    categorias = PorcentajeCategoriaSerializer(many=True, allow_empty=False)
+
+    def validate_categorias(self, value):
+        porcentajes = {}
+        for cambio in value:
+            if cambio["categoria"] in porcentajes:
+                raise serializers.ValidationError(
+                    f"La categoría {cambio['categoria']} está repetida"
+                )
+            porcentajes[cambio["categoria"]] = cambio["porcentaje"]
+        existentes = set(
+            CategoriaProducto.objects.filter(pk__in=porcentajes).values_list("pk", flat=True)
+        )
+        faltantes = sorted(set(porcentajes) - existentes)
+        if faltantes:
+            raise serializers.ValidationError(
+                f"Categorías inexistentes: {', '.join(map(str, faltantes))}"
+            )
+        return porcentajes
@@ -0,0 +1,282 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+import logging
+
+from django.db import transaction
+from django.db.models import (
+    Case, Count, DateField, DecimalField, Exists, F, Max, Min, OuterRef, Q, Subquery, Value, When, Window,
+)
+from django.db.models.functions import FirstValue, Round, RowNumber, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import HistorialPrecio, LoteProducto, Producto
+
+logger = logging.getLogger(__name__)
+
+
+class LoteService:
+    """Servicio para la gestión de lotes y del stock derivado de ellos"""
+
+    def ajustar_stock(self, producto_id, delta):
+        """Aplicar de forma incremental un cambio de stock a un producto.
+
+        El producto se bloquea mientras se suma ``delta`` para que dos
+        cambios de lote concurrentes no se pisen. Se usa ``save()`` para que
+        el estado del producto y las alertas de stock se mantengan al día.
+        """
+        if not delta:
+            return None
+
+        with transaction.atomic():
+            producto = (
+                Producto.objects.select_for_update().filter(pk=producto_id).first()
+            )
+            if producto is None:
+                # El producto se está eliminando junto con sus lotes
+                return None
+
+            producto.stock_actual += delta
+            producto.save(
+                update_fields=["stock_actual", "estado", "fecha_actualizacion"]
+            )
+
+        return producto
+
+    def consumir_fefo(self, producto_id, cantidad, tamano_bloque=50):
+        """Descontar ``cantidad`` de los lotes del producto en orden FEFO.
+
+        Debe ejecutarse dentro de una transacción. Los lotes se bloquean y se
+        leen por bloques en orden de vencimiento, de modo que solo se cargan
+        los que realmente se consumen. El stock del producto no se toca aquí:
+        lo ajusta quien registra el movimiento.
+
+        Devuelve la asignación por lote y la cantidad que no cubrieron los
+        lotes (stock sin lote asignado).
+        """
+        pendiente = Decimal(cantidad)
+        asignacion = []
+        consumidos = []
+
+        for lote in self._lotes_en_orden_fefo(producto_id, tamano_bloque):
+            tomado = min(lote.cantidad, pendiente)
+            lote.cantidad -= tomado
+            pendiente -= tomado
+            consumidos.append(lote)
+            asignacion.append(
+                {
+                    "lote_id": lote.id,
+                    "lote": lote.lote,
+                    "fecha_vencimiento": lote.fecha_vencimiento,
+                    "cantidad": tomado,
+                }
+            )
+            if pendiente <= 0:
+                break
+
+        # bulk_update no dispara las señales de lote: el stock se ajusta una vez
+        LoteProducto.objects.bulk_update(consumidos, ["cantidad"])
+        return asignacion, pendiente
+
+    def _lotes_en_orden_fefo(self, producto_id, tamano_bloque):
+        """Recorrer los lotes con stock bloqueándolos por bloques en orden FEFO"""
+        candidatos = (
+            LoteProducto.objects.select_for_update(skip_locked=False)
+            .filter(producto_id=producto_id, activo=True, cantidad__gt=0)
+            .only("id", "lote", "cantidad", "fecha_vencimiento", "activo")
+        )
+        # Primero los lotes con vencimiento (recorren el índice por producto y
+        # fecha) y al final los que no vencen
+        ordenes = (
+            candidatos.filter(fecha_vencimiento__isnull=False).order_by(
+                "fecha_vencimiento", "id"
+            ),
+            candidatos.filter(fecha_vencimiento__isnull=True).order_by("id"),
+        )
+        for queryset in ordenes:
+            inicio = 0
+            while True:
+                bloque = list(queryset[inicio:inicio + tamano_bloque])
+                yield from bloque
+                if len(bloque) < tamano_bloque:
+                    break
+                inicio += tamano_bloque
+
+    def lotes_activos(self):
+        """Lotes activos con cantidad disponible"""
+        return LoteProducto.objects.filter(
+            activo=True, cantidad__gt=0, producto__activo=True
+        )
+
+    def lotes_proximos_vencer(self, dias=30):
+        """Lotes que vencen dentro de los próximos ``dias`` días"""
+        hoy = timezone.now().date()
+        return self.lotes_activos().filter(
+            fecha_vencimiento__gte=hoy,
+            fecha_vencimiento__lte=hoy + timedelta(days=dias),
+        )
+
+    def lotes_vencidos(self):
+        """Lotes activos cuya fecha de vencimiento ya pasó"""
+        return self.lotes_activos().filter(
+            fecha_vencimiento__lt=timezone.now().date()
+        )
+
+    def productos_sin_lotes(self, queryset):
+        """Productos que no tienen lotes activos con cantidad disponible"""
+        lotes = LoteProducto.objects.filter(
+            producto=OuterRef("pk"), activo=True, cantidad__gt=0
+        )
+        return queryset.filter(~Exists(lotes))
+
+    def filtrar_productos_por_vencimiento(self, queryset, **rango):
+        """Filtrar productos por fecha de vencimiento a nivel de lote.
+
+        ``rango`` recibe lookups sobre la fecha (``gte``, ``lte``, ``lt``...).
+        Un producto coincide si alguno de sus lotes activos vence en el rango;
+        los productos sin lotes siguen usando su ``fecha_vencimiento`` propia.
+        """
+        filtros = {f"fecha_vencimiento__{lookup}": valor for lookup, valor in rango.items()}
+        lotes = LoteProducto.objects.filter(
+            producto=OuterRef("pk"), activo=True, cantidad__gt=0
+        )
+
+        return queryset.filter(
+            Q(Exists(lotes.filter(**filtros)))
+            | (Q(**filtros) & ~Q(Exists(lotes)))
+        )
+
+    def anotar_vencimiento_lote(self, queryset):
+        """Anotar la fecha del primer lote activo por vencer de cada producto"""
+        primer_vencimiento = (
+            LoteProducto.objects.filter(
+                producto=OuterRef("pk"),
+                activo=True,
+                cantidad__gt=0,
+                fecha_vencimiento__isnull=False,
+            )
+            .order_by("fecha_vencimiento")
+            .values("fecha_vencimiento")[:1]
+        )
+        return queryset.annotate(vencimiento_lote=Subquery(primer_vencimiento))
+
+
+def inicio_dia(fecha):
+    """Primer instante de ``fecha`` en la zona horaria actual.
+
+    Filtrar con ``fecha_cambio__gte=inicio_dia(a)`` y
+    ``fecha_cambio__lt=inicio_dia(b + 1 día)`` usa el índice de la columna;
+    ``fecha_cambio__date`` aplica una función a cada fila y no lo usa.
+    """
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+class HistorialPrecioService:
+    """Consultas sobre el historial de cambios de precio"""
+
+    TRUNCADOS = {"dia": TruncDay, "semana": TruncWeek, "mes": TruncMonth}
+    PRECIOS = ("precio_compra", "precio_venta")
+
+    def serie_precios(self, producto_ids, intervalo="dia", desde=None, hasta=None):
+        """Serie de precios por producto agrupada por día, semana o mes.
+
+        Para cada producto y periodo con cambios devuelve el último precio
+        nuevo del periodo, el mínimo, el máximo y el número de cambios. Todo
+        se calcula en la base de datos con funciones de ventana: se lee una
+        fila por periodo en lugar de todos los cambios. ``desde`` es inclusivo
+        y ``hasta`` exclusivo.
+
+        Devuelve ``{producto_id: [punto, ...]}`` con los periodos en orden.
+        """
+        periodo = self.TRUNCADOS[intervalo]("fecha_cambio", output_field=DateField())
+        particion = [F("producto_id"), periodo]
+        reciente = [F("fecha_cambio").desc(), F("id").desc()]
+
+        ventanas = {
+            "fila": Window(RowNumber(), partition_by=particion, order_by=reciente),
+            "cambios": Window(Count("id"), partition_by=particion),
+        }
+        for precio in self.PRECIOS:
+            columna = f"{precio}_nuevo"
+            ventanas[f"{precio}_ultimo"] = Window(
+                FirstValue(columna), partition_by=particion, order_by=reciente
+            )
+            ventanas[f"{precio}_minimo"] = Window(Min(columna), partition_by=particion)
+            ventanas[f"{precio}_maximo"] = Window(Max(columna), partition_by=particion)
+
+        queryset = HistorialPrecio.objects.filter(producto_id__in=producto_ids)
+        if desde is not None:
+            queryset = queryset.filter(fecha_cambio__gte=desde)
+        if hasta is not None:
+            queryset = queryset.filter(fecha_cambio__lt=hasta)
+
+        columnas = [nombre for nombre in ventanas if nombre != "fila"]
+        filas = (
+            queryset.annotate(periodo=periodo, **ventanas)
+            # Una fila por periodo: la del cambio más reciente
+            .filter(fila=1)
+            .order_by("producto_id", "periodo")
+            .values("producto_id", "periodo", *columnas)
+        )
+
+        series = {producto_id: [] for producto_id in producto_ids}
+        for fila in filas:
+            series[fila.pop("producto_id")].append(fila)
+        return series
+
+
+class PreciosInvalidos(ValueError):
+    """La revisión dejaría productos con precios que no pasan la validación"""
+
+    def __init__(self, codigos):
+        self.codigos = codigos
+        super().__init__(
+            "Los precios revisados deben ser mayores a 0 y el de venta mayor al "
+            f"de compra: {', '.join(codigos)}"
+        )
+
+
+class RevisionPreciosService:
+    """Revisión masiva de precios por categoría"""
+
+    def revisar(self, porcentajes, campos=("precio_venta",), usuario=None):
+        """Aplicar ``porcentajes`` (``{categoria_id: porcentaje}``) a los productos activos.
+
+        Todas las categorías se actualizan en una sola sentencia, con un
+        ``CASE`` por categoría sobre cada campo de ``campos``, y el historial
+        se inserta de una vez (ver ``ProductoQuerySet.update_con_historial``).
+        Antes se comprueban, con las mismas expresiones y en una consulta,
+        las reglas de ``ProductoDetailSerializer``; si algún producto no las
+        cumple no se actualiza ninguno y se lanza ``PreciosInvalidos``.
+        Devuelve el número de productos actualizados.
+        """
+        salida = DecimalField(max_digits=12, decimal_places=2)
+        factores = {
+            categoria_id: Value(1 + Decimal(porcentaje) / 100, output_field=DecimalField())
+            for categoria_id, porcentaje in porcentajes.items()
+        }
+        nuevos = {
+            campo: Case(
+                *[
+                    When(categoria_id=categoria_id, then=Round(F(campo) * factor, 2))
+                    for categoria_id, factor in factores.items()
+                ],
+                default=F(campo),
+                output_field=salida,
+            )
+            for campo in campos
+        }
+        productos = Producto.objects.filter(activo=True, categoria_id__in=list(factores))
+        with transaction.atomic():
+            invalidos = list(
+                productos.select_for_update()
+                .alias(
+                    _compra=nuevos.get("precio_compra", F("precio_compra")),
+                    _venta=nuevos.get("precio_venta", F("precio_venta")),
+                )
+                .filter(Q(_compra__lte=0) | Q(_venta__lte=0) | Q(_venta__lte=F("_compra")))
+                .order_by("codigo")
+                .values_list("codigo", flat=True)
+            )
+            if invalidos:
+                raise PreciosInvalidos(invalidos)
+            return productos.update_con_historial(usuario=usuario, **nuevos)
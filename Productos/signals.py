@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.db import models
-from .models import Producto
+from .models import CAMPOS_PRECIO, CategoriaProducto, HistorialPrecio, Producto, LoteProducto
+from comun.signals import conectar_invalidacion, conectar_version
 
 @receiver(pre_save, sender=Producto)
 def actualizar_estado_producto(sender, instance, **kwargs):
@@ -16,14 +17,13 @@ def crear_alerta_stock(sender, instance, created, **kwargs):
     """Crear alerta automática si el stock es crítico"""
     if instance.necesita_reposicion:
         try:
-            from Alertas.models import Alerta, ConfiguracionAlerta
+            from Alertas.models import Alerta
+            from Alertas.services import obtener_configuracion
 
             # Solo crear alerta automática si la configuración permite autogeneración
-            config = ConfiguracionAlerta.objects.filter(
-                tipo_alerta='STOCK_CRITICO', activa=True, auto_generar=True
-            ).first()
+            config = obtener_configuracion('STOCK_CRITICO')
 
-            if config:
+            if config and config.activa and config.auto_generar:
                 Alerta.objects.get_or_create(
                     producto=instance,
                     tipo='STOCK_CRITICO',
@@ -36,4 +36,86 @@ def crear_alerta_stock(sender, instance, created, **kwargs):
                 )
         except ImportError:
             # Si Alertas no está disponible, ignorar para evitar romper la creación de productos
-            pass
\ No newline at end of file
+            pass
+
+
+@receiver(pre_save, sender=Producto)
+def cargar_precios_originales(sender, instance, update_fields=None, **kwargs):
+    """Recuperar los precios registrados si el producto se cargó sin ellos"""
+    if instance._precios_originales is not None or instance._state.adding:
+        return
+    if update_fields is not None and not set(CAMPOS_PRECIO) & set(update_fields):
+        return
+    instance._precios_originales = (
+        Producto._base_manager.using(kwargs.get('using'))
+        .filter(pk=instance.pk)
+        .values_list(*CAMPOS_PRECIO)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Producto)
+def registrar_cambio_precio(sender, instance, created, update_fields=None, **kwargs):
+    """Registrar en el historial los cambios de precio de cualquier save()"""
+    if update_fields is not None and not set(CAMPOS_PRECIO) & set(update_fields):
+        return
+    actuales = instance.precios_actuales()
+    if not created and instance._precios_originales is not None:
+        registro = HistorialPrecio.desde_cambio(
+            instance.pk, instance._precios_originales, actuales, instance._usuario_cambio
+        )
+        if registro is not None:
+            registro.save(using=kwargs.get('using'))
+    instance._precios_originales = actuales
+
+
+@receiver(pre_save, sender=LoteProducto)
+def cargar_aporte_original_lote(sender, instance, **kwargs):
+    """Recuperar el aporte registrado si el lote se cargó con campos diferidos"""
+    if instance._aporte_stock_original is None:
+        original = LoteProducto.objects.filter(pk=instance.pk).values('cantidad', 'activo').first()
+        instance._aporte_stock_original = (
+            original['cantidad'] if original and original['activo'] else 0
+        )
+
+
+@receiver(post_save, sender=LoteProducto)
+def actualizar_stock_por_lote(sender, instance, created, **kwargs):
+    """Sumar al producto solo la diferencia de cantidad del lote"""
+    from .services import LoteService
+
+    delta = instance.aporte_stock - instance._aporte_stock_original
+    LoteService().ajustar_stock(instance.producto_id, delta)
+    instance._aporte_stock_original = instance.aporte_stock
+
+
+@receiver(post_delete, sender=LoteProducto)
+def descontar_stock_lote_eliminado(sender, instance, **kwargs):
+    """Restar del producto el aporte de un lote eliminado"""
+    from .services import LoteService
+
+    aporte = instance._aporte_stock_original
+    if aporte is None:
+        aporte = instance.aporte_stock
+    LoteService().ajustar_stock(instance.producto_id, -aporte)
+
+
+def tags_cache_producto(instance, **kwargs):
+    """Tags de caché afectados por un producto guardado o borrado"""
+    tags = ['productos', f'producto:{instance.pk}']
+    # El conteo por categoría solo cambia al crear o borrar productos, o al
+    # cambiarles la categoría o el estado activo; no en cada ajuste de stock
+    update_fields = kwargs.get('update_fields')
+    if (
+        kwargs.get('created', True)
+        or update_fields is None
+        or {'categoria', 'activo'} & set(update_fields)
+    ):
+        tags.append('categorias')
+    return tags
+
+
+conectar_invalidacion(Producto, tags_cache_producto)
+conectar_invalidacion(CategoriaProducto, lambda instance, **kwargs: ['categorias', 'productos'])
+# El ETag de productos incluye nombre y tipo de la categoría
+conectar_version(CategoriaProducto, 'categorias')
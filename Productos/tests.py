@@ -1,10 +1,22 @@
+import json
+
 from django.test import TestCase
 
 from django.test import TestCase
 from django.contrib.auth.models import User
-from rest_framework.test import APITestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
-from .models import CategoriaProducto, Producto
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from .models import CategoriaProducto, HistorialPrecio, Producto, LoteProducto
+from django.core.cache import cache
+from django.test import override_settings
+from .serializers import ProductoListSerializer, ProductoListValores
 
 class ProductoModelTests(TestCase):
     def setUp(self):
@@ -118,3 +130,541 @@ class ProductoAPITests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('estadisticas_generales', response.data)
+
+class LoteProductoTests(TestCase):
+    def setUp(self):
+        self.categoria = CategoriaProducto.objects.create(
+            nombre='Semillas Lotes',
+            tipo='SEMILLA'
+        )
+        self.producto = Producto.objects.create(
+            codigo='LOTE001',
+            nombre='Producto con Lotes',
+            categoria=self.categoria,
+            stock_actual=0,
+            stock_minimo=5,
+            unidad_medida='KG',
+            precio_compra=10,
+            precio_venta=15
+        )
+    
+    def test_stock_es_suma_de_lotes(self):
+        """El stock se ajusta de forma incremental al crear, editar y borrar lotes"""
+        lote_a = LoteProducto.objects.create(
+            producto=self.producto, lote='A', cantidad=30,
+            fecha_vencimiento=date.today() + timedelta(days=10)
+        )
+        lote_b = LoteProducto.objects.create(
+            producto=self.producto, lote='B', cantidad=20,
+            fecha_vencimiento=date.today() + timedelta(days=90)
+        )
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 50)
+        self.assertEqual(self.producto.estado, 'DISPONIBLE')
+        
+        lote_a = LoteProducto.objects.get(pk=lote_a.pk)
+        lote_a.cantidad = 25
+        lote_a.save()
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 45)
+        
+        lote_b.activo = False
+        lote_b.save()
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 25)
+        
+        lote_a.delete()
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 0)
+        self.assertEqual(self.producto.estado, 'AGOTADO')
+    
+    def test_proximos_vencer_por_lote(self):
+        """Un producto aparece próximo a vencer si alguno de sus lotes lo está"""
+        LoteProducto.objects.create(
+            producto=self.producto, lote='LEJANO', cantidad=10,
+            fecha_vencimiento=date.today() + timedelta(days=200)
+        )
+        client = APIClient()
+        url = '/api/productos/productos/proximos_vencer/'
+        self.assertEqual(len(client.get(url).data['results']), 0)
+        
+        LoteProducto.objects.create(
+            producto=self.producto, lote='CERCANO', cantidad=5,
+            fecha_vencimiento=date.today() + timedelta(days=5)
+        )
+        response = client.get(url)
+        self.assertEqual([p['codigo'] for p in response.data['results']], ['LOTE001'])
+        
+        response = client.get('/api/productos/lotes/proximos_vencer/')
+        self.assertEqual([l['lote'] for l in response.data['results']], ['CERCANO'])
+
+class ProductoCondicionalTests(APITestCase):
+    def setUp(self):
+        categoria = CategoriaProducto.objects.create(
+            nombre='Semillas ETag',
+            tipo='SEMILLA'
+        )
+        for i in range(5):
+            Producto.objects.create(
+                codigo=f'ETAG{i:03d}',
+                nombre=f'Producto ETag {i}',
+                categoria=categoria,
+                stock_actual=100,
+                stock_minimo=10,
+                unidad_medida='KG',
+                precio_compra=10,
+                precio_venta=15
+            )
+    
+    def test_lista_sin_cambios_responde_304_sin_serializar(self):
+        """Un GET condicional sin cambios ahorra consultas y serialización"""
+        url = '/api/productos/productos/?page=1'
+        with CaptureQueriesContext(connection) as completa:
+            primera = self.client.get(url)
+        self.assertEqual(primera.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', primera)
+        etag = primera['ETag']
+        
+        with mock.patch.object(ProductoListSerializer, 'to_representation') as serializar:
+            with CaptureQueriesContext(connection) as condicional:
+                segunda = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(segunda.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(segunda['ETag'], etag)
+        serializar.assert_not_called()
+        # Solo la consulta de versión frente a versión + conteo + página
+        self.assertEqual(len(condicional), 1)
+        self.assertGreater(len(completa), len(condicional))
+        
+        producto = Producto.objects.first()
+        producto.precio_venta = 20
+        producto.save()
+        tercera = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(tercera.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(tercera['ETag'], etag)
+    
+    def test_borrar_producto_cambia_la_version(self):
+        """Un borrado no deja 304 obsoletos ni por ETag ni por fecha"""
+        url = '/api/productos/productos/'
+        etag = self.client.get(url)['ETag']
+        Producto.objects.filter(codigo='ETAG004').delete()
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_cambiar_categoria_cambia_la_version(self):
+        """Renombrar la categoría no deja 304 con su nombre anterior"""
+        url = '/api/productos/productos/'
+        etag = self.client.get(url)['ETag']
+        categoria = CategoriaProducto.objects.get(nombre='Semillas ETag')
+        categoria.nombre = 'Semillas renombradas'
+        with self.captureOnCommitCallbacks(execute=True):
+            categoria.save()
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['categoria_nombre'], 'Semillas renombradas')
+    
+    def test_etag_depende_de_los_filtros(self):
+        """Cada combinación de filtros tiene su propio ETag"""
+        url = '/api/productos/productos/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url + '?search=ETag001', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ProductoAsincronoTests(APITestCase):
+    """Las vistas ASGI devuelven lo mismo que las de DRF"""
+
+    def setUp(self):
+        categoria = CategoriaProducto.objects.create(nombre='Semillas async', tipo='SEMILLA')
+        for numero in range(12):
+            Producto.objects.create(
+                codigo=f'ASY{numero:03d}',
+                nombre=f'Producto async {numero:02d}',
+                categoria=categoria,
+                stock_actual=numero,
+                stock_minimo=5,
+                stock_maximo=10,
+                unidad_medida='KG',
+                precio_compra='2.50',
+                precio_venta='3.00',
+            )
+
+    async def test_lista_igual_que_drf(self):
+        for consulta in ('', '?page=2', '?search=async%200&estado_stock=CRITICO', '?page=last'):
+            sincrona = await self.async_client.get(f'/api/productos/productos/{consulta}')
+            asincrona = await self.async_client.get(f'/api/productos/async/productos/{consulta}')
+            self.assertEqual(asincrona.status_code, 200)
+            self.assertEqual(
+                json.loads(asincrona.content)['results'], json.loads(sincrona.content)['results']
+            )
+        self.assertEqual(json.loads(asincrona.content)['count'], 12)
+        self.assertEqual(
+            (await self.async_client.get('/api/productos/async/productos/?page=9')).status_code, 404
+        )
+
+    async def test_resumen_inventario_igual_que_drf(self):
+        sincrona = await self.async_client.get('/api/productos/productos/resumen_inventario/')
+        asincrona = await self.async_client.get('/api/productos/async/productos/resumen_inventario/')
+        self.assertEqual(asincrona.content, sincrona.content)
+
+
+class ProductoSerializacionValoresTests(APITestCase):
+    """El listado por values() produce los mismos bytes que ProductoListSerializer"""
+
+    def setUp(self):
+        semillas = CategoriaProducto.objects.create(nombre='Semillas valores', tipo='SEMILLA')
+        abonos = CategoriaProducto.objects.create(nombre='Abonos "valores"', tipo='ABONO')
+        for numero, (stock, minimo, maximo) in enumerate(
+            [(0, 5, 0), (3.5, 5, 20), (12.5, 5, 10), (8, 5, 0), (7, 5, 20)]
+        ):
+            Producto.objects.create(
+                codigo=f'VAL{numero:03d}',
+                nombre=f'Producto valores ñ {numero}',
+                categoria=semillas if numero % 2 else abonos,
+                stock_actual=stock,
+                stock_minimo=minimo,
+                stock_maximo=maximo,
+                unidad_medida='KG',
+                precio_compra='10.25',
+                precio_venta='15.00',
+                activo=numero != 4,
+            )
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_misma_salida_que_el_serializer(self):
+        queryset = Producto.objects.select_related('categoria').order_by('id')
+        rapida = ProductoListValores()
+        with self.assertNumQueries(1):
+            datos = rapida.representar(rapida.consulta(queryset))
+        self.assertEqual(
+            JSONRenderer().render(datos),
+            JSONRenderer().render(ProductoListSerializer(queryset, many=True).data),
+        )
+
+    def test_endpoint_igual_con_y_sin_serializacion_valores(self):
+        for consulta in ('', '?page=1&estado_stock=CRITICO', '?incluir_inactivos=true&search=valores'):
+            rapida = self.client.get(f'/api/productos/productos/{consulta}')
+            cache.clear()
+            with override_settings(SERIALIZACION_VALORES=False):
+                estandar = self.client.get(f'/api/productos/productos/{consulta}')
+            cache.clear()
+            self.assertEqual(rapida.status_code, status.HTTP_200_OK)
+            self.assertEqual(rapida.content, estandar.content)
+
+
+class HistorialPrecioSerieTests(APITestCase):
+    """Serie de precios agrupada en SQL y filtros por rango de instantes"""
+
+    def setUp(self):
+        categoria = CategoriaProducto.objects.create(nombre='Semillas serie', tipo='SEMILLA')
+        self.productos = [
+            Producto.objects.create(
+                codigo=f'SER{numero}',
+                nombre=f'Producto serie {numero}',
+                categoria=categoria,
+                stock_actual=10,
+                stock_minimo=5,
+                stock_maximo=100,
+                unidad_medida='KG',
+                precio_compra=10,
+                precio_venta=15,
+            )
+            for numero in range(3)
+        ]
+        uno, dos, _ = self.productos
+        cambios = [
+            # producto, fecha, compra, venta
+            (uno, datetime(2025, 1, 6, 8), 10, 15),
+            (uno, datetime(2025, 1, 6, 18), 12, 18),
+            (uno, datetime(2025, 1, 8, 9), 11, 16),
+            (uno, datetime(2025, 2, 3, 23, 59), 13, 20),
+            (dos, datetime(2025, 1, 7, 12), 5, 7),
+        ]
+        for producto, fecha, compra, venta in cambios:
+            historial = HistorialPrecio.objects.create(
+                producto=producto,
+                precio_compra_anterior=0,
+                precio_compra_nuevo=compra,
+                precio_venta_anterior=0,
+                precio_venta_nuevo=venta,
+            )
+            HistorialPrecio.objects.filter(pk=historial.pk).update(
+                fecha_cambio=fecha.replace(tzinfo=dt_timezone.utc)
+            )
+
+    def _serie(self, consulta):
+        respuesta = self.client.get(f'/api/productos/historial-precios/serie/?{consulta}')
+        self.assertEqual(respuesta.status_code, status.HTTP_200_OK, respuesta.content)
+        return {serie['producto']: serie['puntos'] for serie in respuesta.json()['series']}
+
+    def test_serie_por_dia_ultimo_minimo_maximo(self):
+        uno, dos, tres = self.productos
+        series = self._serie(f'productos={uno.id},{dos.id},{tres.id}&intervalo=dia')
+
+        self.assertEqual(series[tres.id], [])
+        self.assertEqual(
+            series[uno.id][0],
+            {
+                'periodo': '2025-01-06',
+                'cambios': 2,
+                'precio_compra_ultimo': '12.00',
+                'precio_compra_minimo': '10.00',
+                'precio_compra_maximo': '12.00',
+                'precio_venta_ultimo': '18.00',
+                'precio_venta_minimo': '15.00',
+                'precio_venta_maximo': '18.00',
+            },
+        )
+        self.assertEqual(
+            [punto['periodo'] for punto in series[uno.id]],
+            ['2025-01-06', '2025-01-08', '2025-02-03'],
+        )
+        self.assertEqual(series[dos.id][0]['precio_venta_ultimo'], '7.00')
+
+    def test_serie_por_semana_y_mes(self):
+        uno = self.productos[0]
+        semanas = self._serie(f'productos={uno.id}&intervalo=semana')[uno.id]
+        self.assertEqual([p['periodo'] for p in semanas], ['2025-01-06', '2025-02-03'])
+        self.assertEqual(semanas[0]['cambios'], 3)
+        self.assertEqual(semanas[0]['precio_compra_ultimo'], '11.00')
+        self.assertEqual(semanas[0]['precio_compra_maximo'], '12.00')
+
+        meses = self._serie(f'productos={uno.id}&intervalo=mes')[uno.id]
+        self.assertEqual([p['periodo'] for p in meses], ['2025-01-01', '2025-02-01'])
+        self.assertEqual(meses[1]['precio_venta_ultimo'], '20.00')
+
+    def test_serie_rango_desde_inclusivo_hasta_exclusivo(self):
+        uno = self.productos[0]
+        puntos = self._serie(
+            f'productos={uno.id}&desde=2025-01-06T18:00:00Z&hasta=2025-02-03T23:59:00Z'
+        )[uno.id]
+        self.assertEqual([p['periodo'] for p in puntos], ['2025-01-06', '2025-01-08'])
+        self.assertEqual(puntos[0]['cambios'], 1)
+
+    def test_serie_una_consulta_para_varios_productos(self):
+        ids = ','.join(str(producto.id) for producto in self.productos)
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/productos/historial-precios/serie/?productos={ids}&intervalo=mes')
+
+    def test_serie_parametros_invalidos(self):
+        for consulta in ('', 'productos=a,b', 'productos=1&intervalo=anio',
+                         'productos=1&desde=2025-02-01&hasta=2025-01-01'):
+            respuesta = self.client.get(f'/api/productos/historial-precios/serie/?{consulta}')
+            self.assertEqual(respuesta.status_code, status.HTTP_400_BAD_REQUEST, consulta)
+
+    def test_listado_filtra_por_rango_de_instantes(self):
+        respuesta = self.client.get(
+            '/api/productos/historial-precios/?fecha_inicio=2025-01-07&fecha_fin=2025-02-03'
+        )
+        self.assertEqual(respuesta.status_code, status.HTTP_200_OK)
+        # Incluye el cambio de las 23:59 del último día
+        self.assertEqual(len(respuesta.json()), 3)
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get('/api/productos/historial-precios/?fecha_inicio=2025-01-07')
+        self.assertNotIn('django_datetime_cast_date', consultas.captured_queries[-1]['sql'])
+
+        respuesta = self.client.get('/api/productos/historial-precios/?fecha_inicio=07-01-2025')
+        self.assertEqual(respuesta.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductoHistorialPrecioTests(APITestCase):
+    """El historial de precios se registra en save(), bulk_update() y update()"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='precios', password='testpass123')
+        self.semillas = CategoriaProducto.objects.create(nombre='Semillas precios', tipo='SEMILLA')
+        self.abonos = CategoriaProducto.objects.create(nombre='Abonos precios', tipo='ABONO')
+        self.productos = [
+            Producto.objects.create(
+                codigo=f'PRE{numero}',
+                nombre=f'Producto precios {numero}',
+                categoria=self.semillas if numero < 2 else self.abonos,
+                stock_actual=10,
+                stock_minimo=5,
+                stock_maximo=100,
+                unidad_medida='KG',
+                precio_compra=10,
+                precio_venta=15,
+                activo=numero != 3,
+            )
+            for numero in range(4)
+        ]
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def _precios(self, producto):
+        return Producto.objects.values_list('precio_compra', 'precio_venta').get(pk=producto.pk)
+
+    def test_save_registra_el_cambio(self):
+        producto = Producto.objects.get(pk=self.productos[0].pk)
+        producto.precio_venta = '16.50'
+        producto._usuario_cambio = self.user
+        producto.save()
+
+        historial = HistorialPrecio.objects.get()
+        self.assertEqual(historial.precio_venta_anterior, Decimal('15.00'))
+        self.assertEqual(historial.precio_venta_nuevo, Decimal('16.50'))
+        self.assertEqual(historial.precio_compra_nuevo, Decimal('10.00'))
+        self.assertEqual(historial.cambiado_por, self.user)
+
+        # Guardar sin cambios de precio no registra nada
+        producto.nombre = 'Otro nombre'
+        producto.save()
+        self.assertEqual(HistorialPrecio.objects.count(), 1)
+
+    def test_save_sin_campos_de_precio_no_consulta_precios(self):
+        producto = Producto.objects.only('id', 'stock_actual').get(pk=self.productos[0].pk)
+        producto.stock_actual = 20
+        with CaptureQueriesContext(connection) as consultas:
+            producto.save(update_fields=['stock_actual', 'estado', 'fecha_actualizacion'])
+        self.assertFalse(any('precio_compra' in q['sql'] for q in consultas.captured_queries))
+        self.assertFalse(HistorialPrecio.objects.exists())
+
+    def test_save_de_instancia_cargada_sin_precios(self):
+        producto = Producto.objects.only('id').get(pk=self.productos[0].pk)
+        producto.precio_compra = 11
+        producto.save(update_fields=['precio_compra'])
+        historial = HistorialPrecio.objects.get()
+        self.assertEqual(historial.precio_compra_anterior, Decimal('10.00'))
+        self.assertEqual(historial.precio_compra_nuevo, Decimal('11.00'))
+
+    def test_actualizar_por_api_atribuye_el_usuario(self):
+        self.client.force_authenticate(self.user)
+        respuesta = self.client.patch(
+            f'/api/productos/productos/{self.productos[0].pk}/', {'precio_venta': '18.00'}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, status.HTTP_200_OK, respuesta.content)
+        historial = HistorialPrecio.objects.get()
+        self.assertEqual(historial.precio_venta_nuevo, Decimal('18.00'))
+        self.assertEqual(historial.cambiado_por, self.user)
+
+    def test_bulk_update_con_historial(self):
+        productos = list(Producto.objects.order_by('id')[:3])
+        productos[0].precio_venta = Decimal('20')
+        productos[1].precio_compra = 12.5
+        with CaptureQueriesContext(connection) as consultas:
+            Producto.objects.bulk_update_con_historial(productos, ['precio_compra', 'precio_venta'])
+        # Los precios anteriores salen de las instancias: no hay SELECT
+        self.assertFalse(any(q['sql'].startswith('SELECT') for q in consultas.captured_queries))
+        inserciones = [q for q in consultas.captured_queries if 'INSERT INTO "Productos_historialprecio"' in q['sql']]
+        self.assertEqual(len(inserciones), 1)
+
+        self.assertEqual(
+            sorted(HistorialPrecio.objects.values_list('producto_id', 'precio_compra_nuevo', 'precio_venta_nuevo')),
+            [(productos[0].pk, Decimal('10.00'), Decimal('20.00')),
+             (productos[1].pk, Decimal('12.50'), Decimal('15.00'))],
+        )
+
+    def test_update_con_historial_con_expresiones(self):
+        actualizados = Producto.objects.filter(categoria=self.semillas).update_con_historial(
+            usuario=self.user, precio_compra=F('precio_compra') + Decimal('0.555')
+        )
+        self.assertEqual(actualizados, 2)
+        for producto in self.productos[:2]:
+            precio_compra, _ = self._precios(producto)
+            historial = HistorialPrecio.objects.get(producto=producto)
+            self.assertEqual(historial.precio_compra_nuevo, precio_compra)
+            self.assertEqual(historial.precio_compra_anterior, Decimal('10.00'))
+            self.assertEqual(historial.precio_venta_nuevo, historial.precio_venta_anterior)
+            self.assertEqual(historial.cambiado_por, self.user)
+
+    def test_update_con_historial_sin_precios_actualiza_la_fecha(self):
+        anterior = Producto.objects.get(pk=self.productos[0].pk).fecha_actualizacion
+        Producto.objects.filter(pk=self.productos[0].pk).update_con_historial(stock_actual=20)
+        producto = Producto.objects.get(pk=self.productos[0].pk)
+        self.assertEqual(producto.stock_actual, 20)
+        self.assertGreater(producto.fecha_actualizacion, anterior)
+        self.assertFalse(HistorialPrecio.objects.exists())
+
+    def test_revision_precios_por_categoria(self):
+        self.client.force_authenticate(self.user)
+        self.client.get(f'/api/productos/productos/{self.productos[2].pk}/')
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(
+                '/api/productos/productos/revision_precios/',
+                {
+                    'precio': 'ambos',
+                    'categorias': [
+                        {'categoria': self.semillas.pk, 'porcentaje': '10'},
+                        {'categoria': self.abonos.pk, 'porcentaje': '-3.33'},
+                    ],
+                },
+                format='json',
+            )
+        self.assertEqual(respuesta.status_code, status.HTTP_200_OK, respuesta.content)
+        # El producto inactivo no se revisa
+        self.assertEqual(respuesta.json(), {'productos_actualizados': 3})
+
+        sentencias = [q['sql'] for q in consultas.captured_queries]
+        self.assertEqual(len([s for s in sentencias if s.startswith('UPDATE "Productos_producto"')]), 1)
+        self.assertEqual(len([s for s in sentencias if s.startswith('INSERT INTO "Productos_historialprecio"')]), 1)
+
+        self.assertEqual(self._precios(self.productos[0]), (Decimal('11.00'), Decimal('16.50')))
+        self.assertEqual(self._precios(self.productos[2]), (Decimal('9.67'), Decimal('14.50')))
+        self.assertEqual(self._precios(self.productos[3]), (Decimal('10.00'), Decimal('15.00')))
+        self.assertEqual(HistorialPrecio.objects.count(), 3)
+
+        # La caché del detalle se invalida aunque update() no envíe post_save
+        respuesta = self.client.get(f'/api/productos/productos/{self.productos[2].pk}/')
+        self.assertEqual(respuesta.json()['precio_venta'], '14.50')
+
+    def test_revision_precios_requiere_autenticacion(self):
+        respuesta = self.client.post(
+            '/api/productos/productos/revision_precios/',
+            {'categorias': [{'categoria': self.semillas.pk, 'porcentaje': '50'}]},
+            format='json',
+        )
+        self.assertEqual(respuesta.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._precios(self.productos[0]), (Decimal('10.00'), Decimal('15.00')))
+
+    def test_revision_precios_rechaza_venta_no_mayor_a_compra(self):
+        self.client.force_authenticate(self.user)
+        for datos in (
+            {'precio': 'venta', 'categorias': [
+                {'categoria': self.semillas.pk, 'porcentaje': '5'},
+                {'categoria': self.abonos.pk, 'porcentaje': '-50'},
+            ]},
+            {'precio': 'compra', 'categorias': [{'categoria': self.abonos.pk, 'porcentaje': '60'}]},
+        ):
+            respuesta = self.client.post(
+                '/api/productos/productos/revision_precios/', datos, format='json'
+            )
+            self.assertEqual(respuesta.status_code, status.HTTP_400_BAD_REQUEST, datos)
+            self.assertEqual(respuesta.json()['productos'], ['PRE2'])
+        # Ningún producto se revisa, tampoco los de la categoría válida
+        self.assertEqual(self._precios(self.productos[0]), (Decimal('10.00'), Decimal('15.00')))
+        self.assertEqual(self._precios(self.productos[2]), (Decimal('10.00'), Decimal('15.00')))
+        self.assertFalse(HistorialPrecio.objects.exists())
+
+    def test_revision_precios_rechaza_precios_redondeados_a_cero(self):
+        self.client.force_authenticate(self.user)
+        respuesta = self.client.post(
+            '/api/productos/productos/revision_precios/',
+            {'precio': 'ambos', 'categorias': [{'categoria': self.semillas.pk, 'porcentaje': '-99.99'}]},
+            format='json',
+        )
+        self.assertEqual(respuesta.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(respuesta.json()['productos'], ['PRE0', 'PRE1'])
+        self.assertEqual(self._precios(self.productos[0]), (Decimal('10.00'), Decimal('15.00')))
+        self.assertFalse(HistorialPrecio.objects.exists())
+
+    def test_revision_precios_valida_categorias(self):
+        self.client.force_authenticate(self.user)
+        for datos in (
+            {'categorias': []},
+            {'categorias': [{'categoria': 9999, 'porcentaje': '5'}]},
+            {'categorias': [{'categoria': self.semillas.pk, 'porcentaje': '-100'}]},
+            {'categorias': [{'categoria': self.semillas.pk, 'porcentaje': '5'}] * 2},
+        ):
+            respuesta = self.client.post(
+                '/api/productos/productos/revision_precios/', datos, format='json'
+            )
+            self.assertEqual(respuesta.status_code, status.HTTP_400_BAD_REQUEST, datos)
+        self.assertFalse(HistorialPrecio.objects.exists())
@@ -1,12 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoriaProductoViewSet, ProductoViewSet, HistorialPrecioViewSet
+from . import views_async
+from .views import CategoriaProductoViewSet, ProductoViewSet, LoteProductoViewSet, HistorialPrecioViewSet
 
 router = DefaultRouter()
 router.register(r'categorias', CategoriaProductoViewSet)
 router.register(r'productos', ProductoViewSet, basename='productos')
+router.register(r'lotes', LoteProductoViewSet, basename='lotes')
 router.register(r'historial-precios', HistorialPrecioViewSet)
 
 urlpatterns = [
+    path('async/productos/', views_async.lista_productos, name='productos-async-lista'),
+    path('async/productos/resumen_inventario/', views_async.resumen_inventario, name='productos-async-resumen'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
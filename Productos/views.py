@@ -1,24 +1,70 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Sum, Count, F, Value
+from django.db.models import Q, Sum, Count, F, Value, Max, Subquery
 from django.db.models.functions import Coalesce
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 import csv
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from rest_framework.permissions import IsAuthenticated
 
-from .models import CategoriaProducto, Producto, HistorialPrecio
+from .models import CategoriaProducto, Producto, LoteProducto, HistorialPrecio
 from .serializers import (
     CategoriaProductoSerializer, 
     ProductoListSerializer, 
+    ProductoListValores,
     ProductoDetailSerializer,
-    HistorialPrecioSerializer
+    LoteProductoSerializer,
+    HistorialPrecioSerializer,
+    RevisionPreciosSerializer,
+    SeriePrecioParametrosSerializer,
+    SeriePrecioSerializer,
+)
+from .filters import ProductoFilter, LoteProductoFilter
+from .services import (
+    HistorialPrecioService, LoteService, PreciosInvalidos, RevisionPreciosService, inicio_dia,
 )
-from .filters import ProductoFilter
 from rest_framework.pagination import PageNumberPagination
+from comun.cache import cachear_respuesta
+from comun.condicional import respuesta_condicional
+from comun.metricas import filas_exportadas
+from comun.models import VersionTabla
+from comun.replicas import lectura_replica
+from comun.planes_consulta import PlanConsulta, PlanConsultaMixin
+from comun.serializacion import ListaValoresMixin
+
+
+class _Eco:
+    """Pseudo-fichero para csv.writer que devuelve cada línea escrita"""
+
+    def write(self, valor):
+        return valor
+
+
+def version_productos():
+    """Versión barata del catálogo: última actualización, total de productos
+    y versión de las categorías, cuyo nombre y tipo se muestran en la lista.
+
+    Sin ``Last-Modified``: la última actualización no cambia al borrar un
+    producto y un ``If-Modified-Since`` respondería 304 con datos viejos. El
+    ETag sí cambia porque incluye el total.
+    """
+    categorias = VersionTabla.objects.filter(tabla='categorias').values('version')[:1]
+    version = Producto.objects.aggregate(
+        ultima=Max('fecha_actualizacion'),
+        total=Count('id'),
+        # Max sobre el contador escalar: viaja en la misma consulta
+        categorias=Max(Subquery(categorias)),
+    )
+    ultima = version['ultima']
+    return (
+        f"{version['total']}-{ultima.isoformat() if ultima else ''}-{version['categorias'] or 0}",
+        None,
+    )
+
 
 class CategoriaProductoViewSet(viewsets.ModelViewSet):
     queryset = CategoriaProducto.objects.all()
@@ -40,6 +86,14 @@ class CategoriaProductoViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    @cachear_respuesta(['categorias'])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cachear_respuesta(['categorias'])
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     @action(detail=True, methods=['get'])
     def productos(self, request, pk=None):
         """Obtener productos de una categoría específica"""
@@ -54,7 +108,7 @@ class CategoriaProductoViewSet(viewsets.ModelViewSet):
         serializer = ProductoListSerializer(productos, many=True)
         return Response(serializer.data)
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(PlanConsultaMixin, ListaValoresMixin, viewsets.ModelViewSet):
     permission_classes = []  # Sin autenticación requerida
     class StandardResultsSetPagination(PageNumberPagination):
         page_size = 10
@@ -62,9 +116,23 @@ class ProductoViewSet(viewsets.ModelViewSet):
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProductoFilter
+    serializacion_valores = {'list': ProductoListValores}
+    plan_consulta_defecto = PlanConsulta(relaciones=('categoria',))
+    # Los listados no leen descripcion, lote ni las fechas de auditoría
+    planes_consulta = {
+        'list': PlanConsulta(relaciones=('categoria',), serializer=ProductoListSerializer),
+        'exportar_csv': PlanConsulta(
+            relaciones=('categoria',),
+            columnas=(
+                'codigo', 'nombre', 'categoria__nombre', 'stock_actual', 'stock_minimo',
+                'stock_maximo', 'unidad_medida', 'precio_compra', 'precio_venta',
+                'ubicacion_almacen', 'activo',
+            ),
+        ),
+    }
     
     def get_queryset(self):
-        queryset = Producto.objects.select_related('categoria')
+        queryset = self.aplicar_plan_consulta(Producto.objects.all())
         
         # Solo productos activos por defecto, a menos que se especifique lo contrario
         if self.request.query_params.get('incluir_inactivos') != 'true':
@@ -77,6 +145,15 @@ class ProductoViewSet(viewsets.ModelViewSet):
             return ProductoListSerializer
         return ProductoDetailSerializer
     
+    @respuesta_condicional(version_productos)
+    @cachear_respuesta(['productos', 'categorias'])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cachear_respuesta(lambda vista, pk=None, **kwargs: [f'producto:{pk}', 'categorias'])
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     def perform_create(self, serializer):
         # Guardar sin usuario si no está autenticado
         if self.request.user.is_authenticated:
@@ -132,13 +209,18 @@ class ProductoViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def proximos_vencer(self, request):
-        """Productos próximos a vencer (30 días o menos)"""
-        fecha_limite = datetime.now().date() + timedelta(days=30)
-        productos_proximos_vencer = self.get_queryset().filter(
-            fecha_vencimiento__lte=fecha_limite,
-            fecha_vencimiento__gte=datetime.now().date(),
-            activo=True
-        ).order_by('fecha_vencimiento')
+        """Productos con algún lote próximo a vencer (30 días o menos)"""
+        hoy = datetime.now().date()
+        fecha_limite = hoy + timedelta(days=30)
+        lote_service = LoteService()
+        productos_proximos_vencer = lote_service.filtrar_productos_por_vencimiento(
+            self.get_queryset().filter(activo=True),
+            gte=hoy,
+            lte=fecha_limite,
+        )
+        productos_proximos_vencer = lote_service.anotar_vencimiento_lote(
+            productos_proximos_vencer
+        ).order_by(Coalesce('vencimiento_lote', 'fecha_vencimiento'))
         
         page = self.paginate_queryset(productos_proximos_vencer)
         if page is not None:
@@ -149,6 +231,8 @@ class ProductoViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @lectura_replica
+    @respuesta_condicional(version_productos)
     def resumen_inventario(self, request):
         """Resumen general del inventario con estadísticas"""
         productos_activos = self.get_queryset().filter(activo=True)
@@ -198,40 +282,73 @@ class ProductoViewSet(viewsets.ModelViewSet):
         return Response(data)
     
     @action(detail=False, methods=['get'])
+    @lectura_replica
     def exportar_csv(self, request):
-        """Exportar productos a CSV"""
-        productos = self.get_queryset()
+        """Exportar productos a CSV.
+
+        Las filas se generan por bloques desde la base de datos y se envían
+        a medida que se escriben, sin cargar todo el catálogo en memoria.
+        """
+        productos = self.get_queryset().order_by('codigo')
+        # Las filas se leen después de salir de la vista: se fija ya la base
+        # que eligió el router
+        productos = productos.using(productos.db)
         
-        response = HttpResponse(content_type='text/csv')
+        response = StreamingHttpResponse(
+            self._filas_csv(productos), content_type='text/csv'
+        )
         response['Content-Disposition'] = f'attachment; filename="productos_{datetime.now().strftime("%Y%m%d_%H%M")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
+        return response
+    
+    def _filas_csv(self, productos):
+        writer = csv.writer(_Eco())
+        yield writer.writerow([
             'Código', 'Nombre', 'Categoría', 'Stock Actual', 'Stock Mínimo', 
             'Stock Máximo', 'Unidad', 'Precio Compra', 'Precio Venta', 
             'Estado Stock', 'Valor Inventario', 'Ubicación', 'Activo'
         ])
         
-        for producto in productos:
-            writer.writerow([
-                producto.codigo,
-                producto.nombre,
-                producto.categoria.nombre,
-                float(producto.stock_actual),
-                float(producto.stock_minimo),
-                float(producto.stock_maximo),
-                producto.get_unidad_medida_display(),
-                float(producto.precio_compra),
-                float(producto.precio_venta),
-                producto.estado_stock,
-                float(producto.valor_inventario),
-                producto.ubicacion_almacen,
-                'Sí' if producto.activo else 'No'
-            ])
+        filas = 0
+        try:
+            for producto in productos.iterator(chunk_size=500):
+                yield writer.writerow([
+                    producto.codigo,
+                    producto.nombre,
+                    producto.categoria.nombre,
+                    float(producto.stock_actual),
+                    float(producto.stock_minimo),
+                    float(producto.stock_maximo),
+                    producto.get_unidad_medida_display(),
+                    float(producto.precio_compra),
+                    float(producto.precio_venta),
+                    producto.estado_stock,
+                    float(producto.valor_inventario),
+                    producto.ubicacion_almacen,
+                    'Sí' if producto.activo else 'No'
+                ])
+                filas += 1
+        finally:
+            filas_exportadas.inc(filas, recurso='productos', formato='csv')
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def revision_precios(self, request):
+        """Subir o bajar precios por categoría en porcentaje, con su historial"""
+        serializer = RevisionPreciosSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
         
-        return response
+        try:
+            actualizados = RevisionPreciosService().revisar(
+                datos['categorias'],
+                campos=RevisionPreciosSerializer.CAMPOS[datos['precio']],
+                usuario=request.user,
+            )
+        except PreciosInvalidos as error:
+            raise ValidationError({'precios': str(error), 'productos': error.codigos})
+        return Response({'productos_actualizados': actualizados})
     
     @action(detail=True, methods=['get'])
+    @lectura_replica
     def historial_precios(self, request, pk=None):
         """Obtener historial de precios de un producto"""
         producto = self.get_object()
@@ -245,6 +362,57 @@ class ProductoViewSet(viewsets.ModelViewSet):
         serializer = HistorialPrecioSerializer(historial, many=True)
         return Response(serializer.data)
 
+class LoteProductoViewSet(viewsets.ModelViewSet):
+    serializer_class = LoteProductoSerializer
+    permission_classes = []  # Sin autenticación requerida
+    class StandardResultsSetPagination(PageNumberPagination):
+        page_size = 10
+
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = LoteProductoFilter
+    
+    def get_queryset(self):
+        queryset = LoteProducto.objects.select_related('producto')
+        
+        # Solo lotes activos por defecto, a menos que se especifique lo contrario
+        if self.request.query_params.get('incluir_inactivos') != 'true':
+            queryset = queryset.filter(activo=True)
+        
+        return queryset
+    
+    @action(detail=False, methods=['get'])
+    def proximos_vencer(self, request):
+        """Lotes próximos a vencer (30 días por defecto, configurable con ?dias=)"""
+        try:
+            dias = int(request.query_params.get('dias', 30))
+        except ValueError:
+            return Response({'error': 'El parámetro dias debe ser un número entero'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        lotes = LoteService().lotes_proximos_vencer(dias).select_related('producto')
+        
+        page = self.paginate_queryset(lotes)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = self.get_serializer(lotes, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def vencidos(self, request):
+        """Lotes activos con fecha de vencimiento pasada"""
+        lotes = LoteService().lotes_vencidos().select_related('producto')
+        
+        page = self.paginate_queryset(lotes)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = self.get_serializer(lotes, many=True)
+        return Response(serializer.data)
+
 class HistorialPrecioViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = HistorialPrecio.objects.select_related('producto')
     serializer_class = HistorialPrecioSerializer
@@ -253,15 +421,49 @@ class HistorialPrecioViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ['producto']
     
     def get_queryset(self):
-        queryset = HistorialPrecio.objects.all()
+        queryset = HistorialPrecio.objects.select_related('producto', 'cambiado_por')
         
-    
-        fecha_inicio = self.request.query_params.get('fecha_inicio')
-        fecha_fin = self.request.query_params.get('fecha_fin')
+        # Rango de instantes en lugar de fecha_cambio__date para usar el índice
+        fecha_inicio = self._fecha_parametro('fecha_inicio')
+        fecha_fin = self._fecha_parametro('fecha_fin')
         
         if fecha_inicio:
-            queryset = queryset.filter(fecha_cambio__date__gte=fecha_inicio)
+            queryset = queryset.filter(fecha_cambio__gte=inicio_dia(fecha_inicio))
         if fecha_fin:
-            queryset = queryset.filter(fecha_cambio__date__lte=fecha_fin)
+            queryset = queryset.filter(fecha_cambio__lt=inicio_dia(fecha_fin + timedelta(days=1)))
         
-        return queryset.order_by('-fecha_cambio')
\ No newline at end of file
+        return queryset.order_by('-fecha_cambio')
+
+    def _fecha_parametro(self, nombre):
+        valor = self.request.query_params.get(nombre)
+        if not valor:
+            return None
+        try:
+            return date.fromisoformat(valor)
+        except ValueError:
+            raise ValidationError({nombre: 'Formato de fecha inválido, use AAAA-MM-DD'})
+
+    @action(detail=False, methods=['get'])
+    @lectura_replica
+    def serie(self, request):
+        """Serie de precios por producto agrupada por día, semana o mes.
+
+        ``?productos=1,2,3&intervalo=semana&desde=2024-01-01&hasta=2025-01-01``;
+        ``desde`` es inclusivo y ``hasta`` exclusivo. Cada punto trae el último
+        precio del periodo, el mínimo, el máximo y el número de cambios.
+        """
+        parametros = SeriePrecioParametrosSerializer(data=request.query_params)
+        parametros.is_valid(raise_exception=True)
+        datos = parametros.validated_data
+
+        series = HistorialPrecioService().serie_precios(
+            datos['productos'],
+            intervalo=datos['intervalo'],
+            desde=datos.get('desde'),
+            hasta=datos.get('hasta'),
+        )
+        serializer = SeriePrecioSerializer(
+            [{'producto': producto, 'puntos': puntos} for producto, puntos in series.items()],
+            many=True,
+        )
+        return Response({'intervalo': datos['intervalo'], 'series': serializer.data})
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""Variantes asíncronas (ASGI) de las lecturas principales de productos.
+
+Devuelven el mismo JSON que ``ProductoViewSet.list`` y
+``ProductoViewSet.resumen_inventario``. Servir con ``config.asgi``
+(por ejemplo ``uvicorn config.asgi:application``).
+"""
+import asyncio
+
+from django.db.models import Count, F, Q, Sum
+from django.views.decorators.http import require_GET
+
+from comun.asincrono import filtrar, paginar, respuesta_json
+from comun.replicas import lectura_replica
+
+from .filters import ProductoFilter
+from .models import Producto
+from .serializers import ProductoListSerializer
+from .views import ProductoViewSet
+
+
+def _productos(request):
+    queryset = Producto.objects.select_related('categoria')
+    if request.GET.get('incluir_inactivos') != 'true':
+        queryset = queryset.filter(activo=True)
+    return queryset
+
+
+@require_GET
+async def lista_productos(request):
+    """Listado paginado de productos con los filtros de ``ProductoFilter``"""
+    queryset, errores = await filtrar(ProductoFilter, request, _productos(request))
+    if errores:
+        return respuesta_json(errores, status=400)
+    datos, status = await paginar(
+        request, queryset, ProductoListSerializer,
+        ProductoViewSet.StandardResultsSetPagination.page_size,
+    )
+    return respuesta_json(datos, status=status)
+
+
+@require_GET
+@lectura_replica
+async def resumen_inventario(request):
+    """Resumen del inventario con los agregados lanzados a la vez.
+
+    Los cinco contadores y el valor total se calculan en un único
+    ``aaggregate`` con filtros condicionales (la vista síncrona hace una
+    consulta por contador) y la distribución por categoría se lanza a la
+    vez con ``asyncio.gather``. Ambas consultas comparten la conexión del
+    hilo del ORM y se ejecutan una tras otra, pero el bucle de eventos
+    sigue atendiendo otras peticiones mientras esperan.
+    """
+    productos_activos = _productos(request).filter(activo=True)
+
+    async def distribucion():
+        return [
+            fila async for fila in productos_activos.values(
+                'categoria__nombre', 'categoria__tipo'
+            ).annotate(
+                total=Count('id'),
+                valor=Sum(F('stock_actual') * F('precio_compra'))
+            ).order_by('-valor')
+        ]
+
+    estadisticas, por_categoria = await asyncio.gather(
+        productos_activos.aaggregate(
+            total_productos=Count('id'),
+            productos_stock_critico=Count(
+                'id', filter=Q(stock_actual__lte=F('stock_minimo'), stock_actual__gt=0)
+            ),
+            productos_agotados=Count('id', filter=Q(stock_actual__lte=0)),
+            productos_exceso_stock=Count(
+                'id', filter=Q(stock_actual__gte=F('stock_maximo'), stock_maximo__gt=0)
+            ),
+            productos_reposicion_urgente=Count('id', filter=Q(stock_actual__lte=F('stock_minimo'))),
+            valor_total_inventario=Sum(F('stock_actual') * F('precio_compra')),
+        ),
+        distribucion(),
+    )
+    estadisticas['valor_total_inventario'] = float(estadisticas['valor_total_inventario'] or 0)
+
+    return respuesta_json({
+        'estadisticas_generales': estadisticas,
+        'distribucion_por_categoria': por_categoria,
+    })
@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+
+
+class ComunConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'comun'
+    verbose_name = 'Utilidades Comunes'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+
+        if getattr(settings, 'CONSULTAS_LENTAS_MS', 0) > 0:
+            from .consultas_lentas import instalar_detector
+
+            connection_created.connect(instalar_detector, dispatch_uid='consultas-lentas')
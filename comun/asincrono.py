@@ -0,0 +1,73 @@
+"""Utilidades para vistas asíncronas de solo lectura.
+
+DRF no ejecuta vistas ``async``, así que estas vistas son funciones de Django
+que reutilizan los filtros y serializers de la API síncrona y devuelven el
+mismo JSON (formato de paginación incluido). Las consultas usan el ORM
+asíncrono (``acount``, ``aaggregate``, ``aiterator``): mientras la base de
+datos responde, el bucle de eventos atiende otras peticiones.
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Paginator
+from django.http import HttpResponse
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+PARAMETRO_PAGINA = "page"
+
+
+def renderizar_json(datos):
+    """JSON con el renderer por defecto de DRF (y por tanto los mismos bytes)"""
+    return api_settings.DEFAULT_RENDERER_CLASSES[0]().render(datos)
+
+
+def respuesta_json(datos, status=200):
+    return HttpResponse(renderizar_json(datos), status=status, content_type="application/json")
+
+
+@sync_to_async
+def filtrar(filterset_class, request, queryset):
+    """Aplicar un FilterSet fuera del bucle de eventos.
+
+    Validar filtros como ``ModelChoiceFilter`` consulta la base de datos, lo
+    que no está permitido desde código asíncrono. Devuelve ``(queryset, errores)``.
+    """
+    filterset = filterset_class(request.GET, queryset=queryset, request=request)
+    if not filterset.is_valid():
+        return None, filterset.errors
+    return filterset.qs, None
+
+
+def _enlace(request, numero):
+    url = request.build_absolute_uri()
+    if numero == 1:
+        return remove_query_param(url, PARAMETRO_PAGINA)
+    return replace_query_param(url, PARAMETRO_PAGINA, numero)
+
+
+async def paginar(request, queryset, serializer_class, tamano):
+    """Equivalente asíncrono de ``PageNumberPagination`` + serializer ``many=True``.
+
+    Devuelve ``(datos, status)``. El total se obtiene con ``acount`` y la
+    página se lee con ``aiterator``; el serializer solo recorre objetos ya
+    cargados, por lo que el queryset debe traer sus relaciones con
+    ``select_related``.
+    """
+    paginador = Paginator(queryset, tamano)
+    paginador.count = await queryset.acount()
+    numero = request.GET.get(PARAMETRO_PAGINA) or 1
+    if numero in PageNumberPagination.last_page_strings:
+        numero = paginador.num_pages
+    try:
+        pagina = paginador.page(numero)
+    except InvalidPage:
+        return {"detail": PageNumberPagination.invalid_page_message}, 404
+
+    objetos = [objeto async for objeto in pagina.object_list.aiterator()]
+    datos = {
+        "count": paginador.count,
+        "next": _enlace(request, pagina.next_page_number()) if pagina.has_next() else None,
+        "previous": _enlace(request, pagina.previous_page_number()) if pagina.has_previous() else None,
+        "results": serializer_class(objetos, many=True).data,
+    }
+    return datos, 200
@@ -0,0 +1,131 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .metricas import cache_respuestas
+
+_PREFIJO_TAG = "tag:"
+_contadores = Counter()
+_lock_contadores = threading.Lock()
+
+
+def _registrar(evento):
+    with _lock_contadores:
+        _contadores[evento] += 1
+    cache_respuestas.inc(evento=evento)
+
+
+def estadisticas_cache():
+    """Aciertos y fallos del caché de respuestas en este proceso"""
+    with _lock_contadores:
+        aciertos = _contadores["aciertos"]
+        fallos = _contadores["fallos"]
+        invalidaciones = _contadores["invalidaciones"]
+    total = aciertos + fallos
+    return {
+        "backend": settings.CACHES["default"]["BACKEND"],
+        "respuestas_activas": cache_respuestas_activo(),
+        "aciertos": aciertos,
+        "fallos": fallos,
+        "invalidaciones": invalidaciones,
+        "ratio_aciertos": round(aciertos / total, 4) if total else 0.0,
+    }
+
+
+def reiniciar_estadisticas_cache():
+    with _lock_contadores:
+        _contadores.clear()
+
+
+def _versiones_tags(tags):
+    """Versión actual de cada tag; los tags sin versión se inicializan.
+
+    Un tag ausente (nuevo o expulsado por el LRU) recibe una versión basada en
+    el reloj, nunca 0, para no revivir respuestas guardadas con una versión
+    anterior.
+    """
+    claves = [f"{_PREFIJO_TAG}{tag}" for tag in tags]
+    versiones = cache.get_many(claves)
+    for clave in claves:
+        if clave not in versiones:
+            cache.add(clave, time.time_ns(), None)
+            versiones[clave] = cache.get(clave)
+    return [versiones[clave] for clave in claves]
+
+
+def version_tag(tag):
+    """Versión actual de un tag, útil para validar cachés propios del proceso"""
+    return _versiones_tags([tag])[0]
+
+
+def invalidar_tags(*tags):
+    """Invalidar todas las respuestas cacheadas que dependen de ``tags``"""
+    if not tags:
+        return
+    version = time.time_ns()
+    cache.set_many({f"{_PREFIJO_TAG}{tag}": version for tag in tags}, None)
+    _registrar("invalidaciones")
+
+
+def clave_respuesta(request, prefijo, tags):
+    """Clave de caché a partir de la ruta, los parámetros normalizados y los tags"""
+    parametros = sorted(
+        (nombre, valor)
+        for nombre in request.query_params
+        for valor in request.query_params.getlist(nombre)
+        if valor != ""
+    )
+    partes = [
+        prefijo,
+        request.get_host(),
+        request.path,
+        urlencode(parametros),
+        ",".join(str(version) for version in _versiones_tags(tags)),
+    ]
+    huella = hashlib.md5("|".join(partes).encode(), usedforsecurity=False).hexdigest()
+    return f"respuesta:{prefijo}:{huella}"
+
+
+def cache_respuestas_activo():
+    return getattr(settings, "CACHE_RESPUESTAS", True)
+
+
+def cachear_respuesta(tags, timeout=None):
+    """Decorador para acciones GET de un ViewSet que cachea ``response.data``.
+
+    ``tags`` es una lista de tags o una función ``(vista, **kwargs)`` que la
+    devuelve. Cualquier ``invalidar_tags`` sobre uno de ellos deja obsoletas
+    las respuestas guardadas. Solo se cachean respuestas 200, y solo con
+    ``CACHE_RESPUESTAS`` activo (backend compartido entre procesos).
+    """
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            if request.method != "GET" or not cache_respuestas_activo():
+                return metodo(self, request, *args, **kwargs)
+
+            etiquetas = tags(self, **kwargs) if callable(tags) else tags
+            clave = clave_respuesta(request, f"{self.basename}:{self.action}", etiquetas)
+            guardada = cache.get(clave)
+            if guardada is not None:
+                _registrar("aciertos")
+                return Response(guardada)
+
+            _registrar("fallos")
+            respuesta = metodo(self, request, *args, **kwargs)
+            if isinstance(respuesta, Response) and respuesta.status_code == 200:
+                cache.set(
+                    clave,
+                    respuesta.data,
+                    timeout or getattr(settings, "CACHE_RESPUESTAS_TIMEOUT", 300),
+                )
+            return respuesta
+        return envoltura
+    return decorador
@@ -0,0 +1,43 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def respuesta_condicional(obtener_version):
+    """Decorador para acciones GET de un ViewSet con soporte ETag / Last-Modified.
+
+    ``obtener_version`` es una función sin argumentos que devuelve
+    ``(token, ultima_modificacion)`` con consultas baratas. El ETag combina
+    ese token con la ruta completa (filtros y página incluidos). Si el cliente
+    ya tiene esa versión se responde 304 sin consultar ni serializar datos.
+    """
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return metodo(self, request, *args, **kwargs)
+            
+            token, ultima_modificacion = obtener_version()
+            huella = hashlib.md5(
+                f"{token}|{request.get_full_path()}".encode(), usedforsecurity=False
+            ).hexdigest()
+            etag = quote_etag(huella)
+            last_modified = (
+                int(ultima_modificacion.timestamp()) if ultima_modificacion else None
+            )
+            
+            respuesta = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if respuesta is None:
+                respuesta = metodo(self, request, *args, **kwargs)
+            
+            if respuesta.status_code in (200, 304):
+                respuesta.headers.setdefault('ETag', etag)
+                if last_modified and not respuesta.has_header('Last-Modified'):
+                    respuesta.headers['Last-Modified'] = http_date(last_modified)
+            return respuesta
+        return envoltura
+    return decorador
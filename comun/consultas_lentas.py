@@ -0,0 +1,116 @@
+"""Registro de consultas SQL lentas.
+
+Se instala con ``connection.execute_wrapper`` en cada conexión que se abre
+cuando ``CONSULTAS_LENTAS_MS`` es mayor que cero. Las consultas normales solo
+pagan una comparación; para las lentas se guarda el SQL, la duración, un
+resumen de la pila (vista, serializer o señal que la originó) y, si
+``CONSULTAS_LENTAS_EXPLAIN`` está activo, el plan de ejecución.
+
+Las entradas se guardan en un buffer circular dentro del caché por defecto:
+con un backend compartido (file o redis) el comando ``consultas_lentas`` ve
+las de todos los procesos; con locmem solo las del proceso que las registra.
+"""
+import threading
+import time
+import traceback
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
+
+CLAVE_CACHE = "consultas_lentas"
+MAX_LONGITUD_SQL = 4000
+_lock = threading.Lock()
+_estado = threading.local()
+
+
+def _umbral_segundos():
+    return getattr(settings, "CONSULTAS_LENTAS_MS", 0) / 1000
+
+
+def resumen_pila(limite=6):
+    """Últimos marcos de la pila que pertenecen al proyecto (sin dependencias)"""
+    raiz = str(Path(settings.BASE_DIR).resolve())
+    propio = str(Path(__file__).resolve())
+    marcos = [
+        f"{Path(marco.filename).resolve().relative_to(raiz)}:{marco.lineno} en {marco.name}"
+        for marco in traceback.extract_stack()
+        if marco.filename.startswith(raiz)
+        and "site-packages" not in marco.filename
+        and str(Path(marco.filename).resolve()) != propio
+    ]
+    return marcos[-limite:]
+
+
+def _explicar(conexion, sql, params):
+    """Plan de ejecución de una consulta SELECT, o None si no aplica"""
+    if not sql.lstrip().upper().startswith("SELECT"):
+        return None
+    prefijo = "EXPLAIN QUERY PLAN" if conexion.vendor == "sqlite" else "EXPLAIN"
+    _estado.explicando = True
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute(f"{prefijo} {sql}", params)
+            columnas = [columna[0] for columna in cursor.description]
+            return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+    except DatabaseError as error:
+        return [{"error": str(error)}]
+    finally:
+        _estado.explicando = False
+
+
+def registrar_consulta_lenta(entrada):
+    capacidad = getattr(settings, "CONSULTAS_LENTAS_CAPACIDAD", 200)
+    with _lock:
+        entradas = cache.get(CLAVE_CACHE) or []
+        entradas.append(entrada)
+        cache.set(CLAVE_CACHE, entradas[-capacidad:], None)
+
+
+def consultas_lentas():
+    """Entradas registradas, de la más reciente a la más antigua"""
+    return list(reversed(cache.get(CLAVE_CACHE) or []))
+
+
+def limpiar_consultas_lentas():
+    cache.delete(CLAVE_CACHE)
+
+
+def detector_consultas_lentas(execute, sql, params, many, context):
+    """Wrapper para ``connection.execute_wrapper``"""
+    if getattr(_estado, "explicando", False):
+        return execute(sql, params, many, context)
+
+    inicio = time.perf_counter()
+    resultado = execute(sql, params, many, context)
+    duracion = time.perf_counter() - inicio
+
+    umbral = _umbral_segundos()
+    if umbral and duracion >= umbral:
+        conexion = context["connection"]
+        explicar = getattr(settings, "CONSULTAS_LENTAS_EXPLAIN", False) and not many
+        registrar_consulta_lenta(
+            {
+                "fecha": timezone.now().isoformat(),
+                "duracion_ms": round(duracion * 1000, 3),
+                "base_datos": conexion.alias,
+                "sql": sql[:MAX_LONGITUD_SQL],
+                "parametros": repr(params)[:500],
+                "origen": resumen_pila(),
+                "plan": _explicar(conexion, sql, params) if explicar else None,
+            }
+        )
+    return resultado
+
+
+def instalar_detector(sender, connection, **kwargs):
+    """Receptor de ``connection_created``: añade el detector una sola vez.
+
+    Se inserta al principio de la lista porque ``execute_wrapper`` quita
+    siempre el último wrapper al salir; la conexión puede abrirse dentro de
+    uno de esos bloques (por ejemplo, el middleware de instrumentación).
+    """
+    if detector_consultas_lentas not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, detector_consultas_lentas)
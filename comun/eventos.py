@@ -0,0 +1,66 @@
+"""Pub/sub en proceso para flujos de eventos (SSE).
+
+Cada conexión abierta se suscribe con una cola propia en su bucle de
+eventos. ``publicar`` puede llamarse desde cualquier hilo (vistas WSGI,
+señales ejecutadas por ``sync_to_async``): la entrega se programa en el
+bucle de cada suscriptor con ``call_soon_threadsafe``.
+"""
+import asyncio
+import threading
+
+
+class Suscripcion:
+    def __init__(self, capacidad):
+        self.bucle = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(capacidad)
+        # Un cliente lento que llena su cola deja de recibir eventos; el flujo
+        # se cierra y el cliente se reconecta y recupera desde la base de datos
+        self.desbordada = False
+
+    def _encolar(self, evento):
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.desbordada = True
+
+    def entregar(self, evento):
+        try:
+            self.bucle.call_soon_threadsafe(self._encolar, evento)
+        except RuntimeError:
+            # Bucle ya cerrado: la conexión terminó
+            pass
+
+    async def siguiente(self, espera):
+        """Siguiente evento o ``None`` si no llega ninguno en ``espera`` segundos"""
+        try:
+            return await asyncio.wait_for(self.cola.get(), espera)
+        except asyncio.TimeoutError:
+            return None
+
+
+class BusEventos:
+    def __init__(self, capacidad=1000):
+        self.capacidad = capacidad
+        self._suscripciones = set()
+        self._lock = threading.Lock()
+
+    @property
+    def suscriptores(self):
+        return len(self._suscripciones)
+
+    def suscribir(self):
+        """Crear una suscripción en el bucle de eventos actual"""
+        suscripcion = Suscripcion(self.capacidad)
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def publicar(self, evento):
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            suscripcion.entregar(evento)
@@ -0,0 +1,121 @@
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Medición de la petición en curso (None fuera de una petición instrumentada)
+medicion_actual = contextvars.ContextVar("medicion_actual", default=None)
+
+
+class Medicion:
+    """Costes acumulados durante una petición"""
+
+    __slots__ = ("consultas", "tiempo_sql", "tiempo_serializacion", "_profundidad")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_serializacion = 0.0
+        self._profundidad = 0
+
+    def contador_sql(self, execute, sql, params, many, context):
+        """Wrapper para ``connection.execute_wrapper``"""
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo_sql += time.perf_counter() - inicio
+            self.consultas += 1
+
+    @contextmanager
+    def serializando(self):
+        # Solo se mide el serializer más externo; los anidados ya están incluidos
+        self._profundidad += 1
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._profundidad -= 1
+            if self._profundidad == 0:
+                self.tiempo_serializacion += time.perf_counter() - inicio
+
+
+_serializacion_instalada = False
+
+
+def instalar_medicion_serializacion():
+    """Envolver ``BaseSerializer.data`` para medir el tiempo de serialización"""
+    global _serializacion_instalada
+    if _serializacion_instalada:
+        return
+
+    from rest_framework.serializers import BaseSerializer
+
+    data_original = BaseSerializer.data
+
+    def data(serializer):
+        medicion = medicion_actual.get()
+        if medicion is None:
+            return data_original.fget(serializer)
+        with medicion.serializando():
+            return data_original.fget(serializer)
+
+    BaseSerializer.data = property(data)
+    _serializacion_instalada = True
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, min(len(valores_ordenados) - 1, round(p / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+
+class RegistroEndpoints:
+    """Ventana móvil de muestras por endpoint para calcular percentiles"""
+
+    METRICAS = ("total_ms", "sql_ms", "consultas", "serializacion_ms")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._muestras = defaultdict(self._nueva_ventana)
+        self._totales = defaultdict(int)
+
+    def _nueva_ventana(self):
+        return deque(maxlen=getattr(settings, "INSTRUMENTACION_MUESTRAS", 500))
+
+    def registrar(self, endpoint, muestra):
+        with self._lock:
+            self._muestras[endpoint].append(muestra)
+            self._totales[endpoint] += 1
+
+    def reiniciar(self):
+        with self._lock:
+            self._muestras.clear()
+            self._totales.clear()
+
+    def resumen(self):
+        with self._lock:
+            copia = {endpoint: list(muestras) for endpoint, muestras in self._muestras.items()}
+            totales = dict(self._totales)
+
+        resultado = {}
+        for endpoint, muestras in sorted(copia.items()):
+            estadisticas = {"peticiones": totales[endpoint], "ventana": len(muestras)}
+            for metrica in self.METRICAS:
+                valores = sorted(muestra[metrica] for muestra in muestras)
+                estadisticas[metrica] = {
+                    "p50": round(percentil(valores, 50), 3),
+                    "p95": round(percentil(valores, 95), 3),
+                    "p99": round(percentil(valores, 99), 3),
+                    "max": round(valores[-1], 3),
+                }
+            resultado[endpoint] = estadisticas
+        return resultado
+
+
+registro_endpoints = RegistroEndpoints()
@@ -0,0 +1,89 @@
+"""Renderer y parser JSON de DRF acelerados con orjson.
+
+orjson es opcional: si no está instalado, o si la petición pide algo que
+orjson no sabe producir (JSON indentado distinto de 2, salida ASCII), las
+clases se comportan exactamente como ``JSONRenderer`` y ``JSONParser``.
+
+La salida es la misma que la de DRF byte a byte salvo en los ``float``: los
+tipos que orjson no serializa igual que DRF (``Decimal``, fechas y horas,
+textos traducibles, QuerySets) pasan por el mismo ``JSONEncoder.default`` de
+DRF. Los ``float`` salen con el formato de orjson, con el mismo valor pero
+otro texto (``1e-05`` como ``0.00001``, ``1e+16`` como ``1e16``), y NaN o
+infinito como ``null`` donde DRF lanza un error. Detectarlos antes costaría
+tanto como la serialización estándar; los importes y cantidades de la API
+son ``Decimal`` y salen como texto.
+
+Al leer, un número de 19 cifras o más (un entero que orjson convertiría en
+``float``) hace que el cuerpo se lea con el parser estándar.
+"""
+from io import BytesIO
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+if orjson is not None:
+    # Las fechas van a ``default`` para conservar el formato de DRF ("Z" en UTC)
+    OPCIONES = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    _por_defecto = JSONEncoder().default
+
+SEPARADORES_JS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+# Cifras a "0" y el resto a espacio: un número de 19 cifras o más (puede no
+# caber en 64 bits) aparece como 19 ceros seguidos. También coincide con
+# textos con muchas cifras; en ese caso solo se pierde la aceleración
+_SOLO_CIFRAS = bytes(ord("0") if 0x30 <= byte <= 0x39 else ord(" ") for byte in range(256))
+_NUMERO_LARGO = b"0" * 19
+
+
+def disponible():
+    return orjson is not None
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            resultado = orjson.dumps(data, default=_por_defecto, option=OPCIONES)
+        except TypeError:
+            # Enteros de más de 64 bits y tipos sin conversión: vía estándar
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Igual que DRF: JSON válido también como JavaScript
+        for caracter, escape in SEPARADORES_JS:
+            if caracter in resultado:
+                resultado = resultado.replace(caracter, escape)
+        return resultado
+
+
+class JSONRapidoParser(JSONParser):
+    renderer_class = JSONRapidoRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        if (
+            orjson is None
+            or not self.strict
+            or encoding.lower().replace("_", "-") not in ("utf-8", "utf8")
+        ):
+            return super().parse(stream, media_type, parser_context)
+        contenido = stream.read()
+        if _NUMERO_LARGO in contenido.translate(_SOLO_CIFRAS):
+            return super().parse(BytesIO(contenido), media_type, parser_context)
+        try:
+            return orjson.loads(contenido)
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
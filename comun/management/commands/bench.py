@@ -0,0 +1,182 @@
+import json
+import platform
+import statistics
+import time
+from urllib.parse import urlencode
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from Alertas.models import Alerta
+from Alertas.services import AlertaService
+from Productos.models import Producto
+from comun.instrumentacion import Medicion, percentil
+from movimientos.models import Movimiento
+
+
+def _pagina_intermedia(total, tamano=10):
+    return max(1, (total // tamano) // 2)
+
+
+class Command(BaseCommand):
+    help = "Mide endpoints y servicios clave y guarda los resultados en JSON para comparar regresiones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=20)
+        parser.add_argument("--calentamiento", type=int, default=2,
+                            help="Ejecuciones previas que no se miden")
+        parser.add_argument("--objetivos", nargs="*",
+                            help="Medir solo estos objetivos (por nombre)")
+        parser.add_argument("--con-cache", action="store_true",
+                            help="No vaciar el caché de respuestas entre ejecuciones")
+        parser.add_argument("--salida", help="Fichero JSON donde guardar los resultados")
+        parser.add_argument("--comparar", help="JSON de una ejecución anterior para comparar p50")
+
+    def handle(self, *args, **options):
+        objetivos = self._objetivos()
+        if options["objetivos"]:
+            desconocidos = set(options["objetivos"]) - set(objetivos)
+            if desconocidos:
+                raise CommandError(f"Objetivos desconocidos: {', '.join(sorted(desconocidos))}")
+            objetivos = {nombre: objetivos[nombre] for nombre in options["objetivos"]}
+
+        resultados = {}
+        for nombre, ejecutar in objetivos.items():
+            resultados[nombre] = self._medir(
+                ejecutar, options["repeticiones"], options["calentamiento"], options["con_cache"]
+            )
+            r = resultados[nombre]
+            self.stdout.write(
+                f"{nombre:<32} p50 {r['p50_ms']:>9.2f} ms  p99 {r['p99_ms']:>9.2f} ms  "
+                f"{r['consultas']:>4} consultas"
+            )
+
+        informe = {
+            "fecha": timezone.now().isoformat(),
+            "entorno": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "base_datos": connection.vendor,
+                "con_cache": options["con_cache"],
+                "repeticiones": options["repeticiones"],
+            },
+            "volumen": {
+                "productos": Producto.objects.count(),
+                "movimientos": Movimiento.objects.count(),
+                "alertas": Alerta.objects.count(),
+            },
+            "resultados": resultados,
+        }
+
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as fichero:
+                json.dump(informe, fichero, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+
+        if options["comparar"]:
+            self._comparar(options["comparar"], resultados)
+
+    def _objetivos(self):
+        """Nombre -> función sin argumentos que ejecuta una operación completa"""
+        cliente = APIClient(HTTP_HOST="localhost")
+        # Usuario sin guardar: basta para las vistas que exigen autenticación
+        cliente.force_authenticate(user=User(username="bench", is_staff=True))
+
+        productos = Producto.objects.filter(activo=True).count()
+        alertas = Alerta.objects.filter(activa=True).count()
+        # La lista de movimientos no está paginada: se mide filtrada por producto
+        producto = Producto.objects.order_by("id").only("nombre").first()
+        nombre_producto = producto.nombre if producto else ""
+
+        def get(url):
+            def ejecutar():
+                respuesta = cliente.get(url)
+                if respuesta.status_code != 200:
+                    raise CommandError(f"{url} respondió {respuesta.status_code}")
+                if respuesta.streaming:
+                    for _ in respuesta.streaming_content:
+                        pass
+            return ejecutar
+
+        def sin_efectos(funcion):
+            # Los servicios que escriben se deshacen para que cada ejecución
+            # parta de los mismos datos
+            def ejecutar():
+                with transaction.atomic():
+                    funcion()
+                    transaction.set_rollback(True)
+            return ejecutar
+
+        return {
+            "productos.lista": get("/api/productos/productos/"),
+            "productos.lista_intermedia": get(
+                f"/api/productos/productos/?page={_pagina_intermedia(productos)}"
+            ),
+            "productos.resumen_inventario": get("/api/productos/productos/resumen_inventario/"),
+            "productos.exportar_csv": get("/api/productos/productos/exportar_csv/"),
+            "alertas.lista": get("/api/alertas/alertas/"),
+            "alertas.lista_intermedia": get(
+                f"/api/alertas/alertas/?page={_pagina_intermedia(alertas)}"
+            ),
+            "alertas.resumen": get("/api/alertas/alertas/resumen/"),
+            "movimientos.por_producto": get(
+                f"/api/movimientos/movimientos/?{urlencode({'producto__nombre': nombre_producto})}"
+            ),
+            "servicio.revision_automatica": sin_efectos(
+                AlertaService().ejecutar_revision_automatica
+            ),
+        }
+
+    def _medir(self, ejecutar, repeticiones, calentamiento, con_cache):
+        for _ in range(calentamiento):
+            if not con_cache:
+                cache.clear()
+            ejecutar()
+
+        tiempos = []
+        for _ in range(repeticiones):
+            if not con_cache:
+                cache.clear()
+            medicion = Medicion()
+            with connection.execute_wrapper(medicion.contador_sql):
+                inicio = time.perf_counter()
+                ejecutar()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        ordenados = sorted(tiempos)
+        return {
+            "repeticiones": repeticiones,
+            "min_ms": round(ordenados[0], 3),
+            "p50_ms": round(percentil(ordenados, 50), 3),
+            "p95_ms": round(percentil(ordenados, 95), 3),
+            "p99_ms": round(percentil(ordenados, 99), 3),
+            "max_ms": round(ordenados[-1], 3),
+            "media_ms": round(statistics.fmean(ordenados), 3),
+            # Consultas y tiempo SQL de la última ejecución
+            "consultas": medicion.consultas,
+            "sql_ms": round(medicion.tiempo_sql * 1000, 3),
+        }
+
+    def _comparar(self, ruta, resultados):
+        with open(ruta, encoding="utf-8") as fichero:
+            anteriores = json.load(fichero)["resultados"]
+
+        self.stdout.write("\nComparación de p50 con la ejecución anterior:")
+        for nombre, actual in resultados.items():
+            anterior = anteriores.get(nombre)
+            if not anterior:
+                continue
+            cambio = (actual["p50_ms"] - anterior["p50_ms"]) / anterior["p50_ms"] * 100
+            linea = (
+                f"{nombre:<32} {anterior['p50_ms']:>9.2f} -> {actual['p50_ms']:>9.2f} ms "
+                f"({cambio:+.1f}%)  consultas {anterior['consultas']} -> {actual['consultas']}"
+            )
+            if cambio > 10:
+                self.stdout.write(self.style.WARNING(linea))
+            else:
+                self.stdout.write(linea)
@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from io import BytesIO
+from itertools import count
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from comun.instrumentacion import percentil
+
+# Pares (WSGI con DRF, ASGI asíncrona) que devuelven el mismo JSON
+ENDPOINTS = {
+    "productos.lista": ("/api/productos/productos/", "/api/productos/async/productos/"),
+    "productos.resumen_inventario": (
+        "/api/productos/productos/resumen_inventario/",
+        "/api/productos/async/productos/resumen_inventario/",
+    ),
+    "alertas.lista": ("/api/alertas/alertas/", "/api/alertas/async/alertas/"),
+    "alertas.resumen": ("/api/alertas/alertas/resumen/", "/api/alertas/async/alertas/resumen/"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga: compara el throughput de las vistas WSGI de DRF con "
+        "sus variantes ASGI asíncronas con el mismo número de trabajadores"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--trabajadores", type=int, default=8,
+                            help="Hilos WSGI y peticiones simultáneas en el bucle ASGI")
+        parser.add_argument("--segundos", type=float, default=5)
+        parser.add_argument("--objetivos", nargs="*", choices=sorted(ENDPOINTS),
+                            help="Medir solo estos endpoints")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            raise CommandError("Se necesita una base de datos compartida entre hilos (fichero o servidor)")
+
+        # Un parámetro distinto en cada petición evita el caché de respuestas
+        # de las vistas DRF, que las asíncronas no tienen
+        self._secuencia = count()
+        trabajadores, segundos = options["trabajadores"], options["segundos"]
+        self.stdout.write(f"{trabajadores} trabajadores, {segundos:g} s por escenario")
+        for nombre in options["objetivos"] or ENDPOINTS:
+            url_wsgi, url_asgi = ENDPOINTS[nombre]
+            wsgi = self._medir_wsgi(url_wsgi, trabajadores, segundos)
+            asgi = asyncio.run(self._medir_asgi(url_asgi, trabajadores, segundos))
+            for servidor, resultado in (("wsgi", wsgi), ("asgi", asgi)):
+                self.stdout.write(
+                    f"{nombre:<30} {servidor}  {resultado['peticiones_s']:8.1f} pet/s  "
+                    f"p50 {resultado['p50_ms']:8.2f} ms  p99 {resultado['p99_ms']:8.2f} ms  "
+                    f"errores {resultado['errores']}"
+                )
+
+    def _consulta(self):
+        return f"_bench={next(self._secuencia)}"
+
+    def _resultado(self, tiempos, errores, duracion):
+        tiempos.sort()
+        return {
+            "peticiones_s": len(tiempos) / duracion,
+            "p50_ms": percentil(tiempos, 50),
+            "p99_ms": percentil(tiempos, 99),
+            "errores": errores,
+        }
+
+    def _medir_wsgi(self, url, trabajadores, segundos):
+        """Un hilo por trabajador, como ``gunicorn --threads`` con un proceso"""
+        aplicacion = WSGIHandler()
+        fin = time.monotonic() + segundos
+        tiempos, errores = [], []
+        lock = threading.Lock()
+
+        def trabajador():
+            propios, fallos = [], 0
+            try:
+                while time.monotonic() < fin:
+                    entorno = {
+                        "REQUEST_METHOD": "GET",
+                        "PATH_INFO": url,
+                        "QUERY_STRING": self._consulta(),
+                        "SERVER_NAME": "localhost",
+                        "SERVER_PORT": "80",
+                        "HTTP_HOST": "localhost",
+                        "wsgi.url_scheme": "http",
+                        "wsgi.input": BytesIO(),
+                    }
+                    estado = []
+                    inicio = time.perf_counter()
+                    respuesta = aplicacion(entorno, lambda status, headers: estado.append(status))
+                    b"".join(respuesta)
+                    respuesta.close()
+                    if estado[0].startswith("200"):
+                        propios.append((time.perf_counter() - inicio) * 1000)
+                    else:
+                        fallos += 1
+            finally:
+                connections.close_all()
+            with lock:
+                tiempos.extend(propios)
+                errores.append(fallos)
+
+        hilos = [threading.Thread(target=trabajador) for _ in range(trabajadores)]
+        inicio = time.monotonic()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return self._resultado(tiempos, sum(errores), time.monotonic() - inicio)
+
+    async def _medir_asgi(self, url, trabajadores, segundos):
+        """Peticiones simultáneas sobre un único bucle de eventos, como un worker de uvicorn"""
+        from config.asgi import application
+
+        fin = time.monotonic() + segundos
+        tiempos, errores = [], 0
+
+        async def peticion():
+            enviados = []
+            pendiente = [{"type": "http.request", "body": b"", "more_body": False}]
+
+            async def recibir():
+                if pendiente:
+                    return pendiente.pop()
+                # El cliente no se desconecta: Django cancela esta espera al responder
+                await asyncio.Event().wait()
+
+            async def enviar(mensaje):
+                enviados.append(mensaje)
+
+            await application(
+                {
+                    "type": "http",
+                    "asgi": {"version": "3.0"},
+                    "http_version": "1.1",
+                    "method": "GET",
+                    "scheme": "http",
+                    "path": url,
+                    "raw_path": url.encode(),
+                    "query_string": self._consulta().encode(),
+                    "root_path": "",
+                    "headers": [(b"host", b"localhost")],
+                    "client": ("127.0.0.1", 0),
+                    "server": ("localhost", 80),
+                },
+                recibir,
+                enviar,
+            )
+            return enviados[0]["status"]
+
+        async def trabajador():
+            nonlocal errores
+            while time.monotonic() < fin:
+                inicio = time.perf_counter()
+                if await peticion() == 200:
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                else:
+                    errores += 1
+
+        inicio = time.monotonic()
+        await asyncio.gather(*(trabajador() for _ in range(trabajadores)))
+        return self._resultado(tiempos, errores, time.monotonic() - inicio)
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+
+from Alertas.models import Alerta, condicion_auto_resoluble
+from Alertas.services import COLUMNAS_PRODUCTO_REVISION
+from Alertas.views import AlertaViewSet
+from Productos.models import Producto
+from Productos.views import ProductoViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Bytes que devuelve la base de datos para los listados y revisiones "
+        "con todas las columnas y con las columnas podadas con only()"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=1000, help="Filas por listado")
+
+    def handle(self, *args, **options):
+        filas = options["filas"]
+        plan_productos = ProductoViewSet.planes_consulta["list"]
+        plan_alertas = AlertaViewSet.planes_consulta["list"]
+        critico = dict(activo=True, stock_actual__lte=models.F("stock_minimo"), stock_actual__gt=0)
+        casos = (
+            (
+                "productos list",
+                Producto.objects.select_related("categoria")[:filas],
+                plan_productos.aplicar(Producto.objects.all())[:filas],
+            ),
+            (
+                "alertas list",
+                Alerta.objects.select_related(
+                    "producto", "creada_por", "leida_por", "atendida_por", "proveedor", "movimiento"
+                ).con_urgencia()[:filas],
+                plan_alertas.aplicar(Alerta.objects.all())[:filas],
+            ),
+            (
+                "revisión stock crítico",
+                Producto.objects.filter(**critico),
+                Producto.objects.filter(**critico).only(*COLUMNAS_PRODUCTO_REVISION),
+            ),
+            (
+                "auto-resolución",
+                Alerta.objects.filter(condicion_auto_resoluble(), activa=True),
+                Alerta.objects.filter(condicion_auto_resoluble(), activa=True).only(
+                    "id", "estado", "fecha_atencion", "atendida_por", "activa"
+                ),
+            ),
+        )
+
+        mysql = connection.vendor == "mysql"
+        self.stdout.write(
+            "Bytes_sent de la sesión MySQL" if mysql
+            else f"{connection.vendor}: estimación del protocolo de texto de MySQL"
+        )
+        for nombre, completa, podada in casos:
+            antes, numero = self._bytes(completa, mysql)
+            despues, _ = self._bytes(podada, mysql)
+            ahorro = 100 * (1 - despues / antes) if antes else 0
+            self.stdout.write(
+                f"{nombre:<24} {numero:>6} filas  todas {antes / 1024:9.1f} KiB  "
+                f"only() {despues / 1024:9.1f} KiB  -{ahorro:4.1f}%"
+            )
+
+    def _bytes(self, queryset, mysql):
+        """Bytes del resultado de ``queryset`` y número de filas"""
+        sql, parametros = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if mysql:
+                inicial = self._bytes_enviados(cursor)
+                cursor.execute(sql, parametros)
+                numero = len(cursor.fetchall())
+                return self._bytes_enviados(cursor) - inicial, numero
+            cursor.execute(sql, parametros)
+            resultado = cursor.fetchall()
+        # Cada valor va como cadena con un prefijo de longitud (1 byte hasta 250)
+        total = sum(
+            len(str(valor).encode()) + 1 if valor is not None else 1
+            for fila in resultado for valor in fila
+        )
+        return total, len(resultado)
+
+    def _bytes_enviados(self, cursor):
+        cursor.execute("SHOW SESSION STATUS LIKE 'Bytes_sent'")
+        return int(cursor.fetchone()[1])
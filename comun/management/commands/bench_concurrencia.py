@@ -0,0 +1,142 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from Productos.models import CategoriaProducto, Producto
+from comun.instrumentacion import percentil
+
+CODIGO_PRODUCTO = "BENCH-CONC"
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el rendimiento de MovimientoViewSet con escritores y lectores "
+        "concurrentes sobre una base SQLite en fichero"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--escritores", type=int, default=4)
+        parser.add_argument("--lectores", type=int, default=4)
+        parser.add_argument("--segundos", type=float, default=10)
+        parser.add_argument("--comparar-diferido", action="store_true",
+                            help="Repetir la medición con BEGIN diferido para comparar")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            raise CommandError("Se necesita una base de datos en fichero (config.settings_sqlite)")
+
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            modo_diario = cursor.fetchone()[0] if connection.vendor == "sqlite" else "-"
+        self.stdout.write(f"Base de datos: {connection.vendor}  journal_mode={modo_diario}")
+
+        producto = self._preparar_producto()
+        escenarios = [("BEGIN IMMEDIATE", True)]
+        if options["comparar_diferido"]:
+            escenarios.append(("BEGIN diferido", False))
+
+        try:
+            for nombre, inmediata in escenarios:
+                with override_settings(SQLITE_BEGIN_IMMEDIATE=inmediata):
+                    resultado = self._medir(
+                        producto, options["escritores"], options["lectores"], options["segundos"]
+                    )
+                self.stdout.write(
+                    f"{nombre:<16} escrituras {resultado['escrituras_s']:8.1f}/s "
+                    f"(p99 {resultado['escritura_p99_ms']:7.1f} ms, errores {resultado['errores']})  "
+                    f"lecturas {resultado['lecturas_s']:8.1f}/s "
+                    f"(p99 {resultado['lectura_p99_ms']:7.1f} ms)"
+                )
+        finally:
+            Producto.objects.filter(codigo=CODIGO_PRODUCTO).delete()
+
+    def _preparar_producto(self):
+        categoria, _ = CategoriaProducto.objects.get_or_create(
+            nombre="Benchmark concurrencia", defaults={"tipo": "OTRO"}
+        )
+        producto, _ = Producto.objects.update_or_create(
+            codigo=CODIGO_PRODUCTO,
+            defaults={
+                "nombre": "Producto benchmark concurrencia",
+                "categoria": categoria,
+                "stock_actual": 10 ** 8,
+                "stock_minimo": 0,
+                "unidad_medida": "UNIDAD",
+                "precio_compra": 1,
+                "precio_venta": 1,
+            },
+        )
+        return producto
+
+    def _medir(self, producto, escritores, lectores, segundos):
+        usuario = User(username="bench", is_staff=True)
+        fin = time.monotonic() + segundos
+        tiempos_escritura, tiempos_lectura = [], []
+        errores = []
+        lock = threading.Lock()
+
+        def escritor(numero):
+            cliente = APIClient(HTTP_HOST="localhost")
+            cliente.force_authenticate(user=usuario)
+            datos = {
+                "producto": producto.id,
+                "tipo": "entrada" if numero % 2 else "salida",
+                "cantidad": 1,
+            }
+            propios = []
+            try:
+                while time.monotonic() < fin:
+                    inicio = time.perf_counter()
+                    respuesta = cliente.post("/api/movimientos/movimientos/", datos)
+                    if respuesta.status_code == 201:
+                        propios.append((time.perf_counter() - inicio) * 1000)
+                    else:
+                        with lock:
+                            errores.append(respuesta.status_code)
+            finally:
+                connections.close_all()
+            with lock:
+                tiempos_escritura.extend(propios)
+
+        def lector():
+            cliente = APIClient(HTTP_HOST="localhost")
+            cliente.force_authenticate(user=usuario)
+            url = f"/api/movimientos/movimientos/?producto__nombre={producto.nombre}&ordering=-fecha"
+            propios = []
+            try:
+                while time.monotonic() < fin:
+                    inicio = time.perf_counter()
+                    cliente.get(url)
+                    propios.append((time.perf_counter() - inicio) * 1000)
+            finally:
+                connections.close_all()
+            with lock:
+                tiempos_lectura.extend(propios)
+
+        hilos = [threading.Thread(target=escritor, args=(i,)) for i in range(escritores)]
+        hilos += [threading.Thread(target=lector) for _ in range(lectores)]
+        inicio = time.monotonic()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.monotonic() - inicio
+
+        # Los movimientos del escenario se borran para que el siguiente
+        # lea el mismo volumen
+        producto.movimientos.all().delete()
+
+        tiempos_escritura.sort()
+        tiempos_lectura.sort()
+        return {
+            "escrituras_s": len(tiempos_escritura) / duracion,
+            "escritura_p99_ms": percentil(tiempos_escritura, 99),
+            "lecturas_s": len(tiempos_lectura) / duracion,
+            "lectura_p99_ms": percentil(tiempos_lectura, 99),
+            "errores": len(errores),
+        }
@@ -0,0 +1,108 @@
+import statistics
+import time
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from comun.instrumentacion import percentil
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la latencia de un endpoint con conexiones nuevas por petición "
+        "(CONN_MAX_AGE=0) y con conexiones persistentes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="/api/productos/productos/")
+        parser.add_argument("--peticiones", type=int, default=300)
+        parser.add_argument("--conn-max-age", type=int, default=300,
+                            help="CONN_MAX_AGE del escenario persistente")
+        parser.add_argument("--latencia-conexion", type=float, default=0,
+                            help="Milisegundos añadidos al abrir cada conexión para "
+                                 "simular el handshake con un servidor remoto")
+        parser.add_argument("--wal", action="store_true",
+                            help="Activar journal_mode=WAL si la base de datos es SQLite")
+
+    def handle(self, *args, **options):
+        conexion = connections["default"]
+        if options["wal"]:
+            if conexion.vendor != "sqlite":
+                raise CommandError("--wal solo aplica a SQLite")
+            with conexion.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode=WAL")
+
+        latencia = options["latencia_conexion"] / 1000
+
+        def simular_handshake(sender, **kwargs):
+            time.sleep(latencia)
+
+        if latencia:
+            connection_created.connect(simular_handshake, weak=False, dispatch_uid="bench-handshake")
+
+        original = {
+            clave: conexion.settings_dict[clave] for clave in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS")
+        }
+        escenarios = (
+            ("sin persistencia", {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}),
+            ("persistente", {"CONN_MAX_AGE": options["conn_max_age"], "CONN_HEALTH_CHECKS": True}),
+        )
+        try:
+            for nombre, ajustes in escenarios:
+                conexion.close()
+                conexion.settings_dict.update(ajustes)
+                tiempos, aperturas = self._medir(options["url"], options["peticiones"])
+                self.stdout.write(
+                    f"{nombre:<18} p50 {percentil(tiempos, 50):8.2f} ms  "
+                    f"p99 {percentil(tiempos, 99):8.2f} ms  media {statistics.fmean(tiempos):8.2f} ms  "
+                    f"conexiones abiertas {aperturas}"
+                )
+        finally:
+            conexion.close()
+            conexion.settings_dict.update(original)
+            connection_created.disconnect(dispatch_uid="bench-handshake")
+
+    def _medir(self, url, peticiones):
+        """Atender peticiones con el handler WSGI real.
+
+        A diferencia del cliente de pruebas, el handler envía request_started
+        y request_finished, que es donde Django cierra o reutiliza la conexión
+        según CONN_MAX_AGE.
+        """
+        aplicacion = WSGIHandler()
+        partes = urlsplit(url)
+        aperturas = 0
+
+        def contar(sender, **kwargs):
+            nonlocal aperturas
+            aperturas += 1
+
+        connection_created.connect(contar, weak=False, dispatch_uid="bench-aperturas")
+        tiempos = []
+        try:
+            for _ in range(peticiones):
+                entorno = {
+                    "REQUEST_METHOD": "GET",
+                    "PATH_INFO": partes.path,
+                    "QUERY_STRING": partes.query,
+                    "SERVER_NAME": "localhost",
+                    "SERVER_PORT": "80",
+                    "HTTP_HOST": "localhost",
+                    "wsgi.url_scheme": "http",
+                    "wsgi.input": BytesIO(),
+                }
+                estado = []
+                inicio = time.perf_counter()
+                respuesta = aplicacion(entorno, lambda status, headers: estado.append(status))
+                b"".join(respuesta)
+                respuesta.close()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                if not estado[0].startswith("200"):
+                    raise CommandError(f"{url} respondió {estado[0]}")
+        finally:
+            connection_created.disconnect(dispatch_uid="bench-aperturas")
+        return sorted(tiempos), aperturas
@@ -0,0 +1,90 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from Productos.models import CategoriaProducto, Producto
+from Productos.serializers import ProductoListSerializer
+from comun.json_rapido import JSONRapidoParser, JSONRapidoRenderer, disponible
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el renderer y el parser JSON de DRF con los de orjson sobre "
+        "filas de ProductoListSerializer"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=10000)
+        parser.add_argument("--repeticiones", type=int, default=10)
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def handle(self, *args, **options):
+        productos = self._productos(options["filas"], options["semilla"])
+        inicio = time.perf_counter()
+        datos = ProductoListSerializer(productos, many=True).data
+        serializacion = (time.perf_counter() - inicio) * 1000
+        self.stdout.write(
+            f"{options['filas']} filas de ProductoListSerializer, "
+            f"orjson {'disponible' if disponible() else 'no instalado (fallback estándar)'}"
+        )
+
+        estandar = JSONRenderer().render(datos)
+        rapido = JSONRapidoRenderer().render(datos)
+        if estandar != rapido:
+            self.stderr.write("La salida de JSONRapidoRenderer difiere de JSONRenderer")
+        self.stdout.write(
+            f"Tamaño: {len(estandar) / 1024:.0f} KiB, salida idéntica: {estandar == rapido}, "
+            f"serialización previa {serializacion:.2f} ms"
+        )
+
+        repeticiones = options["repeticiones"]
+        pares = (
+            ("render", lambda: JSONRenderer().render(datos), lambda: JSONRapidoRenderer().render(datos)),
+            ("parse", lambda: JSONParser().parse(BytesIO(estandar)),
+             lambda: JSONRapidoParser().parse(BytesIO(estandar))),
+        )
+        for nombre, funcion_estandar, funcion_rapida in pares:
+            base = self._medir(funcion_estandar, repeticiones)
+            nuevo = self._medir(funcion_rapida, repeticiones)
+            self.stdout.write(
+                f"{nombre:<7} DRF {base:8.2f} ms  orjson {nuevo:8.2f} ms  x{base / nuevo:5.1f}"
+            )
+
+    def _medir(self, funcion, repeticiones):
+        funcion()
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos)
+
+    def _productos(self, filas, semilla):
+        """Productos en memoria: el benchmark no depende de la base de datos"""
+        aleatorio = random.Random(semilla)
+        categorias = [
+            CategoriaProducto(id=numero, nombre=f"Categoría {numero}", tipo=tipo)
+            for numero, tipo in enumerate(("SEMILLA", "ABONO", "HERBICIDA", "HERRAMIENTA"), start=1)
+        ]
+        productos = []
+        for numero in range(filas):
+            stock_minimo = aleatorio.randint(5, 50)
+            productos.append(Producto(
+                id=numero + 1,
+                codigo=f"BENCH-{numero:06d}",
+                nombre=f"Producto benchmark {numero}",
+                categoria=aleatorio.choice(categorias),
+                stock_actual=Decimal(aleatorio.randint(0, 500)),
+                stock_minimo=Decimal(stock_minimo),
+                stock_maximo=Decimal(stock_minimo * 10),
+                unidad_medida="KG",
+                precio_compra=Decimal(aleatorio.randint(100, 10000)) / 100,
+                precio_venta=Decimal(aleatorio.randint(100, 15000)) / 100,
+            ))
+        return productos
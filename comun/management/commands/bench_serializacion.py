@@ -0,0 +1,64 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from Alertas.models import Alerta
+from Alertas.serializers import AlertaListSerializer, AlertaListValores
+from Productos.models import Producto
+from Productos.serializers import ProductoListSerializer, ProductoListValores
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara ProductoListSerializer y AlertaListSerializer con la "
+        "serialización por values() sobre filas de la base de datos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=5000)
+        parser.add_argument("--repeticiones", type=int, default=10)
+
+    def handle(self, *args, **options):
+        filas = options["filas"]
+        casos = (
+            (
+                "productos",
+                Producto.objects.select_related("categoria").order_by("id")[:filas],
+                ProductoListSerializer,
+                ProductoListValores(),
+            ),
+            (
+                "alertas",
+                Alerta.objects.select_related("producto", "creada_por").order_by("id")[:filas],
+                AlertaListSerializer,
+                AlertaListValores(),
+            ),
+        )
+        for nombre, queryset, serializer_class, rapida in casos:
+            def estandar():
+                return serializer_class(queryset.all(), many=True).data
+
+            def valores():
+                return rapida.representar(rapida.consulta(queryset.all()))
+
+            base, datos = self._medir(estandar, options["repeticiones"])
+            nuevo, datos_valores = self._medir(valores, options["repeticiones"])
+            identica = JSONRenderer().render(datos) == JSONRenderer().render(datos_valores)
+            if not identica:
+                self.stderr.write(f"{nombre}: la salida por values() difiere del serializer")
+            self.stdout.write(
+                f"{nombre:<10} {len(datos):>6} filas  serializer {base:8.2f} ms  "
+                f"values() {nuevo:8.2f} ms  x{base / nuevo:5.1f}  salida idéntica: {identica}"
+            )
+
+    def _medir(self, funcion, repeticiones):
+        """Mediana en ms de consulta + serialización, y el último resultado"""
+        resultado = funcion()
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos), resultado
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from comun.consultas_lentas import consultas_lentas, limpiar_consultas_lentas
+
+
+class Command(BaseCommand):
+    help = "Muestra las consultas SQL lentas registradas (CONSULTAS_LENTAS_MS)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limite", type=int, default=20)
+        parser.add_argument("--json", action="store_true", help="Salida en JSON")
+        parser.add_argument("--limpiar", action="store_true",
+                            help="Vaciar el registro después de mostrarlo")
+
+    def handle(self, *args, **options):
+        entradas = consultas_lentas()[: options["limite"]]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(entradas, indent=2, ensure_ascii=False, default=str))
+        elif not entradas:
+            self.stdout.write("No hay consultas lentas registradas")
+        else:
+            for entrada in entradas:
+                self.stdout.write(self.style.WARNING(
+                    f"{entrada['fecha']}  {entrada['duracion_ms']:.1f} ms  [{entrada['base_datos']}]"
+                ))
+                self.stdout.write(f"  {entrada['sql']}")
+                for marco in entrada["origen"]:
+                    self.stdout.write(f"    {marco}")
+                for paso in entrada["plan"] or []:
+                    self.stdout.write(f"    plan: {paso}")
+
+        if options["limpiar"]:
+            limpiar_consultas_lentas()
+            self.stdout.write(self.style.SUCCESS("Registro de consultas lentas vaciado"))
@@ -0,0 +1,329 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta, timezone as tz
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from Alertas.models import Alerta, ConfiguracionAlerta, HistorialAlerta
+from Productos.models import CategoriaProducto, HistorialPrecio, LoteProducto, Producto
+from comun.cache import invalidar_tags
+from comun.models import VersionTabla
+from movimientos.models import Movimiento
+
+# Prefijos que identifican los datos sintéticos para poder limpiarlos
+PREFIJO_CODIGO = "GEN-"
+PREFIJO_CATEGORIA = "GEN "
+
+TIPOS_PERECEDEROS = {"SEMILLA", "ABONO", "HERBICIDA"}
+PESOS_ALERTAS = {
+    "STOCK_CRITICO": 30,
+    "STOCK_AGOTADO": 10,
+    "PROXIMO_VENCIMIENTO": 25,
+    "PRODUCTO_VENCIDO": 10,
+    "STOCK_EXCESO": 5,
+    "PRECIO_CAMBIO": 10,
+    "SIN_MOVIMIENTOS": 10,
+}
+PESOS_ESTADOS = {"PENDIENTE": 45, "LEIDA": 20, "ATENDIDA": 25, "DESCARTADA": 10}
+
+
+@contextmanager
+def fechas_manuales(*campos):
+    """Permitir fijar campos ``auto_now_add`` al insertar datos históricos"""
+    originales = [(campo, campo.auto_now_add) for campo in campos]
+    for campo, _ in originales:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, valor in originales:
+            campo.auto_now_add = valor
+
+
+class Command(BaseCommand):
+    help = "Genera un conjunto de datos agrícolas sintético y reproducible para pruebas de rendimiento"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--categorias", type=int, default=20)
+        parser.add_argument("--productos", type=int, default=2000)
+        parser.add_argument("--lotes-por-producto", type=int, default=3,
+                            help="Máximo de lotes por producto perecedero")
+        parser.add_argument("--movimientos", type=int, default=100000)
+        parser.add_argument("--alertas", type=int, default=5000)
+        parser.add_argument("--cambios-precio", type=int, default=4,
+                            help="Máximo de cambios de precio por producto")
+        parser.add_argument("--proveedores", type=int, default=25,
+                            help="Número de proveedores principales distintos")
+        parser.add_argument("--dias", type=int, default=365,
+                            help="Días de historia que cubren movimientos, alertas y precios")
+        parser.add_argument("--semilla", type=int, default=42)
+        parser.add_argument("--tamano-lote", type=int, default=5000,
+                            help="Filas por INSERT de bulk_create")
+        parser.add_argument("--limpiar", action="store_true",
+                            help="Borrar antes los datos generados previamente")
+
+    def handle(self, *args, **options):
+        self.aleatorio = random.Random(options["semilla"])
+        self.ahora = timezone.now()
+        self.hoy = self.ahora.date()
+        self.dias = options["dias"]
+        self.tamano_lote = options["tamano_lote"]
+
+        if options["limpiar"]:
+            self._medir("Limpieza", self._limpiar)
+        elif Producto.objects.filter(codigo__startswith=PREFIJO_CODIGO).exists():
+            self.stdout.write(self.style.ERROR(
+                "Ya existen datos generados; use --limpiar para regenerarlos"
+            ))
+            return
+
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            categorias = self._medir("Categorías", self._crear_categorias, options["categorias"])
+            productos = self._medir(
+                "Productos y lotes", self._crear_productos, categorias,
+                options["productos"], options["lotes_por_producto"], options["proveedores"],
+            )
+            self._medir("Historial de precios", self._crear_historial_precios,
+                        productos, options["cambios_precio"])
+            self._medir("Movimientos", self._crear_movimientos, productos, options["movimientos"])
+            self._medir("Alertas", self._crear_alertas, productos, options["alertas"])
+
+        # bulk_create no envía señales: se invalidan cachés y versiones a mano
+        ConfiguracionAlerta.crear_faltantes()
+        VersionTabla.incrementar("alertas")
+        invalidar_tags("productos", "categorias", "alertas")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dataset generado en {time.perf_counter() - inicio:.1f}s (semilla {options['semilla']})"
+        ))
+
+    def _medir(self, etiqueta, funcion, *args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        total = f" ({len(resultado)})" if isinstance(resultado, list) else ""
+        self.stdout.write(f"  {etiqueta}{total}: {time.perf_counter() - inicio:.2f}s")
+        return resultado
+
+    def _fecha_pasada(self):
+        return self.ahora - timedelta(seconds=self.aleatorio.randrange(self.dias * 86400))
+
+    def _limpiar(self):
+        """Borrar los datos generados con DELETE directos (sin cargar filas ni señales)"""
+        def tabla(modelo):
+            return connection.ops.quote_name(modelo._meta.db_table)
+
+        def columna(modelo, campo):
+            return connection.ops.quote_name(modelo._meta.get_field(campo).column)
+
+        productos = f"SELECT id FROM {tabla(Producto)} WHERE {columna(Producto, 'codigo')} LIKE %s"
+        alertas = f"SELECT id FROM {tabla(Alerta)} WHERE {columna(Alerta, 'producto')} IN ({productos})"
+        parametro = [f"{PREFIJO_CODIGO}%"]
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {tabla(HistorialAlerta)} WHERE {columna(HistorialAlerta, 'alerta')} IN ({alertas})",
+                parametro,
+            )
+            for modelo in (Alerta, Movimiento, LoteProducto, HistorialPrecio):
+                cursor.execute(
+                    f"DELETE FROM {tabla(modelo)} WHERE {columna(modelo, 'producto')} IN ({productos})",
+                    parametro,
+                )
+            cursor.execute(
+                f"DELETE FROM {tabla(Producto)} WHERE {columna(Producto, 'codigo')} LIKE %s", parametro
+            )
+            cursor.execute(
+                f"DELETE FROM {tabla(CategoriaProducto)} WHERE {columna(CategoriaProducto, 'nombre')} LIKE %s",
+                [f"{PREFIJO_CATEGORIA}%"],
+            )
+
+    def _crear_categorias(self, cantidad):
+        tipos = [tipo for tipo, _ in CategoriaProducto.TIPO_CHOICES]
+        CategoriaProducto.objects.bulk_create(
+            [
+                CategoriaProducto(
+                    nombre=f"{PREFIJO_CATEGORIA}{i:04d}",
+                    tipo=tipos[i % len(tipos)],
+                    descripcion="Categoría generada",
+                )
+                for i in range(cantidad)
+            ],
+            batch_size=self.tamano_lote,
+        )
+        # Se vuelve a leer para obtener los ids también en MySQL
+        return list(CategoriaProducto.objects.filter(nombre__startswith=PREFIJO_CATEGORIA))
+
+    def _crear_productos(self, categorias, cantidad, max_lotes, num_proveedores):
+        aleatorio = self.aleatorio
+        unidades = [unidad for unidad, _ in Producto.UNIDAD_CHOICES]
+        proveedores = [f"Proveedor {i:02d}" for i in range(1, num_proveedores + 1)]
+
+        productos = []
+        lotes_por_codigo = {}
+        for i in range(cantidad):
+            categoria = aleatorio.choice(categorias)
+            codigo = f"{PREFIJO_CODIGO}{i:07d}"
+            stock_minimo = Decimal(aleatorio.randint(10, 100))
+            precio_compra = Decimal(aleatorio.randint(500, 50000)) / 100
+
+            # Los perecederos tienen lotes (y unos pocos solo fecha propia);
+            # el stock del producto es la suma de sus lotes
+            lotes = []
+            fecha_vencimiento = None
+            if categoria.tipo in TIPOS_PERECEDEROS:
+                if aleatorio.random() < 0.1:
+                    fecha_vencimiento = self.hoy + timedelta(days=aleatorio.randint(-30, 365))
+                else:
+                    for numero in range(aleatorio.randint(1, max(1, max_lotes))):
+                        lotes.append((
+                            f"L{numero + 1:03d}",
+                            Decimal(aleatorio.randint(0, 400)),
+                            self.hoy + timedelta(days=aleatorio.randint(-30, 540)),
+                        ))
+            if lotes:
+                stock = sum(cantidad_lote for _, cantidad_lote, _ in lotes)
+                lotes_por_codigo[codigo] = lotes
+            else:
+                stock = Decimal(aleatorio.randint(0, 600))
+
+            productos.append(Producto(
+                codigo=codigo,
+                nombre=f"{categoria.get_tipo_display()} {i:07d}",
+                categoria=categoria,
+                stock_actual=stock,
+                stock_minimo=stock_minimo,
+                stock_maximo=stock_minimo * aleatorio.randint(3, 10),
+                unidad_medida=aleatorio.choice(unidades),
+                precio_compra=precio_compra,
+                precio_venta=(precio_compra * Decimal(aleatorio.randint(120, 160)) / 100).quantize(Decimal("0.01")),
+                proveedor_principal=aleatorio.choice(proveedores),
+                ubicacion_almacen=f"Pasillo {aleatorio.randint(1, 20)}",
+                fecha_vencimiento=fecha_vencimiento,
+                # bulk_create no ejecuta la señal que calcula el estado
+                estado="AGOTADO" if stock <= 0 else "DISPONIBLE",
+                activo=aleatorio.random() > 0.02,
+            ))
+
+        Producto.objects.bulk_create(productos, batch_size=self.tamano_lote)
+        productos = list(
+            Producto.objects.filter(codigo__startswith=PREFIJO_CODIGO)
+            .only("id", "codigo", "precio_compra", "precio_venta")
+            .order_by("id")
+        )
+
+        with fechas_manuales(LoteProducto._meta.get_field("fecha_ingreso")):
+            LoteProducto.objects.bulk_create(
+                (
+                    LoteProducto(
+                        producto_id=producto.id,
+                        lote=lote,
+                        cantidad=cantidad_lote,
+                        fecha_vencimiento=vencimiento,
+                        fecha_ingreso=self._fecha_pasada(),
+                    )
+                    for producto in productos
+                    for lote, cantidad_lote, vencimiento in lotes_por_codigo.get(producto.codigo, ())
+                ),
+                batch_size=self.tamano_lote,
+            )
+        return productos
+
+    def _crear_historial_precios(self, productos, max_cambios):
+        aleatorio = self.aleatorio
+        registros = []
+        for producto in productos:
+            # Se camina hacia atrás desde el precio actual para que el
+            # último cambio coincida con el precio vigente del producto
+            compra, venta = producto.precio_compra, producto.precio_venta
+            fechas = sorted((self._fecha_pasada() for _ in range(aleatorio.randint(0, max_cambios))), reverse=True)
+            for fecha in fechas:
+                factor = Decimal(aleatorio.randint(85, 115)) / 100
+                compra_anterior = (compra / factor).quantize(Decimal("0.01"))
+                venta_anterior = (venta / factor).quantize(Decimal("0.01"))
+                registros.append(HistorialPrecio(
+                    producto_id=producto.id,
+                    precio_compra_anterior=compra_anterior,
+                    precio_compra_nuevo=compra,
+                    precio_venta_anterior=venta_anterior,
+                    precio_venta_nuevo=venta,
+                    fecha_cambio=fecha,
+                ))
+                compra, venta = compra_anterior, venta_anterior
+
+        with fechas_manuales(HistorialPrecio._meta.get_field("fecha_cambio")):
+            HistorialPrecio.objects.bulk_create(registros, batch_size=self.tamano_lote)
+        return registros
+
+    def _crear_movimientos(self, productos, cantidad):
+        """Insertar los movimientos por bloques con ``executemany``.
+
+        Con un millón de filas, construir instancias del modelo para
+        ``bulk_create`` domina el tiempo total; aquí se preparan tuplas ya
+        adaptadas por el backend y se insertan directamente.
+        """
+        aleatorio = self.aleatorio
+        ids = [producto.id for producto in productos]
+        segundos = self.dias * 86400
+        # Fecha base sin zona (UTC), como la guarda el backend con USE_TZ
+        base = timezone.make_naive(self.ahora, tz.utc)
+        adaptar_fecha = connection.ops.adapt_datetimefield_value
+
+        columnas = ", ".join(
+            connection.ops.quote_name(Movimiento._meta.get_field(campo).column)
+            for campo in ("producto", "tipo", "cantidad", "fecha")
+        )
+        sql = (
+            f"INSERT INTO {connection.ops.quote_name(Movimiento._meta.db_table)} "
+            f"({columnas}) VALUES (%s, %s, %s, %s)"
+        )
+
+        with connection.cursor() as cursor:
+            for inicio in range(0, cantidad, self.tamano_lote * 10):
+                bloque = min(self.tamano_lote * 10, cantidad - inicio)
+                cursor.executemany(sql, [
+                    (
+                        aleatorio.choice(ids),
+                        "entrada" if aleatorio.random() < 0.4 else "salida",
+                        aleatorio.randint(1, 50),
+                        adaptar_fecha(base - timedelta(seconds=aleatorio.randrange(segundos))),
+                    )
+                    for _ in range(bloque)
+                ])
+        return cantidad
+
+    def _crear_alertas(self, productos, cantidad):
+        aleatorio = self.aleatorio
+        tipos, pesos_tipos = zip(*PESOS_ALERTAS.items())
+        estados, pesos_estados = zip(*PESOS_ESTADOS.items())
+        niveles = [nivel for nivel, _ in Alerta.NIVEL_ALERTA_CHOICES]
+
+        alertas = []
+        for _ in range(cantidad):
+            producto = aleatorio.choice(productos)
+            tipo = aleatorio.choices(tipos, pesos_tipos)[0]
+            estado = aleatorio.choices(estados, pesos_estados)[0]
+            creacion = self._fecha_pasada()
+            atendida = estado == "ATENDIDA"
+            alertas.append(Alerta(
+                producto_id=producto.id,
+                tipo=tipo,
+                nivel=aleatorio.choice(niveles),
+                estado=estado,
+                titulo=f"{dict(Alerta.TIPO_ALERTA_CHOICES)[tipo]} - {producto.codigo}",
+                mensaje="Alerta generada para pruebas de rendimiento",
+                fecha_creacion=creacion,
+                fecha_lectura=creacion + timedelta(hours=1) if estado != "PENDIENTE" else None,
+                fecha_atencion=creacion + timedelta(hours=6) if atendida else None,
+                fecha_resolucion=creacion + timedelta(hours=6) if atendida else None,
+                activa=estado in ("PENDIENTE", "LEIDA"),
+                auto_generada=True,
+            ))
+
+        with fechas_manuales(Alerta._meta.get_field("fecha_creacion")):
+            Alerta.objects.bulk_create(alertas, batch_size=self.tamano_lote)
+        return alertas
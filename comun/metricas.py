@@ -0,0 +1,278 @@
+"""Registro de métricas en proceso con exposición en formato Prometheus.
+
+Cada proceso acumula sus contadores e histogramas en memoria. Si
+``METRICAS_DIRECTORIO`` está configurado (varios workers de gunicorn), cada
+proceso vuelca periódicamente su estado a ``metricas-<pid>.json`` en ese
+directorio y la exposición suma los ficheros de todos los procesos, incluidos
+los de workers ya reciclados, para que los contadores no retrocedan.
+"""
+import atexit
+import glob
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_etiquetas(nombres, valores, extra=()):
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    pares.extend(f'{nombre}="{_escapar(valor)}"' for nombre, valor in extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatear_numero(valor):
+    if valor == math.inf:
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, registro, nombre, descripcion, etiquetas=()):
+        self.registro = registro
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiquetas = tuple(etiquetas)
+
+    def _clave(self, etiquetas):
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(
+                f"{self.nombre} requiere las etiquetas {', '.join(self.etiquetas) or '(ninguna)'}"
+            )
+        return tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+
+
+class Contador(Metrica):
+    tipo = "counter"
+
+    def inc(self, valor=1, **etiquetas):
+        if valor < 0:
+            raise ValueError("Un contador solo puede incrementarse")
+        clave = self._clave(etiquetas)
+        with self.registro.lock:
+            valores = self.registro.valores.setdefault(self.nombre, {})
+            valores[clave] = valores.get(clave, 0) + valor
+        self.registro.volcar_si_corresponde()
+
+
+class Histograma(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, registro, nombre, descripcion, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(registro, nombre, descripcion, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self.registro.lock:
+            valores = self.registro.valores.setdefault(self.nombre, {})
+            estado = valores.get(clave)
+            if estado is None:
+                estado = valores[clave] = {"buckets": [0] * len(self.buckets), "suma": 0.0, "total": 0}
+            for indice, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    estado["buckets"][indice] += 1
+                    break
+            estado["suma"] += valor
+            estado["total"] += 1
+        self.registro.volcar_si_corresponde()
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+
+class RegistroMetricas:
+    """Métricas declaradas y sus valores en este proceso"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metricas = {}
+        self.valores = {}
+        self._ultimo_volcado = 0.0
+        atexit.register(self.volcar)
+
+    def contador(self, nombre, descripcion, etiquetas=()):
+        return self._declarar(Contador(self, nombre, descripcion, etiquetas))
+
+    def histograma(self, nombre, descripcion, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        return self._declarar(Histograma(self, nombre, descripcion, etiquetas, buckets))
+
+    def _declarar(self, metrica):
+        if metrica.nombre in self.metricas:
+            raise ValueError(f"La métrica {metrica.nombre} ya está registrada")
+        self.metricas[metrica.nombre] = metrica
+        return metrica
+
+    def reiniciar(self):
+        with self.lock:
+            self.valores.clear()
+
+    # Almacenamiento compartido entre procesos
+
+    def _directorio(self):
+        return getattr(settings, "METRICAS_DIRECTORIO", None)
+
+    def _instantanea(self):
+        with self.lock:
+            return {
+                nombre: [
+                    [list(clave), dict(valor, buckets=list(valor["buckets"])) if isinstance(valor, dict) else valor]
+                    for clave, valor in valores.items()
+                ]
+                for nombre, valores in self.valores.items()
+            }
+
+    def volcar(self):
+        """Escribir el estado de este proceso en su fichero (escritura atómica)"""
+        directorio = self._directorio()
+        if not directorio:
+            return
+        os.makedirs(directorio, exist_ok=True)
+        ruta = os.path.join(directorio, f"metricas-{os.getpid()}.json")
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as fichero:
+            json.dump(self._instantanea(), fichero)
+        os.replace(temporal, ruta)
+        self._ultimo_volcado = time.monotonic()
+
+    def volcar_si_corresponde(self):
+        if not self._directorio():
+            return
+        intervalo = getattr(settings, "METRICAS_INTERVALO_VOLCADO", 5)
+        if time.monotonic() - self._ultimo_volcado >= intervalo:
+            self.volcar()
+
+    def agregado(self):
+        """Valores sumados de todos los procesos (o solo de este)"""
+        directorio = self._directorio()
+        if not directorio:
+            instantaneas = [self._instantanea()]
+        else:
+            self.volcar()
+            instantaneas = []
+            for ruta in glob.glob(os.path.join(directorio, "metricas-*.json")):
+                try:
+                    with open(ruta, encoding="utf-8") as fichero:
+                        instantaneas.append(json.load(fichero))
+                except (OSError, ValueError):
+                    # Un worker puede estar reescribiendo su fichero
+                    continue
+
+        total = {}
+        for instantanea in instantaneas:
+            for nombre, entradas in instantanea.items():
+                if nombre not in self.metricas:
+                    continue
+                valores = total.setdefault(nombre, {})
+                for clave, valor in entradas:
+                    clave = tuple(clave)
+                    if isinstance(valor, dict):
+                        actual = valores.setdefault(
+                            clave, {"buckets": [0] * len(valor["buckets"]), "suma": 0.0, "total": 0}
+                        )
+                        actual["buckets"] = [a + b for a, b in zip(actual["buckets"], valor["buckets"])]
+                        actual["suma"] += valor["suma"]
+                        actual["total"] += valor["total"]
+                    else:
+                        valores[clave] = valores.get(clave, 0) + valor
+        return total
+
+    def exponer(self, valores=None):
+        """Texto en formato de exposición de Prometheus"""
+        valores = self.agregado() if valores is None else valores
+        lineas = []
+        for nombre, metrica in sorted(self.metricas.items()):
+            lineas.append(f"# HELP {nombre} {metrica.descripcion}")
+            lineas.append(f"# TYPE {nombre} {metrica.tipo}")
+            for clave, valor in sorted(valores.get(nombre, {}).items()):
+                if metrica.tipo == "counter":
+                    etiquetas = _formatear_etiquetas(metrica.etiquetas, clave)
+                    lineas.append(f"{nombre}{etiquetas} {_formatear_numero(valor)}")
+                    continue
+                acumulado = 0
+                # Los valores por encima del último límite solo cuentan en +Inf
+                cuentas = valor["buckets"] + [valor["total"] - sum(valor["buckets"])]
+                for limite, cantidad in zip(metrica.buckets + (math.inf,), cuentas):
+                    acumulado += cantidad
+                    etiquetas = _formatear_etiquetas(
+                        metrica.etiquetas, clave, [("le", _formatear_numero(limite))]
+                    )
+                    lineas.append(f"{nombre}_bucket{etiquetas} {acumulado}")
+                etiquetas = _formatear_etiquetas(metrica.etiquetas, clave)
+                lineas.append(f"{nombre}_sum{etiquetas} {_formatear_numero(valor['suma'])}")
+                lineas.append(f"{nombre}_count{etiquetas} {valor['total']}")
+        return "\n".join(lineas) + "\n"
+
+
+registro = RegistroMetricas()
+
+movimientos_aplicados = registro.contador(
+    "agricola_movimientos_aplicados_total",
+    "Movimientos de inventario aplicados al stock",
+    ["tipo"],
+)
+conflictos_stock = registro.contador(
+    "agricola_conflictos_stock_total",
+    "Movimientos rechazados al aplicar el stock bajo bloqueo (carrera o bloqueo agotado)",
+    ["motivo"],
+)
+revisiones_alertas = registro.contador(
+    "agricola_revisiones_alertas_total",
+    "Revisiones automáticas de alertas ejecutadas",
+)
+alertas_creadas = registro.contador(
+    "agricola_alertas_creadas_total",
+    "Alertas creadas por las revisiones automáticas",
+    ["tipo"],
+)
+alertas_resueltas = registro.contador(
+    "agricola_alertas_resueltas_total",
+    "Alertas resueltas automáticamente por las revisiones",
+)
+duracion_revision = registro.histograma(
+    "agricola_revision_alertas_segundos",
+    "Duración de cada paso de la revisión automática por tipo de alerta",
+    ["tipo"],
+)
+filas_exportadas = registro.contador(
+    "agricola_filas_exportadas_total",
+    "Filas enviadas por las exportaciones",
+    ["recurso", "formato"],
+)
+cache_respuestas = registro.contador(
+    "agricola_cache_respuestas_total",
+    "Eventos del caché de respuestas (acierto, fallo, invalidación)",
+    ["evento"],
+)
+
+
+def texto_metricas():
+    """Exposición completa, con el ratio de aciertos del caché derivado"""
+    valores = registro.agregado()
+    texto = registro.exponer(valores)
+
+    eventos = valores.get(cache_respuestas.nombre, {})
+    aciertos = eventos.get(("aciertos",), 0)
+    consultas = aciertos + eventos.get(("fallos",), 0)
+    ratio = aciertos / consultas if consultas else 0.0
+    return texto + (
+        "# HELP agricola_cache_respuestas_ratio_aciertos Aciertos sobre consultas al caché de respuestas\n"
+        "# TYPE agricola_cache_respuestas_ratio_aciertos gauge\n"
+        f"agricola_cache_respuestas_ratio_aciertos {ratio!r}\n"
+    )
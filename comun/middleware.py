@@ -0,0 +1,96 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from .instrumentacion import (
+    Medicion,
+    instalar_medicion_serializacion,
+    medicion_actual,
+    registro_endpoints,
+)
+
+logger = logging.getLogger("comun.instrumentacion")
+
+
+def nombre_endpoint(request):
+    """Vista y acción resueltas, p. ej. ``ProductoViewSet.list``"""
+    coincidencia = getattr(request, "resolver_match", None)
+    if coincidencia is None:
+        return None
+
+    vista = coincidencia.func
+    clase = getattr(vista, "cls", None) or getattr(vista, "view_class", None)
+    if clase is None:
+        return coincidencia.view_name or getattr(vista, "__name__", None)
+
+    # Los ViewSets enrutados guardan el mapa método -> acción
+    acciones = getattr(vista, "actions", None) or {}
+    accion = acciones.get(request.method.lower(), request.method.lower())
+    return f"{clase.__name__}.{accion}"
+
+
+class InstrumentacionMiddleware:
+    """Medir consultas SQL, serialización y tiempo total por endpoint.
+
+    Es opcional: se activa con ``INSTRUMENTACION=True``. Añade una cabecera
+    ``Server-Timing``, escribe una línea JSON en el logger
+    ``comun.instrumentacion`` y acumula muestras para ``/api/_metrics/``.
+    """
+
+    # Rutas que no se miden para no contaminar las propias métricas
+    EXCLUIDAS = ("/api/_metrics/", "/static/")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instalar_medicion_serializacion()
+
+    def __call__(self, request):
+        if request.path.startswith(self.EXCLUIDAS):
+            return self.get_response(request)
+
+        medicion = Medicion()
+        token = medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pila:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(medicion.contador_sql))
+                respuesta = self.get_response(request)
+        finally:
+            medicion_actual.reset(token)
+        total = time.perf_counter() - inicio
+
+        endpoint = nombre_endpoint(request)
+        muestra = {
+            "total_ms": total * 1000,
+            "sql_ms": medicion.tiempo_sql * 1000,
+            "consultas": medicion.consultas,
+            "serializacion_ms": medicion.tiempo_serializacion * 1000,
+        }
+
+        respuesta["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={muestra["sql_ms"]:.2f};desc="{medicion.consultas} consultas"',
+                f'ser;dur={muestra["serializacion_ms"]:.2f}',
+                f'total;dur={muestra["total_ms"]:.2f}',
+            ]
+        )
+
+        if endpoint is not None:
+            registro_endpoints.registrar(endpoint, muestra)
+
+        logger.info(
+            json.dumps(
+                {
+                    "endpoint": endpoint,
+                    "metodo": request.method,
+                    "ruta": request.path,
+                    "estado": respuesta.status_code,
+                    **{clave: round(valor, 3) for clave, valor in muestra.items()},
+                }
+            )
+        )
+        return respuesta
@@ -0,0 +1,35 @@
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+
+class VersionTabla(models.Model):
+    """Contador de versión por tabla para validar cachés de clientes"""
+    tabla = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Versión de Tabla'
+        verbose_name_plural = 'Versiones de Tablas'
+    
+    def __str__(self):
+        return f"{self.tabla} v{self.version}"
+    
+    @classmethod
+    def incrementar(cls, tabla):
+        """Incrementar la versión de una tabla con un único UPDATE"""
+        actualizadas = cls.objects.filter(tabla=tabla).update(
+            version=F('version') + 1,
+            fecha_actualizacion=timezone.now()
+        )
+        if not actualizadas:
+            cls.objects.get_or_create(tabla=tabla, defaults={'version': 1})
+    
+    @classmethod
+    def obtener(cls, tabla):
+        """Devolver (version, fecha_actualizacion) de una tabla"""
+        registro = cls.objects.filter(tabla=tabla).values_list(
+            'version', 'fecha_actualizacion'
+        ).first()
+        return registro or (0, None)
@@ -0,0 +1,66 @@
+"""Forma del queryset de un ViewSet según la acción.
+
+Cada acción declara qué relaciones une (``select_related``), cuáles
+precarga (``prefetch_related``), qué métodos del QuerySet aplica para
+anotar y qué columnas lee (``only()``). Así un listado no arrastra los
+joins y precargas que solo necesita el detalle, y un ``count()`` o un
+``delete()`` masivo no hacen ninguno.
+
+Las columnas se indican a mano o se deducen del serializer que usará la
+acción (``serializer=``, ver ``columnas_serializer``).
+"""
+from django.utils.functional import cached_property
+
+from .serializacion import columnas_serializer
+
+
+class PlanConsulta:
+    def __init__(self, relaciones=(), prefetch=(), anotaciones=(), columnas=(), serializer=None):
+        self.relaciones = tuple(relaciones)
+        self.prefetch = tuple(prefetch)
+        self.anotaciones = tuple(anotaciones)
+        self._columnas = tuple(columnas)
+        self.serializer = serializer
+
+    def aplicar(self, queryset):
+        if self.relaciones:
+            queryset = queryset.select_related(*self.relaciones)
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch)
+        for metodo in self.anotaciones:
+            queryset = getattr(queryset, metodo)()
+        if self.columnas:
+            queryset = queryset.only(*self.columnas)
+        return queryset
+
+    @cached_property
+    def columnas(self):
+        # El serializer se instancia la primera vez que se usa el plan, no al importar
+        if self.serializer is None:
+            return self._columnas
+        columnas = columnas_serializer(self.serializer)
+        return columnas + tuple(c for c in self._columnas if c not in columnas)
+
+    def __repr__(self):
+        return (
+            f"PlanConsulta(relaciones={self.relaciones}, prefetch={self.prefetch}, "
+            f"anotaciones={self.anotaciones}, columnas={self._columnas}, "
+            f"serializer={getattr(self.serializer, '__name__', None)})"
+        )
+
+
+class PlanConsultaMixin:
+    """``get_queryset`` por acción: ``planes_consulta = {"list": PlanConsulta(...)}``.
+
+    Las acciones sin plan usan ``plan_consulta_defecto`` (sin joins ni
+    precargas); las relaciones que se lean igualmente se cargan bajo demanda.
+    """
+
+    planes_consulta = {}
+    plan_consulta_defecto = PlanConsulta()
+
+    def get_plan_consulta(self):
+        return self.planes_consulta.get(self.action, self.plan_consulta_defecto)
+
+    def aplicar_plan_consulta(self, queryset):
+        return self.get_plan_consulta().aplicar(queryset)
@@ -0,0 +1,112 @@
+"""Enrutado de lecturas pesadas a una réplica de solo lectura.
+
+Solo las acciones marcadas con ``@lectura_replica`` leen de
+``DATABASES['replica']`` y únicamente si ``USAR_REPLICA`` está activo. Tras
+una escritura (cualquier método no seguro) el cliente recibe una cookie que,
+durante ``REPLICA_RETRASO_SEGUNDOS``, fuerza sus lecturas a la base principal
+para que vea sus propios cambios aunque la réplica vaya con retraso.
+"""
+import contextvars
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+ALIAS_REPLICA = "replica"
+COOKIE_ESCRITURA = "escritura_reciente"
+METODOS_SEGUROS = ("GET", "HEAD", "OPTIONS")
+
+_lectura_replica = contextvars.ContextVar("lectura_replica", default=False)
+_forzar_principal = contextvars.ContextVar("forzar_principal", default=False)
+
+
+def replica_disponible():
+    return getattr(settings, "USAR_REPLICA", False) and ALIAS_REPLICA in settings.DATABASES
+
+
+def lectura_replica(metodo):
+    """Marcar una acción de solo lectura cuyas consultas pueden ir a la réplica"""
+    if iscoroutinefunction(metodo):
+        @wraps(metodo)
+        async def envoltura_asincrona(*args, **kwargs):
+            token = _lectura_replica.set(True)
+            try:
+                return await metodo(*args, **kwargs)
+            finally:
+                _lectura_replica.reset(token)
+        return envoltura_asincrona
+
+    @wraps(metodo)
+    def envoltura(*args, **kwargs):
+        token = _lectura_replica.set(True)
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            _lectura_replica.reset(token)
+    return envoltura
+
+
+class RouterReplica:
+    """Router de base de datos: lecturas marcadas a la réplica, el resto a default"""
+
+    def db_for_read(self, model, **hints):
+        if _lectura_replica.get() and not _forzar_principal.get() and replica_disponible():
+            return ALIAS_REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La réplica contiene los mismos datos que la base principal
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReplicaMiddleware:
+    """Lecturas de la base principal para clientes que acaban de escribir.
+
+    Admite WSGI y ASGI: bajo ASGI no obliga a Django a pasar las vistas
+    asíncronas por un hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _forzar_principal.set(self._forzar(request))
+        try:
+            respuesta = self.get_response(request)
+        finally:
+            _forzar_principal.reset(token)
+        return self._marcar_escritura(request, respuesta)
+
+    async def __acall__(self, request):
+        token = _forzar_principal.set(self._forzar(request))
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            _forzar_principal.reset(token)
+        return self._marcar_escritura(request, respuesta)
+
+    def _forzar(self, request):
+        return request.method not in METODOS_SEGUROS or COOKIE_ESCRITURA in request.COOKIES
+
+    def _marcar_escritura(self, request, respuesta):
+        if request.method not in METODOS_SEGUROS and replica_disponible():
+            respuesta.set_cookie(
+                COOKIE_ESCRITURA,
+                "1",
+                max_age=getattr(settings, "REPLICA_RETRASO_SEGUNDOS", 10),
+                httponly=True,
+                samesite="Lax",
+            )
+        return respuesta
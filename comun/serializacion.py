@@ -0,0 +1,217 @@
+"""Serialización rápida de listados a partir de ``values()``.
+
+Un ``ModelSerializer`` con ``many=True`` crea una instancia del modelo por
+fila y, para cada campo, recorre su ``source`` con ``getattr`` y llama a
+``to_representation``. En páginas grandes ese trabajo por campo domina el
+tiempo de CPU. ``SerializacionValores`` lee las mismas columnas con
+``values()`` y convierte cada fila con una función generada una sola vez a
+partir de los campos del serializer de referencia:
+
+- Columnas y relaciones (``categoria.nombre`` -> ``categoria__nombre``) se
+  copian tal cual. Decimales, fechas y otros tipos con formato propio
+  pasan por el ``to_representation`` del mismo campo de DRF, así que la
+  salida es idéntica.
+- ``get_<campo>_display`` se resuelve con un diccionario de ``choices``.
+- Los campos calculados se declaran en ``calculados`` como funciones
+  ``(fila, contexto)``; el contexto se construye una vez por listado y
+  ``columnas_extra`` añade las columnas que leen y no se muestran.
+- ``anotaciones`` añade expresiones calculadas por la base de datos; si
+  dependen de la petición, ``anotar`` las añade y ``campos_anotados`` las
+  declara.
+
+Las vistas lo activan por acción con ``ListaValoresMixin``.
+"""
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils.encoding import force_str
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .instrumentacion import medicion_actual
+
+# Campos cuyo ``to_representation`` devuelve el valor de la base de datos sin cambios
+CAMPOS_IDENTIDAD = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class SerializacionValores:
+    serializer_class = None
+    anotaciones = {}
+    campos_anotados = ()
+    calculados = {}
+    columnas_extra = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._compilada = None
+
+    def contexto(self):
+        """Valores comunes a todas las filas (p. ej. la hora actual)"""
+        return {}
+
+    @classmethod
+    def _compilar(cls):
+        """Generar ``convertir(fila, contexto)`` y la lista de columnas de ``values()``"""
+        modelo = cls.serializer_class.Meta.model
+        anotados = {*cls.anotaciones, *cls.campos_anotados}
+        columnas, entradas, espacio = [], [], {}
+        for indice, (nombre, campo) in enumerate(cls.serializer_class().fields.items()):
+            if campo.write_only:
+                continue
+            if nombre in cls.calculados:
+                espacio[f"_calculo{indice}"] = cls.calculados[nombre]
+                entradas.append(f"{nombre!r}: _calculo{indice}(fila, contexto)")
+                continue
+
+            fuente = campo.source
+            if nombre in anotados:
+                columna = nombre
+            elif fuente.startswith("get_") and fuente.endswith("_display"):
+                columna = fuente[4:-8]
+                etiquetas = {
+                    valor: force_str(etiqueta, strings_only=True)
+                    for valor, etiqueta in modelo._meta.get_field(columna).flatchoices
+                }
+                espacio[f"_etiquetas{indice}"] = etiquetas
+                entradas.append(f"{nombre!r}: _etiquetas{indice}.get(fila[{columna!r}], fila[{columna!r}])")
+                columnas.append(columna)
+                continue
+            elif fuente == "*" or isinstance(campo, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+                raise ImproperlyConfigured(
+                    f"{cls.__name__}: el campo '{nombre}' debe declararse en calculados"
+                )
+            else:
+                columna = fuente.replace(".", "__")
+
+            columnas.append(columna)
+            # Las anotaciones pasan por el campo: el tipo devuelto depende del motor
+            if (
+                type(campo) in CAMPOS_IDENTIDAD
+                and getattr(campo, "pk_field", None) is None
+                and columna not in anotados
+            ):
+                entradas.append(f"{nombre!r}: fila[{columna!r}]")
+            else:
+                espacio[f"_campo{indice}"] = campo.to_representation
+                entradas.append(
+                    f"{nombre!r}: None if fila[{columna!r}] is None else _campo{indice}(fila[{columna!r}])"
+                )
+
+        codigo = "def convertir(fila, contexto):\n    return {\n        %s,\n    }\n" % (
+            ",\n        ".join(entradas)
+        )
+        exec(compile(codigo, f"<{cls.__name__}>", "exec"), espacio)
+        extra = [*cls.columnas_extra, *anotados]
+        return espacio["convertir"], columnas + [c for c in extra if c not in columnas]
+
+    @classmethod
+    def compilada(cls):
+        if cls._compilada is None:
+            cls._compilada = cls._compilar()
+        return cls._compilada
+
+    def anotar(self, queryset):
+        if self.anotaciones:
+            queryset = queryset.annotate(**self.anotaciones)
+        return queryset
+
+    def consulta(self, queryset):
+        _, columnas = self.compilada()
+        queryset = self.anotar(queryset)
+        # values() no admite prefetch_related y no necesita select_related
+        return queryset.prefetch_related(None).select_related(None).values(*columnas)
+
+    def representar(self, filas):
+        convertir, _ = self.compilada()
+        contexto = self.contexto()
+        return [convertir(fila, contexto) for fila in filas]
+
+
+def _ruta_columna(modelo, fuente):
+    """Ruta de ``only()`` para el ``source`` de un campo, o ``None`` si no es una columna"""
+    partes = fuente.split(".")
+    for indice, parte in enumerate(partes):
+        try:
+            campo = modelo._meta.get_field(parte)
+        except FieldDoesNotExist:
+            return None
+        if not campo.concrete:
+            return None
+        if campo.is_relation and indice < len(partes) - 1:
+            modelo = campo.related_model
+        elif indice < len(partes) - 1:
+            return None
+    return "__".join(partes)
+
+
+def columnas_serializer(serializer_class):
+    """Columnas que lee ``serializer_class``, como rutas de ``only()``.
+
+    Se deducen del ``source`` de cada campo (``categoria.nombre`` ->
+    ``categoria__nombre``, ``get_nivel_display`` -> ``nivel``). Los campos que
+    salen de propiedades o métodos declaran sus columnas en
+    ``Meta.columnas_requeridas = {campo: (columna, ...)}``.
+    """
+    modelo = serializer_class.Meta.model
+    requeridas = getattr(serializer_class.Meta, "columnas_requeridas", {})
+    columnas = [modelo._meta.pk.name]
+    for nombre, campo in serializer_class().fields.items():
+        if campo.write_only:
+            continue
+        if nombre in requeridas:
+            nuevas = requeridas[nombre]
+        else:
+            fuente = campo.source
+            if fuente.startswith("get_") and fuente.endswith("_display"):
+                fuente = fuente[4:-8]
+            ruta = None if fuente == "*" else _ruta_columna(modelo, fuente)
+            if ruta is None:
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}: declarar en Meta.columnas_requeridas "
+                    f"las columnas del campo '{nombre}'"
+                )
+            nuevas = (ruta,)
+        columnas.extend(columna for columna in nuevas if columna not in columnas)
+    return tuple(columnas)
+
+
+def serializacion_valores_activa():
+    return getattr(settings, "SERIALIZACION_VALORES", True)
+
+
+class ListaValoresMixin:
+    """``list`` con ``SerializacionValores`` para las acciones de ``serializacion_valores``.
+
+    ``serializacion_valores = {"list": ProductoListValores}``; el ajuste
+    ``SERIALIZACION_VALORES=False`` vuelve a los serializers de DRF en todas
+    las vistas.
+    """
+
+    serializacion_valores = {}
+
+    def get_serializacion_valores(self):
+        clase = self.serializacion_valores.get(self.action)
+        if clase is None or not serializacion_valores_activa():
+            return None
+        return clase()
+
+    def list(self, request, *args, **kwargs):
+        rapida = self.get_serializacion_valores()
+        if rapida is None:
+            return super().list(request, *args, **kwargs)
+
+        filas = rapida.consulta(self.filter_queryset(self.get_queryset()))
+        pagina = self.paginate_queryset(filas)
+        medicion = medicion_actual.get()
+        with medicion.serializando() if medicion else nullcontext():
+            datos = rapida.representar(filas if pagina is None else pagina)
+        if pagina is not None:
+            return self.get_paginated_response(datos)
+        return Response(datos)
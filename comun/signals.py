@@ -0,0 +1,50 @@
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+
+from .cache import invalidar_tags
+from .models import VersionTabla
+
+
+def version_tras_escritura(tabla):
+    """Incrementar la versión de ``tabla`` al confirmar la transacción en curso"""
+    # Tras el commit: no bloquea la fila del contador durante transacciones
+    # largas y no avanza la versión si la escritura se revierte
+    transaction.on_commit(partial(VersionTabla.incrementar, tabla))
+
+
+def _incrementar_version(tabla, sender, **kwargs):
+    version_tras_escritura(tabla)
+
+
+def conectar_version(modelo, tabla):
+    """Incrementar la versión de ``tabla`` cada vez que se guarda o borra ``modelo``"""
+    receptor = partial(_incrementar_version, tabla)
+    uid = f"version-{tabla}-{modelo._meta.label_lower}"
+    post_save.connect(receptor, sender=modelo, weak=False, dispatch_uid=uid)
+    post_delete.connect(receptor, sender=modelo, weak=False, dispatch_uid=uid)
+
+
+def invalidar_tras_escritura(*tags):
+    """Invalidar ``tags`` ahora y, dentro de una transacción, también al confirmar"""
+    if not tags:
+        return
+    invalidar_tags(*tags)
+    # Dentro de una transacción se invalida también al confirmar, para que una
+    # lectura concurrente no vuelva a cachear los datos anteriores al commit
+    if connection.in_atomic_block:
+        transaction.on_commit(partial(invalidar_tags, *tags))
+
+
+def _invalidar_cache(obtener_tags, sender, instance, **kwargs):
+    invalidar_tras_escritura(*(obtener_tags(instance, **kwargs) or ()))
+
+
+def conectar_invalidacion(modelo, obtener_tags):
+    """Invalidar los tags que devuelve ``obtener_tags(instancia, **kwargs)``
+    cuando se guarda o borra ``modelo``"""
+    receptor = partial(_invalidar_cache, obtener_tags)
+    uid = f"cache-{modelo._meta.label_lower}"
+    post_save.connect(receptor, sender=modelo, weak=False, dispatch_uid=uid)
+    post_delete.connect(receptor, sender=modelo, weak=False, dispatch_uid=uid)
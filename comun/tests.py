@@ -0,0 +1,616 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import date, datetime, time, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import override_settings
+from rest_framework import serializers, status
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from Alertas.models import Alerta
+from Productos.models import CategoriaProducto, HistorialPrecio, LoteProducto, Producto
+from Productos.serializers import ProductoListSerializer
+from movimientos.models import Movimiento
+from movimientos.serializers import MovimientoSerializer
+from .cache import estadisticas_cache, reiniciar_estadisticas_cache
+from .consultas_lentas import consultas_lentas, instalar_detector, detector_consultas_lentas
+from .replicas import COOKIE_ESCRITURA
+from .transacciones import transaccion_escritura
+from .instrumentacion import percentil, registro_endpoints
+from .json_rapido import JSONRapidoParser, JSONRapidoRenderer
+from .metricas import RegistroMetricas, registro
+from .serializacion import columnas_serializer
+
+
+class CacheRespuestasTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        reiniciar_estadisticas_cache()
+        self.categoria = CategoriaProducto.objects.create(
+            nombre='Herbicidas Cache',
+            tipo='HERBICIDA'
+        )
+        self.producto = Producto.objects.create(
+            codigo='CACHE001',
+            nombre='Herbicida Cache',
+            categoria=self.categoria,
+            stock_actual=50,
+            stock_minimo=5,
+            unidad_medida='L',
+            precio_compra=10,
+            precio_venta=15
+        )
+        self.otro = Producto.objects.create(
+            codigo='CACHE002',
+            nombre='Herbicida Otro',
+            categoria=self.categoria,
+            stock_actual=50,
+            stock_minimo=5,
+            unidad_medida='L',
+            precio_compra=10,
+            precio_venta=15
+        )
+
+    def test_lista_cacheada_con_parametros_normalizados(self):
+        """El orden de los parámetros no cambia la clave de caché"""
+        url = '/api/productos/productos/'
+        self.client.get(url + '?nombre__icontains=herbicida&page=1')
+        with self.assertNumQueries(1):  # solo la consulta de versión (ETag)
+            response = self.client.get(url + '?page=1&nombre__icontains=herbicida&codigo=')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(estadisticas_cache()['aciertos'], 1)
+        self.assertEqual(estadisticas_cache()['fallos'], 1)
+
+    def test_invalidacion_precisa_por_producto(self):
+        """Guardar un producto invalida su detalle pero no el de los demás"""
+        url_producto = f'/api/productos/productos/{self.producto.id}/'
+        url_otro = f'/api/productos/productos/{self.otro.id}/'
+        self.client.get(url_producto)
+        self.client.get(url_otro)
+
+        self.producto.stock_actual = 40
+        self.producto.save(update_fields=['stock_actual', 'estado', 'fecha_actualizacion'])
+
+        response = self.client.get(url_producto)
+        self.assertEqual(response.data['stock_actual'], '40.000')
+        with self.assertNumQueries(0):
+            self.client.get(url_otro)
+
+    def test_categoria_invalida_listas(self):
+        """Renombrar una categoría invalida la lista de categorías"""
+        url = '/api/productos/categorias/'
+        self.client.get(url)
+        self.categoria.nombre = 'Herbicidas Renombrados'
+        self.categoria.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data[0]['nombre'], 'Herbicidas Renombrados')
+
+    @override_settings(CACHE_RESPUESTAS=False)
+    def test_sin_cache_de_respuestas_en_backend_local(self):
+        """Sin backend compartido cada petición consulta la base de datos"""
+        url = f'/api/productos/productos/{self.producto.id}/'
+        self.client.get(url)
+        # Otro proceso cambia el stock; su invalidación no llegaría a este worker
+        Producto.objects.filter(pk=self.producto.pk).update(stock_actual=40)
+        response = self.client.get(url)
+        self.assertEqual(response.data['stock_actual'], '40.000')
+        self.assertEqual(estadisticas_cache()['aciertos'], 0)
+
+    def test_estadisticas_protegidas(self):
+        """Las estadísticas del caché requieren un usuario administrador"""
+        url = '/api/cache/estadisticas/'
+        self.assertIn(self.client.get(url).status_code,
+                      (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-admin')
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ratio_aciertos', response.data)
+
+
+@override_settings(
+    INSTRUMENTACION=True,
+    MIDDLEWARE=['comun.middleware.InstrumentacionMiddleware'] + settings.MIDDLEWARE,
+)
+class InstrumentacionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        registro_endpoints.reiniciar()
+        self.addCleanup(registro_endpoints.reiniciar)
+        categoria = CategoriaProducto.objects.create(
+            nombre='Herbicidas Metricas',
+            tipo='HERBICIDA'
+        )
+        Producto.objects.create(
+            codigo='MET001',
+            nombre='Herbicida Metricas',
+            categoria=categoria,
+            stock_actual=50,
+            stock_minimo=5,
+            unidad_medida='L',
+            precio_compra=10,
+            precio_venta=15
+        )
+
+    def test_server_timing_y_log_estructurado(self):
+        """Cada respuesta lleva Server-Timing y una línea JSON por petición"""
+        with self.assertLogs('comun.instrumentacion', level='INFO') as logs:
+            response = self.client.get('/api/productos/productos/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('ser;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+        linea = json.loads(logs.records[0].getMessage())
+        self.assertEqual(linea['endpoint'], 'ProductoViewSet.list')
+        self.assertEqual(linea['estado'], 200)
+        self.assertGreater(linea['consultas'], 0)
+        self.assertGreater(linea['serializacion_ms'], 0)
+
+    def test_metricas_por_endpoint_protegidas(self):
+        """Los percentiles se agrupan por vista y acción y requieren admin"""
+        for _ in range(3):
+            self.client.get('/api/productos/productos/')
+        self.client.get('/api/productos/categorias/')
+
+        url = '/api/_metrics/'
+        self.assertIn(self.client.get(url).status_code,
+                      (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-admin')
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        endpoints = response.data['endpoints']
+        self.assertEqual(endpoints['ProductoViewSet.list']['peticiones'], 3)
+        self.assertEqual(endpoints['CategoriaProductoViewSet.list']['peticiones'], 1)
+        self.assertIn('p99', endpoints['ProductoViewSet.list']['total_ms'])
+        self.assertNotIn('MetricasEndpointsView.get', endpoints)
+
+    def test_percentil_rango_cercano(self):
+        valores = list(range(1, 101))
+        self.assertEqual(percentil(valores, 50), 50)
+        self.assertEqual(percentil(valores, 99), 99)
+        self.assertEqual(percentil([7], 95), 7)
+
+
+class MetricasPrometheusTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        registro.reiniciar()
+        self.addCleanup(registro.reiniciar)
+        self.categoria = CategoriaProducto.objects.create(
+            nombre='Herbicidas Prometheus',
+            tipo='HERBICIDA'
+        )
+        self.producto = Producto.objects.create(
+            codigo='PROM001',
+            nombre='Herbicida Prometheus',
+            categoria=self.categoria,
+            stock_actual=10,
+            stock_minimo=5,
+            unidad_medida='L',
+            precio_compra=10,
+            precio_venta=15
+        )
+        self.usuario = User.objects.create_user('operador', password='clave-operador')
+
+    def test_movimientos_conflictos_y_exportacion(self):
+        """Los movimientos, conflictos y filas exportadas aparecen en /metrics"""
+        self.client.force_authenticate(user=self.usuario)
+        url = '/api/movimientos/movimientos/'
+        self.client.post(url, {'producto': self.producto.id, 'tipo': 'entrada', 'cantidad': 5})
+        # Otra salida consumió el stock entre la validación y el bloqueo
+        with mock.patch.object(MovimientoSerializer, 'validate', lambda serializer, data: data):
+            response = self.client.post(url, {'producto': self.producto.id, 'tipo': 'salida', 'cantidad': 500})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        exportacion = self.client.get('/api/productos/productos/exportar_csv/')
+        filas = b''.join(exportacion.streaming_content).decode().splitlines()
+        self.assertEqual(len(filas), 2)
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = response.content.decode()
+        self.assertIn('agricola_movimientos_aplicados_total{tipo="entrada"} 1', texto)
+        self.assertIn('agricola_conflictos_stock_total{motivo="stock_insuficiente"} 1', texto)
+        self.assertIn('agricola_filas_exportadas_total{recurso="productos",formato="csv"} 1', texto)
+
+    def test_revision_alertas_y_ratio_cache(self):
+        """La revisión registra duración por tipo y el ratio del caché se deriva"""
+        from Alertas.services import AlertaService, configuraciones_alerta
+        self.addCleanup(configuraciones_alerta.invalidar)
+        AlertaService().ejecutar_revision_automatica()
+        self.client.get('/api/productos/categorias/')
+        self.client.get('/api/productos/categorias/')
+
+        texto = self.client.get('/metrics').content.decode()
+        self.assertIn('agricola_revisiones_alertas_total 1', texto)
+        self.assertIn('agricola_revision_alertas_segundos_count{tipo="STOCK_CRITICO"} 1', texto)
+        self.assertIn('agricola_revision_alertas_segundos_bucket{tipo="PRODUCTO_VENCIDO",le="+Inf"} 1', texto)
+        self.assertIn('agricola_cache_respuestas_ratio_aciertos 0.5', texto)
+
+    def test_agregacion_entre_procesos(self):
+        """Con un directorio compartido se suman los ficheros de cada proceso"""
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        with override_settings(METRICAS_DIRECTORIO=directorio):
+            local = RegistroMetricas()
+            contador = local.contador('prueba_total', 'Prueba', ['tipo'])
+            histograma = local.histograma('prueba_segundos', 'Prueba', buckets=(1, 2))
+            contador.inc(2, tipo='a')
+            histograma.observar(1.5)
+
+            # Estado volcado por otro worker
+            with open(os.path.join(directorio, 'metricas-999999.json'), 'w') as fichero:
+                json.dump({
+                    'prueba_total': [[['a'], 3]],
+                    'prueba_segundos': [[[], {'buckets': [1, 0], 'suma': 0.5, 'total': 2}]],
+                }, fichero)
+
+            texto = local.exponer()
+        self.assertIn('prueba_total{tipo="a"} 5', texto)
+        self.assertIn('prueba_segundos_bucket{le="1"} 1', texto)
+        self.assertIn('prueba_segundos_bucket{le="2"} 2', texto)
+        self.assertIn('prueba_segundos_bucket{le="+Inf"} 3', texto)
+        self.assertIn('prueba_segundos_count 3', texto)
+        self.assertTrue(os.path.exists(os.path.join(directorio, f'metricas-{os.getpid()}.json')))
+
+
+class DatasetBenchTests(APITestCase):
+    def setUp(self):
+        from Alertas.services import configuraciones_alerta
+        self.addCleanup(configuraciones_alerta.invalidar)
+
+    def generar(self, **opciones):
+        parametros = dict(categorias=5, productos=40, movimientos=300, alertas=25, semilla=7)
+        parametros.update(opciones)
+        call_command('generar_dataset', stdout=StringIO(), **parametros)
+
+    def test_dataset_reproducible_y_coherente(self):
+        """La misma semilla genera los mismos datos y el stock es la suma de los lotes"""
+        self.generar()
+        self.assertEqual(Producto.objects.filter(codigo__startswith='GEN-').count(), 40)
+        self.assertEqual(Movimiento.objects.count(), 300)
+        self.assertEqual(Alerta.objects.count(), 25)
+        self.assertTrue(HistorialPrecio.objects.exists())
+
+        con_lotes = Producto.objects.filter(lotes__isnull=False).distinct()
+        self.assertTrue(con_lotes.exists())
+        for producto in con_lotes:
+            self.assertEqual(producto.stock_actual, producto.lotes.aggregate(total=Sum('cantidad'))['total'])
+
+        primera = list(Producto.objects.order_by('codigo').values_list('codigo', 'stock_actual', 'precio_compra'))
+        self.generar(limpiar=True)
+        segunda = list(Producto.objects.order_by('codigo').values_list('codigo', 'stock_actual', 'precio_compra'))
+        self.assertEqual(primera, segunda)
+        self.assertEqual(LoteProducto.objects.filter(producto__codigo__startswith='GEN-').count(),
+                         LoteProducto.objects.count())
+
+    def test_bench_guarda_resultados(self):
+        self.generar()
+        ruta = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(ruta), ignore_errors=True)
+        call_command(
+            'bench', repeticiones=2, calentamiento=0, salida=ruta, stdout=StringIO(),
+            objetivos=['productos.lista', 'servicio.revision_automatica'],
+        )
+        with open(ruta) as fichero:
+            informe = json.load(fichero)
+        self.assertEqual(informe['volumen']['movimientos'], 300)
+        self.assertEqual(set(informe['resultados']), {'productos.lista', 'servicio.revision_automatica'})
+        self.assertGreater(informe['resultados']['productos.lista']['consultas'], 0)
+        # La revisión se deshace después de cada medición
+        self.assertEqual(Alerta.objects.count(), 25)
+
+
+@override_settings(CONSULTAS_LENTAS_MS=0.000001, CONSULTAS_LENTAS_EXPLAIN=True, CONSULTAS_LENTAS_CAPACIDAD=5)
+class ConsultasLentasTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        instalar_detector(None, connection)
+        self.addCleanup(connection.execute_wrappers.remove, detector_consultas_lentas)
+
+    def test_registra_origen_y_plan(self):
+        """Las consultas sobre el umbral guardan su origen en el proyecto y el EXPLAIN"""
+        self.client.get('/api/productos/categorias/')
+        entradas = consultas_lentas()
+        self.assertTrue(entradas)
+        self.assertLessEqual(len(entradas), 5)
+
+        consulta = next(e for e in entradas if 'productos_categoriaproducto' in e['sql'].lower())
+        self.assertTrue(consulta['plan'])
+        self.assertNotIn('error', consulta['plan'][0])
+        self.assertTrue(any(marco.startswith('comun/tests.py') for marco in consulta['origen']))
+        self.assertFalse(any('site-packages' in marco for marco in consulta['origen']))
+
+    @override_settings(CONSULTAS_LENTAS_MS=60000)
+    def test_consultas_rapidas_no_se_registran(self):
+        self.client.get('/api/productos/categorias/')
+        self.assertEqual(consultas_lentas(), [])
+
+    def test_comando_y_vista_protegida(self):
+        self.client.get('/api/productos/categorias/')
+        salida = StringIO()
+        call_command('consultas_lentas', limite=1, stdout=salida)
+        self.assertIn(' ms  [default]', salida.getvalue())
+
+        url = '/api/_consultas_lentas/'
+        self.assertIn(self.client.get(url).status_code,
+                      (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-admin')
+        self.client.force_authenticate(user=admin)
+        self.assertTrue(self.client.get(url).data['consultas'])
+        self.client.delete(url)
+        with override_settings(CONSULTAS_LENTAS_MS=0):
+            self.assertEqual(self.client.get(url).data['consultas'], [])
+
+
+class PerfilProduccionTests(APITestCase):
+    def test_perfil_conexiones_persistentes(self):
+        import importlib
+        from config import settings as base
+        produccion = importlib.import_module('config.settings_produccion')
+
+        self.assertGreater(produccion.DATABASES['default']['CONN_MAX_AGE'], 0)
+        self.assertTrue(produccion.DATABASES['default']['CONN_HEALTH_CHECKS'])
+        self.assertFalse(produccion.DEBUG)
+        self.assertEqual(base.DATABASES['default']['CONN_MAX_AGE'], 0)
+        self.assertIsNot(produccion.DATABASES, base.DATABASES)
+
+    def test_bench_conexiones(self):
+        salida = StringIO()
+        call_command('bench_conexiones', peticiones=3, url='/api/productos/categorias/', stdout=salida)
+        lineas = salida.getvalue().splitlines()
+        self.assertTrue(lineas[0].startswith('sin persistencia'))
+        self.assertTrue(lineas[1].startswith('persistente'))
+
+
+@override_settings(USAR_REPLICA=True)
+class ReplicaLecturaTests(APITestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        for base, stock in (('default', 50), ('replica', 0)):
+            categoria = CategoriaProducto.objects.using(base).create(
+                nombre='Herbicidas Replica',
+                tipo='HERBICIDA'
+            )
+            Producto.objects.using(base).create(
+                codigo='REP001',
+                nombre='Herbicida Replica',
+                categoria=categoria,
+                stock_actual=stock,
+                stock_minimo=5,
+                unidad_medida='L',
+                precio_compra=10,
+                precio_venta=15
+            )
+        # Solo existe en la réplica: distingue de qué base se leyó
+        Producto.objects.using('replica').create(
+            codigo='REP002',
+            nombre='Herbicida Solo Replica',
+            categoria=CategoriaProducto.objects.using('replica').get(),
+            stock_actual=0,
+            stock_minimo=5,
+            unidad_medida='L',
+            precio_compra=10,
+            precio_venta=15
+        )
+
+    def test_acciones_marcadas_leen_de_la_replica(self):
+        url = '/api/productos/productos/resumen_inventario/'
+        response = self.client.get(url)
+        self.assertEqual(response.data['estadisticas_generales']['total_productos'], 2)
+
+        exportacion = self.client.get('/api/productos/productos/exportar_csv/')
+        filas = b''.join(exportacion.streaming_content).decode().splitlines()
+        self.assertEqual(len(filas), 3)
+
+        # Las acciones sin marcar siguen en la base principal
+        response = self.client.get('/api/productos/productos/')
+        self.assertEqual(response.data['count'], 1)
+
+    async def test_vistas_asincronas_marcadas(self):
+        """``lectura_replica`` y el middleware también funcionan bajo ASGI"""
+        url = '/api/productos/async/productos/resumen_inventario/'
+        response = await self.async_client.get(url)
+        self.assertEqual(json.loads(response.content)['estadisticas_generales']['total_productos'], 2)
+
+        response = await self.async_client.get(url, headers={'cookie': f'{COOKIE_ESCRITURA}=1'})
+        self.assertEqual(json.loads(response.content)['estadisticas_generales']['total_productos'], 1)
+
+    def test_lee_sus_escrituras_tras_un_post(self):
+        url = '/api/productos/productos/resumen_inventario/'
+        response = self.client.post('/api/productos/categorias/', {
+            'nombre': 'Semillas Replica',
+            'tipo': 'SEMILLA'
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('escritura_reciente', response.cookies)
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['estadisticas_generales']['total_productos'], 1)
+
+        # Otro cliente sin escrituras recientes sigue usando la réplica
+        otro = self.client_class()
+        self.assertEqual(otro.get(url).data['estadisticas_generales']['total_productos'], 2)
+
+    @override_settings(USAR_REPLICA=False)
+    def test_sin_replica_todo_va_a_la_principal(self):
+        response = self.client.get('/api/productos/productos/resumen_inventario/')
+        self.assertEqual(response.data['estadisticas_generales']['total_productos'], 1)
+
+
+class TransaccionEscrituraTests(TransactionTestCase):
+    def test_begin_immediate_en_sqlite(self):
+        with CaptureQueriesContext(connection) as consultas:
+            with transaccion_escritura():
+                CategoriaProducto.objects.create(nombre='Semillas Inmediatas', tipo='SEMILLA')
+                # Las transacciones anidadas usan savepoints como atomic()
+                with transaccion_escritura():
+                    CategoriaProducto.objects.create(nombre='Semillas Anidadas', tipo='SEMILLA')
+        sentencias = [consulta['sql'] for consulta in consultas]
+        self.assertEqual(sentencias[0], 'BEGIN IMMEDIATE')
+        self.assertEqual(sentencias.count('BEGIN IMMEDIATE'), 1)
+        # El modo solo se aplica a esta transacción
+        self.assertIsNone(connection.transaction_mode)
+
+    @override_settings(SQLITE_BEGIN_IMMEDIATE=False)
+    def test_begin_diferido_configurable(self):
+        with CaptureQueriesContext(connection) as consultas:
+            with transaccion_escritura():
+                CategoriaProducto.objects.create(nombre='Semillas Diferidas', tipo='SEMILLA')
+        self.assertEqual(consultas[0]['sql'], 'BEGIN')
+
+    def test_perfil_sqlite_aplica_pragmas(self):
+        import importlib
+        perfil = importlib.import_module('config.settings_sqlite')
+        opciones = perfil.DATABASES['default']['OPTIONS']
+        for pragma in ('journal_mode=WAL', 'synchronous=NORMAL', 'mmap_size=', 'cache_size=', 'busy_timeout='):
+            self.assertIn(f'PRAGMA {pragma}', opciones['init_command'])
+        self.assertGreater(perfil.DATABASES['default']['CONN_MAX_AGE'], 0)
+
+
+class JSONRapidoTests(APITestCase):
+    datos = {
+        'decimal': Decimal('12.500'),
+        'fecha_hora': datetime(2024, 5, 1, 10, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'fecha': date(2024, 5, 1),
+        'hora': time(8, 15),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'traducible': gettext_lazy('Invalid page.'),
+        'texto': 'Año\u2028siguiente',
+        7: ['lista', ('tupla', None, 1.5, True)],
+    }
+
+    def test_misma_salida_que_drf(self):
+        """orjson genera exactamente los mismos bytes que JSONRenderer"""
+        self.assertEqual(JSONRapidoRenderer().render(self.datos), JSONRenderer().render(self.datos))
+        indentado = 'application/json; indent=4'
+        self.assertEqual(
+            JSONRapidoRenderer().render(self.datos, indentado),
+            JSONRenderer().render(self.datos, indentado),
+        )
+        # Enteros fuera del rango de orjson: vía estándar
+        self.assertEqual(JSONRapidoRenderer().render({'n': 2 ** 70}), b'{"n":1180591620717411303424}')
+
+    def test_floats_mismo_valor_con_el_formato_de_orjson(self):
+        """Los floats conservan el valor aunque el texto difiera del de DRF"""
+        datos = {'lista': [1e16, 1e-7, 1e-05, 0.1, 123456789.125, -0.0, 1.0]}
+        rapido = JSONRapidoRenderer().render(datos)
+        self.assertEqual(json.loads(rapido), json.loads(JSONRenderer().render(datos)))
+        self.assertEqual(JSONRapidoRenderer().render({'n': 1e16}), b'{"n":1e16}')
+        self.assertEqual(JSONRapidoRenderer().render({'n': float('nan')}), b'{"n":null}')
+        # Sin orjson se comporta como DRF
+        with mock.patch('comun.json_rapido.orjson', None):
+            self.assertEqual(JSONRapidoRenderer().render({'n': 1e16}), b'{"n":1e+16}')
+
+    def test_parse_floats_y_enteros_grandes(self):
+        """Los números se leen igual que con JSONParser"""
+        casos = (
+            b'{"n": 123456789012345678901234567890}',
+            b'{"n": -9223372036854775809, "m": 18446744073709551616}',
+            b'{"n": 9223372036854775807}',
+            b'[1e16, 1e-7, 0.1, 2.5e-308, 1.7976931348623157e308]',
+            b'{"texto": "1234567890123456789012", "n": 1}',
+        )
+        for contenido in casos:
+            with self.subTest(contenido=contenido):
+                rapido = JSONRapidoParser().parse(BytesIO(contenido))
+                estandar = JSONParser().parse(BytesIO(contenido))
+                self.assertEqual(rapido, estandar)
+                self.assertEqual(
+                    [type(valor) for valor in (rapido.values() if isinstance(rapido, dict) else rapido)],
+                    [type(valor) for valor in (estandar.values() if isinstance(estandar, dict) else estandar)],
+                )
+        self.assertEqual(
+            JSONRapidoParser().parse(BytesIO(casos[0])), {'n': 123456789012345678901234567890}
+        )
+
+    def test_sin_orjson_usa_la_via_estandar(self):
+        with mock.patch('comun.json_rapido.orjson', None):
+            self.assertEqual(JSONRapidoRenderer().render(self.datos), JSONRenderer().render(self.datos))
+            self.assertEqual(JSONRapidoParser().parse(BytesIO(b'{"a": [1, 2.5]}')), {'a': [1, 2.5]})
+
+    def test_api_usa_json_rapido(self):
+        categoria = CategoriaProducto.objects.create(nombre='Herbicidas JSON', tipo='HERBICIDA')
+        respuesta = self.client.post(
+            '/api/productos/productos/',
+            {'codigo': 'JSON001', 'nombre': 'Herbicida JSON', 'categoria': categoria.id,
+             'stock_actual': '10.5', 'stock_minimo': 5, 'unidad_medida': 'L',
+             'precio_compra': '10.00', 'precio_venta': '15.00'},
+            format='json',
+        )
+        self.assertEqual(respuesta.status_code, status.HTTP_201_CREATED)
+        self.assertIsInstance(respuesta.accepted_renderer, JSONRapidoRenderer)
+        self.assertEqual(respuesta.json()['stock_actual'], '10.500')
+
+        respuesta = self.client.post(
+            '/api/productos/productos/', b'{"codigo": ', content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('JSON parse error', respuesta.json()['detail'])
+
+
+class ColumnasSerializerTests(APITestCase):
+    def test_columnas_deducidas_del_serializer(self):
+        self.assertEqual(
+            columnas_serializer(ProductoListSerializer),
+            ('id', 'codigo', 'nombre', 'categoria', 'categoria__nombre', 'categoria__tipo',
+             'stock_actual', 'stock_minimo', 'stock_maximo', 'unidad_medida', 'precio_compra',
+             'precio_venta', 'estado', 'activo'),
+        )
+
+    def test_propiedad_sin_declarar(self):
+        class SinDeclarar(serializers.ModelSerializer):
+            estado_stock = serializers.CharField(read_only=True)
+
+            class Meta:
+                model = Producto
+                fields = ['id', 'estado_stock']
+
+        with self.assertRaisesMessage(ImproperlyConfigured, "'estado_stock'"):
+            columnas_serializer(SinDeclarar)
+
+    def test_listados_y_exportacion_no_leen_descripcion(self):
+        categoria = CategoriaProducto.objects.create(nombre='Abonos columnas', tipo='ABONO')
+        Producto.objects.create(
+            codigo='COL001', nombre='Abono columnas', descripcion='x' * 2000, categoria=categoria,
+            stock_actual=3, stock_minimo=5, unidad_medida='KG', precio_compra=2, precio_venta=3,
+        )
+        for url in ('/api/productos/productos/', '/api/productos/productos/exportar_csv/'):
+            with self.subTest(url=url), override_settings(SERIALIZACION_VALORES=False):
+                cache.clear()
+                with CaptureQueriesContext(connection) as consultas:
+                    respuesta = self.client.get(url)
+                    contenido = (
+                        b''.join(respuesta.streaming_content) if respuesta.streaming else respuesta.content
+                    )
+                self.assertIn(b'COL001', contenido)
+                lecturas = [
+                    consulta['sql'] for consulta in consultas.captured_queries
+                    if '"Productos_producto"."codigo"' in consulta['sql']
+                ]
+                self.assertTrue(lecturas)
+                self.assertFalse(any('"descripcion"' in sql for sql in lecturas))
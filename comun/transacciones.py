@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+@contextmanager
+def transaccion_escritura(using=None):
+    """``transaction.atomic`` que en SQLite reserva la escritura al empezar.
+
+    Con el ``BEGIN`` diferido, dos transacciones que leen antes de escribir
+    (por ejemplo, bloquear un producto y luego guardarlo) pueden quedar
+    esperando la una a la otra, y SQLite responde "database is locked" sin
+    respetar ``busy_timeout``. ``BEGIN IMMEDIATE`` toma el bloqueo de
+    escritura al inicio, así que los escritores esperan su turno en orden.
+    En otros motores, o dentro de una transacción ya abierta, equivale a
+    ``transaction.atomic``.
+    """
+    conexion = connections[using or DEFAULT_DB_ALIAS]
+    inmediata = (
+        conexion.vendor == "sqlite"
+        and not conexion.in_atomic_block
+        and getattr(settings, "SQLITE_BEGIN_IMMEDIATE", True)
+    )
+    if inmediata:
+        # El modo se lee de OPTIONS al conectar: hay que conectar antes de cambiarlo
+        conexion.ensure_connection()
+        anterior = conexion.transaction_mode
+        conexion.transaction_mode = "IMMEDIATE"
+
+    try:
+        with transaction.atomic(using=using):
+            if inmediata:
+                # El BEGIN ya se ejecutó al entrar en atomic()
+                conexion.transaction_mode = anterior
+                inmediata = False
+            yield
+    finally:
+        if inmediata:
+            conexion.transaction_mode = anterior
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import ConsultasLentasView, EstadisticasCacheView, MetricasEndpointsView
+
+urlpatterns = [
+    path('cache/estadisticas/', EstadisticasCacheView.as_view(), name='cache-estadisticas'),
+    path('_metrics/', MetricasEndpointsView.as_view(), name='metricas-endpoints'),
+    path('_consultas_lentas/', ConsultasLentasView.as_view(), name='consultas-lentas'),
+]
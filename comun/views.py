@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .cache import estadisticas_cache
+from .consultas_lentas import consultas_lentas, limpiar_consultas_lentas
+from .instrumentacion import registro_endpoints
+from .metricas import texto_metricas
+
+
+class EstadisticasCacheView(APIView):
+    """Aciertos y fallos del caché de respuestas del proceso actual"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(estadisticas_cache())
+
+
+class MetricasEndpointsView(APIView):
+    """Percentiles móviles por endpoint recogidos por la instrumentación"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {
+                "habilitada": getattr(settings, "INSTRUMENTACION", False),
+                "endpoints": registro_endpoints.resumen(),
+            }
+        )
+
+
+class MetricasPrometheusView(APIView):
+    """Métricas de inventario y alertas en formato de exposición de Prometheus"""
+    authentication_classes = []
+    permission_classes = []  # Lo consulta el scraper de Prometheus
+
+    def get(self, request):
+        return HttpResponse(
+            texto_metricas(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
+class ConsultasLentasView(APIView):
+    """Consultas SQL lentas registradas; DELETE vacía el registro"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {
+                "umbral_ms": getattr(settings, "CONSULTAS_LENTAS_MS", 0),
+                "consultas": consultas_lentas(),
+            }
+        )
+
+    def delete(self, request):
+        limpiar_consultas_lentas()
+        return Response(status=204)
@@ -68,6 +68,7 @@ INSTALLED_APPS = [
     'django_filters',
     'rest_framework.authtoken',
     'autenticacion',
+    'comun',
 
 ]
 
@@ -80,8 +81,32 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'comun.replicas.ReplicaMiddleware',
 ]
 
+# Instrumentación opcional: consultas SQL, serialización y tiempo por endpoint
+# (cabecera Server-Timing, log JSON y percentiles en /api/_metrics/)
+INSTRUMENTACION = env_config('INSTRUMENTACION', default=False, cast=bool)
+INSTRUMENTACION_MUESTRAS = env_config('INSTRUMENTACION_MUESTRAS', default=500, cast=int)
+if INSTRUMENTACION:
+    MIDDLEWARE.insert(0, 'comun.middleware.InstrumentacionMiddleware')
+# Directorio compartido por los workers de gunicorn para sumar sus métricas
+# en /metrics; sin él cada proceso expone solo las suyas
+METRICAS_DIRECTORIO = env_config('METRICAS_DIRECTORIO', default='') or None
+METRICAS_INTERVALO_VOLCADO = env_config('METRICAS_INTERVALO_VOLCADO', default=5, cast=int)
+# Registro de consultas lentas: umbral en milisegundos (0 lo desactiva) y
+# EXPLAIN opcional de las SELECT que lo superan
+CONSULTAS_LENTAS_MS = env_config('CONSULTAS_LENTAS_MS', default=0, cast=float)
+CONSULTAS_LENTAS_EXPLAIN = env_config('CONSULTAS_LENTAS_EXPLAIN', default=False, cast=bool)
+CONSULTAS_LENTAS_CAPACIDAD = env_config('CONSULTAS_LENTAS_CAPACIDAD', default=200, cast=int)
+# Flujo SSE de alertas: segundos entre sondeos de filas escritas por otros
+# workers y entre comentarios de latido para mantener viva la conexión
+ALERTAS_EVENTOS_INTERVALO = env_config('ALERTAS_EVENTOS_INTERVALO', default=2, cast=float)
+ALERTAS_EVENTOS_LATIDO = env_config('ALERTAS_EVENTOS_LATIDO', default=15, cast=float)
+# Segundos hacia atrás que se releen para entregar filas confirmadas después
+# de otras con id mayor (transacciones lentas o concurrentes)
+ALERTAS_EVENTOS_RETRASO = env_config('ALERTAS_EVENTOS_RETRASO', default=30, cast=float)
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -112,7 +137,13 @@ if 'test' in sys.argv:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': ':memory:',
-        }
+        },
+        # Réplica en un fichero aparte; solo la usan los tests que la declaran
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'replica_test.sqlite3'),
+            'TEST': {'NAME': os.path.join(BASE_DIR, 'replica_test.sqlite3')},
+        },
     }
 else:
     DATABASES = {
@@ -125,8 +156,66 @@ else:
             'PORT': env_config('DB_PORT', default='61000'),
         }
     }
+    # Réplica de solo lectura opcional para informes y listados pesados
+    if env_config('DB_REPLICA_HOST', default=''):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': env_config('DB_REPLICA_HOST'),
+            'PORT': env_config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+            'USER': env_config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+            'PASSWORD': env_config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        }
+DATABASE_ROUTERS = ['comun.replicas.RouterReplica']
+USAR_REPLICA = 'replica' in DATABASES and 'test' not in sys.argv
+# Segundos que un cliente lee de la base principal después de escribir
+REPLICA_RETRASO_SEGUNDOS = env_config('REPLICA_RETRASO_SEGUNDOS', default=10, cast=int)
 ALLOWED_HOSTS = ('localhost' ,'127.0.0.1','.onrender.com')
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# CACHE_BACKEND elige el almacenamiento: 'file' (directorio local compartido por
+# los workers de una máquina), 'redis' (requiere redis-py; varias máquinas) o
+# 'locmem' (LRU en memoria de cada proceso, acotado por CACHE_MAX_ENTRIES).
+CACHE_BACKEND = env_config('CACHE_BACKEND', default='locmem' if 'test' in sys.argv else 'file')
+CACHE_MAX_ENTRIES = env_config('CACHE_MAX_ENTRIES', default=1000, cast=int)
+CACHES_DISPONIBLES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'agricola-respuestas',
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': env_config('CACHE_LOCATION', default=os.path.join(BASE_DIR, '.cache')),
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': env_config('CACHE_LOCATION', default='redis://127.0.0.1:6379/1'),
+    },
+}
+CACHES = {'default': CACHES_DISPONIBLES[CACHE_BACKEND]}
+# Las versiones de los tags viven en el backend: con 'locmem' una escritura en
+# un worker no invalida las respuestas de los demás. Por eso con 'locmem' las
+# respuestas solo se cachean si se pide (un único proceso)
+CACHE_RESPUESTAS = env_config(
+    'CACHE_RESPUESTAS', default=CACHE_BACKEND != 'locmem' or 'test' in sys.argv, cast=bool
+)
+# Segundos que vive una respuesta cacheada (las señales la invalidan antes)
+CACHE_RESPUESTAS_TIMEOUT = env_config('CACHE_RESPUESTAS_TIMEOUT', default=300, cast=int)
+# Segundos máximos que un proceso reutiliza las configuraciones de alertas
+ALERTAS_CONFIG_TTL = env_config('ALERTAS_CONFIG_TTL', default=60, cast=int)
+# Pronóstico de consumo (calcular_pronostico): días de historia, ventana de la
+# media móvil y factor del suavizado exponencial; días sin movimientos y de
+# cobertura a partir de los que se generan alertas
+PRONOSTICO_DIAS_HISTORIA = env_config('PRONOSTICO_DIAS_HISTORIA', default=730, cast=int)
+PRONOSTICO_VENTANA = env_config('PRONOSTICO_VENTANA', default=30, cast=int)
+PRONOSTICO_ALFA = env_config('PRONOSTICO_ALFA', default=0.1, cast=float)
+PRONOSTICO_DIAS_SIN_MOVIMIENTOS = env_config('PRONOSTICO_DIAS_SIN_MOVIMIENTOS', default=90, cast=int)
+PRONOSTICO_DIAS_COBERTURA = env_config('PRONOSTICO_DIAS_COBERTURA', default=14, cast=int)
+# Días de entrega de los proveedores que no tienen los suyos (sugerencias de pedido)
+REPOSICION_DIAS_ENTREGA = env_config('REPOSICION_DIAS_ENTREGA', default=7, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -155,6 +244,23 @@ REST_FRAMEWORK = {
     ],
 }
 
+# JSON con orjson (si está instalado) en respuestas y peticiones. Con
+# JSON_RAPIDO=False se usan el renderer y el parser estándar de DRF
+if env_config('JSON_RAPIDO', default=True, cast=bool):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'comun.json_rapido.JSONRapidoRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = [
+        'comun.json_rapido.JSONRapidoParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ]
+
+# Listados de productos y alertas serializados desde values() (misma salida
+# que los ModelSerializer). Con SERIALIZACION_VALORES=False se usan estos
+SERIALIZACION_VALORES = env_config('SERIALIZACION_VALORES', default=True, cast=bool)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
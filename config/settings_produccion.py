@@ -0,0 +1,40 @@
+"""
+Perfil de producción.
+
+Usar con ``DJANGO_SETTINGS_MODULE=config.settings_produccion``. Parte de
+``config.settings`` y ajusta la conexión a la base de datos:
+
+- Conexiones persistentes (``CONN_MAX_AGE``) para no pagar el handshake TCP
+  y la autenticación con el servidor MySQL remoto en cada petición.
+- ``CONN_HEALTH_CHECKS`` para descartar conexiones que el servidor cerró
+  (``wait_timeout``) antes de reutilizarlas.
+- Opciones de sesión de MySQL: nivel de aislamiento, modo estricto y
+  espera máxima por bloqueos de fila.
+"""
+
+import copy
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, env_config
+
+DEBUG = env_config('DEBUG', default=False, cast=bool)
+
+# Copia propia para no modificar la configuración base al importar el perfil
+DATABASES = copy.deepcopy(DATABASES)
+_default = DATABASES['default']
+# Segundos que se reutiliza una conexión; debe ser menor que wait_timeout del servidor
+_default['CONN_MAX_AGE'] = env_config('DB_CONN_MAX_AGE', default=300, cast=int)
+_default['CONN_HEALTH_CHECKS'] = env_config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+if _default['ENGINE'] == 'django.db.backends.mysql':
+    _default['OPTIONS'] = {
+        # Los movimientos bloquean las filas que modifican (select_for_update),
+        # así que no necesitan REPEATABLE READ y se evitan gap locks
+        'isolation_level': env_config('DB_ISOLATION_LEVEL', default='read committed'),
+        'charset': 'utf8mb4',
+        'connect_timeout': env_config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+        'init_command': (
+            "SET sql_mode='STRICT_TRANS_TABLES', "
+            f"innodb_lock_wait_timeout={env_config('DB_LOCK_WAIT_TIMEOUT', default=10, cast=int)}"
+        ),
+    }
@@ -0,0 +1,47 @@
+"""
+Perfil SQLite en fichero para instalaciones pequeñas.
+
+Usar con ``DJANGO_SETTINGS_MODULE=config.settings_sqlite``. Parte del perfil
+de producción y sustituye la base de datos por un fichero SQLite con:
+
+- ``journal_mode=WAL``: las lecturas no bloquean a la escritura ni al revés.
+- ``synchronous=NORMAL``: con WAL es seguro ante caídas del proceso y evita
+  un fsync por transacción.
+- ``mmap_size`` y ``cache_size`` para servir lecturas desde memoria.
+- ``busy_timeout``: los escritores esperan el bloqueo en lugar de fallar.
+
+Las conexiones son persistentes, así que los pragmas se aplican una vez por
+conexión. El registro de movimientos abre sus transacciones con
+``BEGIN IMMEDIATE`` (ver ``comun.transacciones``).
+"""
+
+import os
+
+from .settings_produccion import *  # noqa: F401,F403
+from .settings_produccion import BASE_DIR, DATABASES, env_config
+
+_pragmas = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': env_config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+    # Valor negativo: tamaño en KiB (64 MiB por conexión)
+    'cache_size': env_config('SQLITE_CACHE_SIZE', default=-64 * 1024, cast=int),
+    'busy_timeout': env_config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': env_config('SQLITE_PATH', default=os.path.join(BASE_DIR, 'db.sqlite3')),
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': DATABASES['default']['CONN_HEALTH_CHECKS'],
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {nombre}={valor}' for nombre, valor in _pragmas.items()),
+            # Espera del módulo sqlite3 (segundos), alineada con busy_timeout
+            'timeout': _pragmas['busy_timeout'] / 1000,
+        },
+    },
+}
+USAR_REPLICA = False
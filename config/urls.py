@@ -21,6 +21,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from comun.views import MetricasPrometheusView
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Grupo 3 - Agro API",
@@ -49,4 +51,6 @@ urlpatterns = [
     path("api/productos/", include("Productos.urls")),
     path("api/movimientos/", include("movimientos.urls")),
     path("api/auth/", include("autenticacion.urls")),
+    path("api/", include("comun.urls")),
+    path("metrics", MetricasPrometheusView.as_view(), name="metricas-prometheus"),
 ]
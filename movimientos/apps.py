@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class MovimientosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movimientos'
+
+    def ready(self):
+        from comun.signals import conectar_invalidacion
+        from .models import Movimiento
+        import movimientos.signals
+
+        conectar_invalidacion(
+            Movimiento,
+            lambda instance, **kwargs: ['productos', f'producto:{instance.producto_id}'],
+        )
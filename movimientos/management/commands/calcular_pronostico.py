@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from Alertas.models import ConfiguracionAlerta
+from Alertas.services import AlertaService
+from movimientos.services import PronosticoService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula el consumo diario y los días de cobertura de todos los "
+        "productos y genera las alertas de productos sin movimientos y de "
+        "inventario bajo"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sin-alertas",
+            action="store_true",
+            help="Solo recalcular el pronóstico",
+        )
+
+    def handle(self, *args, **options):
+        resultado = PronosticoService().actualizar()
+        self.stdout.write(
+            f"Pronóstico de {resultado['productos']} productos a partir de "
+            f"{resultado['filas']} filas agrupadas en {resultado['segundos']:.2f} s "
+            f"({'NumPy' if resultado['numpy'] else 'Python sin NumPy'})"
+        )
+        if options["sin_alertas"]:
+            return
+
+        ConfiguracionAlerta.crear_faltantes()
+        resultados = AlertaService().revisar_pronostico()
+        for nombre, valores in resultados.items():
+            self.stdout.write(f"  {nombre}: {valores['creadas']} alertas creadas")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from movimientos.renderers import PedidoCSVRenderer
+from movimientos.serializers import InformePedidoSerializer
+from movimientos.services import ReposicionService
+
+
+class Command(BaseCommand):
+    help = (
+        "Pedido sugerido por proveedor: cantidad hasta el stock máximo más el "
+        "consumo pronosticado durante la entrega"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--proveedor", help="Solo el pedido de este proveedor")
+        parser.add_argument("--formato", choices=("csv", "json"), default="csv")
+        parser.add_argument("--salida", help="Fichero de salida (por defecto la salida estándar)")
+
+    def handle(self, *args, **options):
+        datos = InformePedidoSerializer(ReposicionService().informe(options["proveedor"])).data
+        if options["formato"] == "csv":
+            contenido = PedidoCSVRenderer().render(datos).decode()
+        else:
+            contenido = JSONRenderer().render(datos, renderer_context={"indent": 2}).decode() + "\n"
+
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8", newline="") as fichero:
+                fichero.write(contenido)
+            self.stdout.write(
+                f"{datos['productos']} productos de {len(datos['proveedores'])} proveedores "
+                f"por {datos['importe_total']} en {options['salida']}"
+            )
+        else:
+            self.stdout.write(contenido, ending="")
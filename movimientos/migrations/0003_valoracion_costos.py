@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-19 20:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Productos', '0005_historialprecio_producto_fecha_index'),
+        ('movimientos', '0002_delete_movimientoextra'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CostoProducto',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='costo', serialize=False, to='Productos.producto')),
+                ('cantidad', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('costo_promedio', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('valor_promedio', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('valor_fifo', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Costo de Producto',
+                'verbose_name_plural': 'Costos de Productos',
+            },
+        ),
+        migrations.AddField(
+            model_name='movimiento',
+            name='costo_unitario',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Costo por unidad de una entrada (por defecto, el precio de compra del producto)', max_digits=12, null=True),
+        ),
+        migrations.CreateModel(
+            name='CapaCosto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad_restante', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('costo_unitario', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('movimiento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='movimientos.movimiento')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='capas_costo', to='Productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Capa de Costo',
+                'verbose_name_plural': 'Capas de Costo',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['producto', 'id'], name='movimientos_product_36397b_idx')],
+            },
+        ),
+    ]
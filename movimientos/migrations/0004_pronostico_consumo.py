@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 20:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Productos', '0005_historialprecio_producto_fecha_index'),
+        ('movimientos', '0003_valoracion_costos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronosticoConsumo',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pronostico', serialize=False, to='Productos.producto')),
+                ('consumo_promedio', models.DecimalField(decimal_places=3, default=0, help_text='Media móvil de las salidas diarias', max_digits=12)),
+                ('consumo_suavizado', models.DecimalField(decimal_places=3, default=0, help_text='Suavizado exponencial de las salidas diarias', max_digits=12)),
+                ('dias_cobertura', models.DecimalField(blank=True, decimal_places=1, help_text='Días que cubre el stock actual al consumo suavizado (vacío si no hay consumo)', max_digits=6, null=True)),
+                ('ultimo_movimiento', models.DateField(blank=True, null=True)),
+                ('fecha_calculo', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Pronóstico de Consumo',
+                'verbose_name_plural': 'Pronósticos de Consumo',
+                'indexes': [models.Index(fields=['dias_cobertura'], name='movimientos_dias_co_3488c6_idx'), models.Index(fields=['ultimo_movimiento'], name='movimientos_ultimo__1a54a7_idx')],
+            },
+        ),
+    ]
@@ -8,8 +8,97 @@ class Movimiento(models.Model):
     tipo = models.CharField(max_length=10, choices=TIPO_MOVIMIENTO)
     cantidad = models.PositiveIntegerField()
     fecha = models.DateTimeField(auto_now_add=True)
+    costo_unitario = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        null=True,
+        blank=True,
+        help_text="Costo por unidad de una entrada (por defecto, el precio de compra del producto)",
+    )
 
     def __str__(self):
         return f"{self.tipo} - {self.producto.nombre} ({self.cantidad})"
 
 
+class CostoProducto(models.Model):
+    """Estado de valoración de un producto, actualizado con cada movimiento.
+
+    Se mantienen a la vez el costo promedio ponderado (``valor_promedio``)
+    y el valor de las capas FIFO abiertas (``valor_fifo``), así el informe
+    de valoración no tiene que recorrer el historial de movimientos.
+    """
+    producto = models.OneToOneField(
+        Producto, on_delete=models.CASCADE, primary_key=True, related_name='costo'
+    )
+    cantidad = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    costo_promedio = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    valor_promedio = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    valor_fifo = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Costo de Producto'
+        verbose_name_plural = 'Costos de Productos'
+
+    def __str__(self):
+        return f"Costo {self.producto_id}: {self.cantidad} a {self.costo_promedio}"
+
+
+class CapaCosto(models.Model):
+    """Capa FIFO abierta: unidades de una entrada que aún no se han consumido"""
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='capas_costo')
+    movimiento = models.ForeignKey(
+        Movimiento, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    cantidad_restante = models.DecimalField(max_digits=12, decimal_places=3)
+    costo_unitario = models.DecimalField(max_digits=12, decimal_places=4)
+
+    class Meta:
+        verbose_name = 'Capa de Costo'
+        verbose_name_plural = 'Capas de Costo'
+        ordering = ['id']
+        indexes = [
+            # Consumo en orden de llegada por producto
+            models.Index(fields=['producto', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Capa {self.producto_id}: {self.cantidad_restante} a {self.costo_unitario}"
+
+
+
+
+class PronosticoConsumo(models.Model):
+    """Consumo diario estimado y días de cobertura de un producto.
+
+    Lo recalcula en bloque ``calcular_pronostico`` a partir de las salidas.
+    """
+    producto = models.OneToOneField(
+        Producto, on_delete=models.CASCADE, primary_key=True, related_name='pronostico'
+    )
+    consumo_promedio = models.DecimalField(
+        max_digits=12, decimal_places=3, default=0, help_text="Media móvil de las salidas diarias"
+    )
+    consumo_suavizado = models.DecimalField(
+        max_digits=12, decimal_places=3, default=0, help_text="Suavizado exponencial de las salidas diarias"
+    )
+    dias_cobertura = models.DecimalField(
+        max_digits=6,
+        decimal_places=1,
+        null=True,
+        blank=True,
+        help_text="Días que cubre el stock actual al consumo suavizado (vacío si no hay consumo)",
+    )
+    ultimo_movimiento = models.DateField(null=True, blank=True)
+    fecha_calculo = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Pronóstico de Consumo'
+        verbose_name_plural = 'Pronósticos de Consumo'
+        indexes = [
+            models.Index(fields=['dias_cobertura']),
+            models.Index(fields=['ultimo_movimiento']),
+        ]
+
+    def __str__(self):
+        return f"Pronóstico {self.producto_id}: {self.consumo_suavizado}/día"
@@ -0,0 +1,107 @@
+"""Pronóstico vectorizado del consumo diario por producto.
+
+Las salidas llegan ya agrupadas por producto y día (una fila por día con
+movimientos), así que el trabajo es proporcional a esas filas y no a
+productos por días de historia:
+
+- Media móvil: suma de las salidas de los últimos ``ventana`` días entre
+  ``ventana``.
+- Suavizado exponencial sobre la serie diaria completa (los días sin filas
+  cuentan como consumo cero). Partiendo de cero, el valor final es
+  ``sum(alfa * (1 - alfa) ** (último_día - día) * salidas)``, una suma
+  ponderada que se acumula por producto en una pasada.
+- Días de cobertura: stock actual entre el consumo suavizado.
+
+Con NumPy instalado todo se calcula con ``bincount`` sobre los arrays de
+todos los productos a la vez. NumPy está en ``requirements.txt``; si falta
+se usa la misma fórmula en Python puro, más lenta pero con el mismo resultado.
+"""
+from datetime import date
+import math
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+
+def disponible():
+    return np is not None
+
+
+def calcular(productos, stock, filas_productos, filas_fechas, filas_salidas, inicio, dias_historia, ventana, alfa):
+    """Pronóstico de ``productos`` (ids en orden ascendente, con su ``stock``).
+
+    ``filas_*`` son las columnas de la consulta agrupada: producto, día y
+    salidas de ese día (0 en días con solo entradas). ``inicio`` es la fecha
+    del día 0 de la historia. Las filas de productos que no están en
+    ``productos`` se ignoran.
+
+    Devuelve listas alineadas con ``productos``: consumo promedio, consumo
+    suavizado, días de cobertura (``math.inf`` sin consumo) y último día con
+    movimientos contado desde ``inicio`` (-1 si no hubo ninguno).
+    """
+    if not productos:
+        return [], [], [], []
+    if np is not None:
+        return _calcular_numpy(
+            productos, stock, filas_productos, filas_fechas, filas_salidas,
+            inicio, dias_historia, ventana, alfa,
+        )
+    return _calcular_python(
+        productos, stock, filas_productos, filas_fechas, filas_salidas,
+        inicio, dias_historia, ventana, alfa,
+    )
+
+
+def _calcular_numpy(productos, stock, filas_productos, filas_fechas, filas_salidas,
+                    inicio, dias_historia, ventana, alfa):
+    productos = np.asarray(productos, dtype=np.int64)
+    stock = np.asarray(stock, dtype=np.float64)
+    total = len(productos)
+    ids = np.asarray(filas_productos, dtype=np.int64)
+    # fromiter con toordinal es mucho más rápido que convertir objetos date a datetime64
+    dias = np.fromiter(map(date.toordinal, filas_fechas), dtype=np.int64, count=len(ids)) - inicio.toordinal()
+    salidas = np.asarray(filas_salidas, dtype=np.float64)
+
+    # Posición de cada fila en ``productos`` (ids ordenados)
+    posiciones = np.minimum(np.searchsorted(productos, ids), total - 1)
+    conocidas = productos[posiciones] == ids
+    posiciones, dias, salidas = posiciones[conocidas], dias[conocidas], salidas[conocidas]
+
+    recientes = dias >= dias_historia - ventana
+    promedio = np.bincount(posiciones[recientes], weights=salidas[recientes], minlength=total) / ventana
+    pesos = alfa * (1 - alfa) ** (dias_historia - 1 - dias)
+    suavizado = np.bincount(posiciones, weights=pesos * salidas, minlength=total)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cobertura = np.where(suavizado > 0, np.maximum(stock, 0) / suavizado, np.inf)
+    ultimo = np.full(total, -1, dtype=np.int64)
+    np.maximum.at(ultimo, posiciones, dias)
+    return promedio.tolist(), suavizado.tolist(), cobertura.tolist(), ultimo.tolist()
+
+
+def _calcular_python(productos, stock, filas_productos, filas_fechas, filas_salidas,
+                     inicio, dias_historia, ventana, alfa):
+    total = len(productos)
+    posicion = {producto: indice for indice, producto in enumerate(productos)}
+    promedio = [0.0] * total
+    suavizado = [0.0] * total
+    ultimo = [-1] * total
+    limite_ventana = dias_historia - ventana
+    for producto, fecha, salida in zip(filas_productos, filas_fechas, filas_salidas):
+        indice = posicion.get(producto)
+        if indice is None:
+            continue
+        dia = (fecha - inicio).days
+        salida = float(salida)
+        if dia >= limite_ventana:
+            promedio[indice] += salida
+        suavizado[indice] += alfa * (1 - alfa) ** (dias_historia - 1 - dia) * salida
+        if dia > ultimo[indice]:
+            ultimo[indice] = dia
+    promedio = [valor / ventana for valor in promedio]
+    cobertura = [
+        max(float(existencias), 0.0) / consumo if consumo > 0 else math.inf
+        for existencias, consumo in zip(stock, suavizado)
+    ]
+    return promedio, suavizado, cobertura, ultimo
@@ -0,0 +1,47 @@
+import csv
+import io
+
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+
+
+class PedidoCSVRenderer(BaseRenderer):
+    """Pedido sugerido en CSV (``?format=csv``): una fila por producto con su proveedor.
+
+    Trabaja sobre ``InformePedidoSerializer(...).data``, así que sirve igual
+    para las respuestas recién calculadas y para las cacheadas.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    CABECERA = (
+        "Proveedor", "Código", "Nombre", "Unidad", "Stock Actual", "Stock Mínimo",
+        "Stock Máximo", "Consumo Diario", "Días Entrega", "Consumo Entrega",
+        "Cantidad Sugerida", "Precio Compra", "Importe",
+    )
+    COLUMNAS = (
+        "codigo", "nombre", "unidad_medida", "stock_actual", "stock_minimo",
+        "stock_maximo", "consumo_diario", "dias_entrega", "consumo_entrega",
+        "cantidad_sugerida", "precio_compra", "importe",
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        salida = io.StringIO()
+        writer = csv.writer(salida)
+        if isinstance(data, dict) and "proveedores" in data:
+            writer.writerow(self.CABECERA)
+            for pedido in data["proveedores"]:
+                for linea in pedido["lineas"]:
+                    writer.writerow([pedido["proveedor"], *(linea[columna] for columna in self.COLUMNAS)])
+            respuesta = (renderer_context or {}).get("response")
+            if respuesta is not None:
+                respuesta["Content-Disposition"] = (
+                    f'attachment; filename="pedido_sugerido_{timezone.localtime():%Y%m%d_%H%M}.csv"'
+                )
+        elif isinstance(data, dict):
+            # Errores de validación o de autenticación
+            for clave, valor in data.items():
+                writer.writerow([clave, valor])
+        return salida.getvalue().encode(self.charset)
@@ -2,13 +2,23 @@ from rest_framework import serializers
 from .models import Movimiento
 from Productos.models import Producto
 
+class AsignacionLoteSerializer(serializers.Serializer):
+    """Cantidad tomada de cada lote al registrar una salida"""
+    lote_id = serializers.IntegerField()
+    lote = serializers.CharField()
+    fecha_vencimiento = serializers.DateField(allow_null=True)
+    cantidad = serializers.DecimalField(max_digits=12, decimal_places=3)
+
+
 class MovimientoSerializer(serializers.ModelSerializer):
     producto_nombre = serializers.CharField(source='producto.nombre', read_only=True, allow_null=True)
+    # Solo presente en la respuesta de creación de una salida
+    asignacion_lotes = AsignacionLoteSerializer(many=True, read_only=True)
     
     class Meta:
         model = Movimiento
         fields = ['id', 'producto', 'producto_nombre', 'tipo', 
-                  'cantidad', 'fecha']
+                  'cantidad', 'costo_unitario', 'fecha', 'asignacion_lotes']
         read_only_fields = ['fecha']
 
     def validate_cantidad(self, value):
@@ -17,8 +27,17 @@ class MovimientoSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("La cantidad debe ser mayor a 0")
         return value
 
+    def validate_costo_unitario(self, value):
+        if value is not None and value < 0:
+            raise serializers.ValidationError("El costo unitario no puede ser negativo")
+        return value
+
     def validate(self, data):
         """Validación adicional para movimientos de salida"""
+        if data.get('tipo') == 'salida' and data.get('costo_unitario') is not None:
+            raise serializers.ValidationError({
+                'costo_unitario': 'Solo las entradas llevan costo unitario; las salidas se valoran con el costo registrado'
+            })
         if data.get('tipo') == 'salida':
             producto = data.get('producto')
             cantidad = data.get('cantidad')
@@ -30,3 +49,47 @@ class MovimientoSerializer(serializers.ModelSerializer):
                     })
         
         return data
+
+
+class ValoracionProductoSerializer(serializers.Serializer):
+    """Fila del informe de valoración (``ValoracionService.anotar_valoracion``)"""
+    producto = serializers.IntegerField(source='id')
+    codigo = serializers.CharField()
+    nombre = serializers.CharField()
+    categoria_nombre = serializers.CharField(source='categoria__nombre')
+    stock_actual = serializers.DecimalField(max_digits=12, decimal_places=3)
+    cantidad_valorada = serializers.DecimalField(max_digits=12, decimal_places=3)
+    costo_unitario = serializers.DecimalField(max_digits=12, decimal_places=4)
+    valor = serializers.DecimalField(max_digits=16, decimal_places=2)
+    valor_precio_compra = serializers.DecimalField(max_digits=16, decimal_places=2)
+
+
+class LineaPedidoSerializer(serializers.Serializer):
+    """Producto de una sugerencia de pedido (``ReposicionService.sugerencias``)"""
+    producto = serializers.IntegerField(source='id')
+    codigo = serializers.CharField()
+    nombre = serializers.CharField()
+    unidad_medida = serializers.CharField()
+    stock_actual = serializers.DecimalField(max_digits=12, decimal_places=3)
+    stock_minimo = serializers.DecimalField(max_digits=12, decimal_places=3)
+    stock_maximo = serializers.DecimalField(max_digits=12, decimal_places=3)
+    consumo_diario = serializers.DecimalField(max_digits=12, decimal_places=3)
+    dias_entrega = serializers.IntegerField()
+    consumo_entrega = serializers.DecimalField(max_digits=15, decimal_places=3)
+    cantidad_sugerida = serializers.DecimalField(max_digits=15, decimal_places=3)
+    precio_compra = serializers.DecimalField(max_digits=12, decimal_places=2)
+    importe = serializers.DecimalField(max_digits=18, decimal_places=2)
+
+
+class PedidoProveedorSerializer(serializers.Serializer):
+    proveedor = serializers.CharField()
+    productos = serializers.IntegerField()
+    importe_total = serializers.DecimalField(max_digits=18, decimal_places=2)
+    lineas = LineaPedidoSerializer(many=True)
+
+
+class InformePedidoSerializer(serializers.Serializer):
+    """Pedido sugerido de todos los proveedores (``ReposicionService.informe``)"""
+    productos = serializers.IntegerField()
+    importe_total = serializers.DecimalField(max_digits=18, decimal_places=2)
+    proveedores = PedidoProveedorSerializer(many=True)
@@ -0,0 +1,384 @@
+from datetime import timedelta
+from decimal import Decimal
+from itertools import groupby
+import math
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import (
+    Case, Count, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, Greatest, Round, TruncDate
+from django.utils import timezone
+
+from Productos.models import Producto
+from Productos.services import inicio_dia
+from comun.signals import invalidar_tras_escritura
+from proveedores.models import Proveedor
+
+from . import pronostico
+from .models import CapaCosto, CostoProducto, Movimiento, PronosticoConsumo
+
+CUATRO_DECIMALES = Decimal("0.0001")
+METODOS_VALORACION = ("promedio", "fifo")
+
+
+def _redondear(valor):
+    return valor.quantize(CUATRO_DECIMALES)
+
+
+class ValoracionService:
+    """Valoración de inventario por costo promedio ponderado y por capas FIFO.
+
+    El estado de cada producto (``CostoProducto`` y sus ``CapaCosto``
+    abiertas) se actualiza con cada movimiento: una entrada suma una capa y
+    recalcula el promedio, una salida descuenta al costo promedio y consume
+    las capas más antiguas. Los cambios de stock que no son movimientos
+    (lotes, ediciones del producto) se concilian como ajustes al precio de
+    compra. El informe lee ese estado sin recorrer el historial.
+    """
+
+    def registrar_movimiento(self, movimiento, stock_anterior, tamano_bloque=50):
+        """Aplicar ``movimiento`` al estado de costo de su producto.
+
+        Debe ejecutarse en la transacción que registra el movimiento y con el
+        producto ya bloqueado, lo que serializa los cambios por producto. Si
+        el producto aún no tiene estado, su ``stock_anterior`` entra como saldo
+        inicial al precio de compra; si lo tiene, antes se concilia con
+        ``stock_anterior`` por si el stock cambió fuera de los movimientos. El
+        promedio se actualiza en O(1) y FIFO solo lee las capas que consume.
+        """
+        costo = CostoProducto.objects.filter(producto_id=movimiento.producto_id).first()
+        if costo is None:
+            costo = self._saldo_inicial(movimiento.producto, stock_anterior)
+        else:
+            self._ajustar(costo, movimiento.producto, stock_anterior, tamano_bloque)
+
+        cantidad = Decimal(movimiento.cantidad)
+        if movimiento.tipo == "entrada":
+            self._entrada(costo, cantidad, movimiento.costo_unitario, movimiento)
+        else:
+            self._salida(costo, cantidad, tamano_bloque)
+        costo.save()
+        return costo
+
+    def conciliar(self, producto, tamano_bloque=50):
+        """Llevar el estado de costo de ``producto`` a su ``stock_actual``.
+
+        Los lotes y las ediciones del producto cambian el stock sin pasar por
+        un movimiento. La diferencia se registra como ajuste: las unidades de
+        más entran como capa al precio de compra y las de menos salen de las
+        capas más antiguas. Un producto sin estado no necesita conciliarse:
+        su stock entra como saldo inicial con el primer movimiento.
+        """
+        costo = CostoProducto.objects.select_for_update().filter(producto_id=producto.pk).first()
+        if costo is not None and self._ajustar(costo, producto, producto.stock_actual, tamano_bloque):
+            costo.save()
+        return costo
+
+    def _ajustar(self, costo, producto, stock, tamano_bloque):
+        diferencia = max(Decimal(stock), Decimal(0)) - costo.cantidad
+        if diferencia > 0:
+            self._entrada(costo, diferencia, producto.precio_compra)
+        elif diferencia < 0:
+            self._salida(costo, -diferencia, tamano_bloque)
+        return bool(diferencia)
+
+    def _saldo_inicial(self, producto, stock_anterior):
+        cantidad = max(Decimal(stock_anterior), Decimal(0))
+        valor = _redondear(cantidad * producto.precio_compra)
+        costo = CostoProducto(
+            producto=producto,
+            cantidad=cantidad,
+            costo_promedio=producto.precio_compra,
+            valor_promedio=valor,
+            valor_fifo=valor,
+        )
+        if cantidad:
+            CapaCosto.objects.create(
+                producto=producto,
+                cantidad_restante=cantidad,
+                costo_unitario=producto.precio_compra,
+            )
+        return costo
+
+    def _entrada(self, costo, cantidad, costo_unitario, movimiento=None):
+        valor = _redondear(cantidad * costo_unitario)
+        costo.cantidad += cantidad
+        costo.valor_promedio += valor
+        costo.valor_fifo += valor
+        costo.costo_promedio = _redondear(costo.valor_promedio / costo.cantidad)
+        CapaCosto.objects.create(
+            producto_id=costo.producto_id,
+            movimiento=movimiento,
+            cantidad_restante=cantidad,
+            costo_unitario=costo_unitario,
+        )
+
+    def _salida(self, costo, cantidad, tamano_bloque):
+        if not cantidad:
+            return
+        consumido = self._consumir_capas(costo.producto_id, cantidad, tamano_bloque)
+        costo.cantidad -= cantidad
+        if costo.cantidad:
+            costo.valor_promedio -= _redondear(cantidad * costo.costo_promedio)
+            costo.valor_fifo -= consumido
+        else:
+            # Sin existencias no queda valor: evita arrastrar restos de redondeo
+            costo.valor_promedio = costo.valor_fifo = Decimal(0)
+
+    def _consumir_capas(self, producto_id, cantidad, tamano_bloque):
+        """Descontar ``cantidad`` de las capas más antiguas y devolver su valor.
+
+        Las capas agotadas se borran, así solo quedan las abiertas y cada
+        salida lee únicamente las que consume.
+        """
+        pendiente = cantidad
+        valor = Decimal(0)
+        agotadas = []
+        parcial = None
+        capas = CapaCosto.objects.select_for_update().filter(producto_id=producto_id).order_by("id")
+        inicio = 0
+        while pendiente > 0:
+            bloque = list(capas[inicio:inicio + tamano_bloque])
+            for capa in bloque:
+                tomada = min(capa.cantidad_restante, pendiente)
+                valor += tomada * capa.costo_unitario
+                pendiente -= tomada
+                if tomada == capa.cantidad_restante:
+                    agotadas.append(capa.pk)
+                else:
+                    capa.cantidad_restante -= tomada
+                    parcial = capa
+                if pendiente <= 0:
+                    break
+            if len(bloque) < tamano_bloque:
+                break
+            inicio += tamano_bloque
+
+        if agotadas:
+            CapaCosto.objects.filter(pk__in=agotadas).delete()
+        if parcial is not None:
+            parcial.save(update_fields=["cantidad_restante"])
+        return _redondear(valor)
+
+    def anotar_valoracion(self, queryset, metodo="promedio"):
+        """Anotar ``cantidad_valorada``, ``costo_unitario`` y ``valor`` por producto.
+
+        Los productos sin movimientos registrados desde que existe la
+        valoración se valoran a ``stock_actual * precio_compra``;
+        ``valor_precio_compra`` mantiene ese cálculo para comparar.
+        """
+        dinero = DecimalField(max_digits=16, decimal_places=4)
+        sin_estado = Q(costo__isnull=True)
+        valor_precio_compra = F("stock_actual") * F("precio_compra")
+        valor = "costo__valor_fifo" if metodo == "fifo" else "costo__valor_promedio"
+        if metodo == "fifo":
+            costo_unitario = Case(
+                When(sin_estado, then=F("precio_compra")),
+                When(costo__cantidad__gt=0, then=F("costo__valor_fifo") / F("costo__cantidad")),
+                default=Value(Decimal(0)),
+                output_field=dinero,
+            )
+        else:
+            costo_unitario = Coalesce("costo__costo_promedio", "precio_compra", output_field=dinero)
+        return queryset.annotate(
+            cantidad_valorada=Coalesce("costo__cantidad", "stock_actual"),
+            costo_unitario=costo_unitario,
+            valor=Case(
+                When(sin_estado, then=valor_precio_compra),
+                default=F(valor),
+                output_field=dinero,
+            ),
+            valor_precio_compra=valor_precio_compra,
+        )
+
+    def resumen(self, queryset):
+        """Totales por ambos métodos y por precio de compra, en una consulta"""
+        dinero = DecimalField(max_digits=18, decimal_places=4)
+        valor_precio_compra = F("stock_actual") * F("precio_compra")
+        return queryset.aggregate(
+            productos=Count("id"),
+            valor_promedio=Coalesce(
+                Sum(Coalesce("costo__valor_promedio", valor_precio_compra, output_field=dinero)),
+                Value(Decimal(0)),
+                output_field=dinero,
+            ),
+            valor_fifo=Coalesce(
+                Sum(Coalesce("costo__valor_fifo", valor_precio_compra, output_field=dinero)),
+                Value(Decimal(0)),
+                output_field=dinero,
+            ),
+            valor_precio_compra=Coalesce(
+                Sum(valor_precio_compra, output_field=dinero), Value(Decimal(0)), output_field=dinero
+            ),
+        )
+
+
+
+def ajuste_pronostico(nombre):
+    """Parámetro ``PRONOSTICO_<nombre>`` de settings"""
+    return getattr(settings, f"PRONOSTICO_{nombre}")
+
+
+class PronosticoService:
+    """Consumo diario y días de cobertura de todos los productos activos"""
+
+    COBERTURA_MAXIMA = Decimal("99999.9")
+
+    def actualizar(self, hoy=None):
+        """Recalcular y guardar ``PronosticoConsumo`` de todos los productos activos.
+
+        Las salidas se leen con una sola consulta agrupada por producto y día
+        y el cálculo se hace sobre todos los productos a la vez (ver
+        ``pronostico``). Los resultados se guardan con un ``bulk_create`` que
+        actualiza las filas existentes. Si un producto no tuvo movimientos en
+        la historia, conserva su último movimiento conocido.
+        """
+        inicio_calculo = time.perf_counter()
+        hoy = hoy or timezone.localdate()
+        dias_historia = ajuste_pronostico("DIAS_HISTORIA")
+        inicio = hoy - timedelta(days=dias_historia - 1)
+
+        productos = list(
+            Producto.objects.filter(activo=True).order_by("id").values_list("id", "stock_actual")
+        )
+        filas = list(
+            Movimiento.objects.filter(
+                fecha__gte=inicio_dia(inicio), fecha__lt=inicio_dia(hoy + timedelta(days=1))
+            )
+            .annotate(dia=TruncDate("fecha"))
+            .values("producto_id", "dia")
+            .annotate(salidas=Sum(Case(When(tipo="salida", then="cantidad"), default=Value(0))))
+            .order_by()
+            .values_list("producto_id", "dia", "salidas")
+        )
+        ids = [producto_id for producto_id, _ in productos]
+        promedio, suavizado, cobertura, ultimo = pronostico.calcular(
+            ids,
+            [stock for _, stock in productos],
+            *(zip(*filas) if filas else ((), (), ())),
+            inicio=inicio,
+            dias_historia=dias_historia,
+            ventana=min(ajuste_pronostico("VENTANA"), dias_historia),
+            alfa=ajuste_pronostico("ALFA"),
+        )
+
+        anteriores = dict(
+            PronosticoConsumo.objects.filter(ultimo_movimiento__isnull=False).values_list(
+                "producto_id", "ultimo_movimiento"
+            )
+        )
+        ahora = timezone.now()
+        registros = [
+            PronosticoConsumo(
+                producto_id=producto_id,
+                consumo_promedio=Decimal(f"{promedio[indice]:.3f}"),
+                consumo_suavizado=Decimal(f"{suavizado[indice]:.3f}"),
+                dias_cobertura=self._cobertura(cobertura[indice]),
+                ultimo_movimiento=(
+                    inicio + timedelta(days=ultimo[indice])
+                    if ultimo[indice] >= 0
+                    else anteriores.get(producto_id)
+                ),
+                fecha_calculo=ahora,
+            )
+            for indice, producto_id in enumerate(ids)
+        ]
+        # MySQL actualiza por cualquier clave única y no admite indicarla
+        con_objetivo = connections[PronosticoConsumo.objects.db].features.supports_update_conflicts_with_target
+        with transaction.atomic():
+            PronosticoConsumo.objects.bulk_create(
+                registros,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=["producto"] if con_objetivo else None,
+                update_fields=[
+                    "consumo_promedio", "consumo_suavizado", "dias_cobertura",
+                    "ultimo_movimiento", "fecha_calculo",
+                ],
+            )
+        # Las sugerencias de pedido cacheadas dependen del pronóstico
+        invalidar_tras_escritura("pronostico")
+
+        return {
+            "productos": len(ids),
+            "filas": len(filas),
+            "numpy": pronostico.disponible(),
+            "segundos": round(time.perf_counter() - inicio_calculo, 3),
+        }
+
+    def _cobertura(self, dias):
+        if math.isinf(dias):
+            return None
+        return min(Decimal(f"{dias:.1f}"), self.COBERTURA_MAXIMA)
+
+
+class ReposicionService:
+    """Pedido sugerido por proveedor a partir de los niveles de stock y del pronóstico.
+
+    El consumo durante la entrega es el consumo suavizado del producto por
+    los días de entrega de su proveedor principal. Se sugiere pedir cuando el
+    stock que quedará al recibir el pedido no supera el mínimo, y la cantidad
+    lo lleva hasta el máximo: ``objetivo - stock_actual + consumo_entrega``,
+    con ``objetivo`` el mayor entre el stock máximo y el mínimo. Todo se
+    calcula en una consulta sobre todos los productos activos.
+    """
+
+    COLUMNAS = (
+        "id", "codigo", "nombre", "unidad_medida", "proveedor_principal",
+        "stock_actual", "stock_minimo", "stock_maximo", "consumo_diario",
+        "dias_entrega", "consumo_entrega", "cantidad_sugerida", "precio_compra", "importe",
+    )
+
+    def sugerencias(self, proveedor=None):
+        """Productos a pedir, ordenados por proveedor y código"""
+        cantidad = DecimalField(max_digits=15, decimal_places=3)
+        importe = DecimalField(max_digits=18, decimal_places=2)
+        # Proveedor.nombre es único; el producto lo referencia por texto
+        dias_proveedor = Proveedor.objects.filter(
+            nombre__iexact=OuterRef("proveedor_principal"), dias_entrega__isnull=False
+        ).values("dias_entrega")[:1]
+
+        productos = Producto.objects.filter(activo=True).annotate(
+            consumo_diario=Coalesce(
+                "pronostico__consumo_suavizado", Value(Decimal("0")), output_field=cantidad
+            ),
+            dias_entrega=Coalesce(
+                Subquery(dias_proveedor), Value(getattr(settings, "REPOSICION_DIAS_ENTREGA", 7))
+            ),
+            consumo_entrega=ExpressionWrapper(
+                F("consumo_diario") * F("dias_entrega"), output_field=cantidad
+            ),
+            stock_recepcion=ExpressionWrapper(
+                F("stock_actual") - F("consumo_entrega"), output_field=cantidad
+            ),
+            cantidad_sugerida=Round(
+                Greatest("stock_maximo", "stock_minimo") - F("stock_recepcion"), 3,
+                output_field=cantidad,
+            ),
+            importe=Round(F("cantidad_sugerida") * F("precio_compra"), 2, output_field=importe),
+        ).filter(stock_recepcion__lte=F("stock_minimo"), cantidad_sugerida__gt=0)
+        if proveedor is not None:
+            productos = productos.filter(proveedor_principal__iexact=proveedor)
+        return productos.order_by("proveedor_principal", "codigo").values(*self.COLUMNAS)
+
+    def informe(self, proveedor=None):
+        """Sugerencias agrupadas por proveedor, con el total de cada pedido"""
+        pedidos = []
+        for nombre, lineas in groupby(
+            self.sugerencias(proveedor), key=lambda fila: fila["proveedor_principal"]
+        ):
+            lineas = list(lineas)
+            pedidos.append({
+                "proveedor": nombre,
+                "productos": len(lineas),
+                "importe_total": sum((linea["importe"] for linea in lineas), Decimal("0")),
+                "lineas": lineas,
+            })
+        return {
+            "productos": sum(pedido["productos"] for pedido in pedidos),
+            "importe_total": sum((pedido["importe_total"] for pedido in pedidos), Decimal("0")),
+            "proveedores": pedidos,
+        }
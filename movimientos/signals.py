@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from Productos.models import Producto
+from .services import ValoracionService
+
+
+@receiver(post_save, sender=Producto)
+def conciliar_valoracion_producto(sender, instance, created, update_fields=None, **kwargs):
+    """Llevar a la valoración los cambios de stock que no vienen de un movimiento"""
+    if update_fields is not None and 'stock_actual' not in update_fields:
+        return
+    original, instance._stock_original = instance._stock_original, instance.stock_actual
+    # Si no se conoce el stock original (campo diferido) se concilia igualmente
+    if created or original == instance.stock_actual:
+        return
+    with transaction.atomic(using=kwargs.get('using')):
+        ValoracionService().conciliar(instance)
@@ -1,3 +1,459 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from Productos.models import CategoriaProducto, Producto, LoteProducto
+from proveedores.models import Proveedor
+from . import pronostico
+from .models import CapaCosto, CostoProducto, Movimiento, PronosticoConsumo
+from .services import PronosticoService, ReposicionService, ValoracionService
+from . import views
+
+
+class MovimientoFEFOTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        categoria = CategoriaProducto.objects.create(
+            nombre='Abonos FEFO',
+            tipo='ABONO'
+        )
+        self.producto = Producto.objects.create(
+            codigo='FEFO001',
+            nombre='Abono FEFO',
+            categoria=categoria,
+            stock_actual=0,
+            stock_minimo=1,
+            unidad_medida='KG',
+            precio_compra=10,
+            precio_venta=15
+        )
+        hoy = date.today()
+        self.lote_tardio = LoteProducto.objects.create(
+            producto=self.producto, lote='TARDIO', cantidad=10,
+            fecha_vencimiento=hoy + timedelta(days=60)
+        )
+        self.lote_sin_vencimiento = LoteProducto.objects.create(
+            producto=self.producto, lote='SIN-FECHA', cantidad=10
+        )
+        self.lote_temprano = LoteProducto.objects.create(
+            producto=self.producto, lote='TEMPRANO', cantidad=5,
+            fecha_vencimiento=hoy + timedelta(days=5)
+        )
+    
+    def test_salida_consume_primero_lo_que_vence_antes(self):
+        """Test para salida FEFO con desglose por lote"""
+        response = self.client.post('/api/movimientos/movimientos/', {
+            'producto': self.producto.id,
+            'tipo': 'salida',
+            'cantidad': 12,
+        })
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [(a['lote'], a['cantidad']) for a in response.data['asignacion_lotes']],
+            [('TEMPRANO', '5.000'), ('TARDIO', '7.000')]
+        )
+        
+        self.lote_temprano.refresh_from_db()
+        self.lote_tardio.refresh_from_db()
+        self.lote_sin_vencimiento.refresh_from_db()
+        self.assertEqual(self.lote_temprano.cantidad, 0)
+        self.assertEqual(self.lote_tardio.cantidad, 3)
+        self.assertEqual(self.lote_sin_vencimiento.cantidad, 10)
+        
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 13)
+    
+    def test_salida_insuficiente_no_consume_lotes(self):
+        """Test para salida sin stock suficiente"""
+        response = self.client.post('/api/movimientos/movimientos/', {
+            'producto': self.producto.id,
+            'tipo': 'salida',
+            'cantidad': 26,
+        })
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Movimiento.objects.exists())
+        self.assertEqual(
+            sorted(LoteProducto.objects.values_list('cantidad', flat=True)),
+            [5, 10, 10]
+        )
+    
+    def test_stock_insuficiente_al_bloquear_revierte_lotes(self):
+        """Test para salida que pasa la validación pero falla dentro de la transacción"""
+        transaccion_original = views.transaccion_escritura
+
+        def transaccion_tras_salida_concurrente(*args, **kwargs):
+            # Otra salida deja el stock en 5 entre la validación y el bloqueo
+            Producto.objects.filter(pk=self.producto.pk).update(stock_actual=5)
+            return transaccion_original(*args, **kwargs)
+
+        with mock.patch.object(views, 'transaccion_escritura', transaccion_tras_salida_concurrente):
+            response = self.client.post('/api/movimientos/movimientos/', {
+                'producto': self.producto.id,
+                'tipo': 'salida',
+                'cantidad': 12,
+            })
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Stock insuficiente', response.data['error'])
+        self.assertFalse(Movimiento.objects.exists())
+        # consumir_fefo ya había descontado 12 de los lotes: el rollback los restaura
+        self.lote_temprano.refresh_from_db()
+        self.lote_tardio.refresh_from_db()
+        self.assertEqual(self.lote_temprano.cantidad, 5)
+        self.assertEqual(self.lote_tardio.cantidad, 10)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 5)
+
+
+
+class ValoracionTests(APITestCase):
+    """Costo promedio y FIFO mantenidos con cada movimiento"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='valoracion', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.categoria = CategoriaProducto.objects.create(nombre='Abonos valoración', tipo='ABONO')
+        self.producto = self._producto('VAL001', stock=0)
+
+    def _producto(self, codigo, stock):
+        return Producto.objects.create(
+            codigo=codigo,
+            nombre=f'Producto {codigo}',
+            categoria=self.categoria,
+            stock_actual=stock,
+            stock_minimo=1,
+            unidad_medida='KG',
+            precio_compra=10,
+            precio_venta=15,
+        )
+
+    def _mover(self, tipo, cantidad, producto=None, **extra):
+        response = self.client.post('/api/movimientos/movimientos/', {
+            'producto': (producto or self.producto).id, 'tipo': tipo, 'cantidad': cantidad, **extra,
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        return response
+
+    def test_promedio_y_fifo(self):
+        self._mover('entrada', 10)
+        self._mover('entrada', 10, costo_unitario='20')
+        self._mover('salida', 15)
+
+        costo = CostoProducto.objects.get(producto=self.producto)
+        self.assertEqual(costo.cantidad, 5)
+        self.assertEqual(costo.costo_promedio, Decimal('15'))
+        self.assertEqual(costo.valor_promedio, Decimal('75'))
+        # FIFO consume las 10 unidades a 10 y 5 de las de 20
+        self.assertEqual(costo.valor_fifo, Decimal('100'))
+        self.assertEqual(
+            list(CapaCosto.objects.values_list('cantidad_restante', 'costo_unitario')),
+            [(Decimal('5'), Decimal('20'))],
+        )
+
+        self._mover('salida', 5)
+        costo.refresh_from_db()
+        self.assertEqual((costo.cantidad, costo.valor_promedio, costo.valor_fifo), (0, 0, 0))
+        self.assertFalse(CapaCosto.objects.exists())
+
+    def test_stock_previo_entra_como_saldo_inicial(self):
+        producto = self._producto('VAL002', stock=8)
+        self._mover('entrada', 2, producto=producto, costo_unitario='15')
+
+        costo = CostoProducto.objects.get(producto=producto)
+        self.assertEqual(costo.cantidad, 10)
+        self.assertEqual(costo.valor_promedio, Decimal('110'))
+        self.assertEqual(costo.costo_promedio, Decimal('11'))
+        self.assertEqual(CapaCosto.objects.filter(producto=producto).count(), 2)
+
+    def test_salida_solo_lee_las_capas_que_consume(self):
+        for _ in range(6):
+            self._mover('entrada', 1)
+        self.producto.refresh_from_db()
+        movimiento = Movimiento(producto=self.producto, tipo='salida', cantidad=3)
+        with CaptureQueriesContext(connection) as consultas:
+            ValoracionService().registrar_movimiento(movimiento, self.producto.stock_actual, tamano_bloque=2)
+        lecturas = [
+            q['sql'] for q in consultas.captured_queries
+            if q['sql'].startswith('SELECT') and 'movimientos_capacosto' in q['sql']
+        ]
+        self.assertEqual(len(lecturas), 2)
+        self.assertEqual(CapaCosto.objects.count(), 3)
+
+    def test_lotes_y_movimientos_mantienen_la_valoracion(self):
+        producto = self._producto('VAL004', stock=10)
+        self._mover('entrada', 5, producto=producto, costo_unitario='20')
+        lote = LoteProducto.objects.create(
+            producto=producto, lote='VAL-L1', cantidad=100,
+            fecha_vencimiento=date.today() + timedelta(days=90),
+        )
+
+        costo = CostoProducto.objects.get(producto=producto)
+        # El lote entra como capa al precio de compra
+        self.assertEqual(costo.cantidad, 115)
+        self.assertEqual(costo.valor_fifo, Decimal('1200'))
+
+        self._mover('salida', 50, producto=producto)
+        producto.refresh_from_db()
+        costo.refresh_from_db()
+        self.assertEqual(costo.cantidad, producto.stock_actual)
+        self.assertEqual(costo.cantidad, 65)
+        # FIFO consume las 10 iniciales, las 5 a 20 y 35 del lote
+        self.assertEqual(costo.valor_fifo, Decimal('650'))
+        self.assertEqual(
+            sum(c.cantidad_restante for c in CapaCosto.objects.filter(producto=producto)), 65
+        )
+
+        # La salida dejó 50 en el lote; al borrarlo el stock baja a 15
+        LoteProducto.objects.get(pk=lote.pk).delete()
+        costo.refresh_from_db()
+        producto.refresh_from_db()
+        self.assertEqual((costo.cantidad, producto.stock_actual), (15, 15))
+
+        # Un cambio de stock sin señales se concilia con el siguiente movimiento
+        Producto.objects.filter(pk=producto.pk).update(stock_actual=F('stock_actual') + 4)
+        self._mover('entrada', 1, producto=producto)
+        producto.refresh_from_db()
+        costo.refresh_from_db()
+        self.assertEqual(costo.cantidad, producto.stock_actual)
+
+        response = self.client.get('/api/movimientos/valoracion/?metodo=fifo')
+        fila = next(f for f in response.data['results'] if f['codigo'] == 'VAL004')
+        self.assertEqual(Decimal(fila['cantidad_valorada']), producto.stock_actual)
+        self.assertEqual(Decimal(fila['valor']), costo.valor_fifo)
+
+    def test_guardar_sin_cambiar_stock_no_concilia(self):
+        self._mover('entrada', 5)
+        producto = Producto.objects.get(pk=self.producto.pk)
+        producto.nombre = 'Producto renombrado'
+        with CaptureQueriesContext(connection) as consultas:
+            producto.save()
+        self.assertFalse(any('movimientos_costoproducto' in q['sql'] for q in consultas.captured_queries))
+
+        producto.stock_actual += 2
+        producto.save()
+        self.assertEqual(CostoProducto.objects.get(producto=producto).cantidad, 7)
+
+    def test_salida_no_admite_costo_unitario(self):
+        self._mover('entrada', 5)
+        response = self.client.post('/api/movimientos/movimientos/', {
+            'producto': self.producto.id, 'tipo': 'salida', 'cantidad': 1, 'costo_unitario': '3',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_informe_de_valoracion(self):
+        self._mover('entrada', 10)
+        self._mover('entrada', 10, costo_unitario='20')
+        self._mover('salida', 15)
+        self._producto('VAL003', stock=4)
+
+        response = self.client.get('/api/movimientos/valoracion/?metodo=fifo')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        filas = {fila['codigo']: fila for fila in response.data['results']}
+        self.assertEqual(filas['VAL001']['valor'], '100.00')
+        self.assertEqual(filas['VAL001']['costo_unitario'], '20.0000')
+        self.assertEqual(filas['VAL001']['valor_precio_compra'], '50.00')
+        # Sin movimientos: stock por precio de compra
+        self.assertEqual(filas['VAL003']['valor'], '40.00')
+
+        response = self.client.get('/api/movimientos/valoracion/')
+        filas = {fila['codigo']: fila for fila in response.data['results']}
+        self.assertEqual(filas['VAL001']['valor'], '75.00')
+        self.assertEqual(filas['VAL001']['costo_unitario'], '15.0000')
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/movimientos/valoracion/resumen/')
+        self.assertEqual(response.data, {
+            'productos': 2, 'valor_promedio': '115.00', 'valor_fifo': '140.00', 'valor_precio_compra': '90.00',
+        })
+
+        response = self.client.get('/api/movimientos/valoracion/?metodo=lifo')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+@override_settings(PRONOSTICO_DIAS_HISTORIA=60, PRONOSTICO_VENTANA=7, PRONOSTICO_ALFA=0.5)
+class PronosticoTests(TestCase):
+    """Consumo diario y cobertura calculados en bloque a partir de las salidas"""
+
+    def setUp(self):
+        categoria = CategoriaProducto.objects.create(nombre='Abonos pronóstico', tipo='ABONO')
+        self.hoy = date(2025, 6, 30)
+        self.producto, self.quieto = (
+            Producto.objects.create(
+                codigo=codigo, nombre=f'Producto {codigo}', categoria=categoria,
+                stock_actual=stock, stock_minimo=1, unidad_medida='KG',
+                precio_compra=10, precio_venta=15,
+            )
+            for codigo, stock in (('PRO001', 100), ('PRO002', 50))
+        )
+
+    def _mover(self, producto, tipo, cantidad, dias_atras):
+        movimiento = Movimiento.objects.create(producto=producto, tipo=tipo, cantidad=cantidad)
+        fecha = datetime.combine(self.hoy - timedelta(days=dias_atras), time(12))
+        Movimiento.objects.filter(pk=movimiento.pk).update(fecha=timezone.make_aware(fecha))
+
+    def test_actualizar_guarda_consumo_cobertura_y_ultimo_movimiento(self):
+        self._mover(self.producto, 'salida', 10, 0)
+        self._mover(self.producto, 'salida', 2, 0)
+        self._mover(self.producto, 'entrada', 100, 1)
+        self._mover(self.producto, 'salida', 4, 2)
+        self._mover(self.producto, 'salida', 6, 10)
+        # Fuera de la historia: no cuenta
+        self._mover(self.producto, 'salida', 500, 90)
+        PronosticoConsumo.objects.create(
+            producto=self.quieto, ultimo_movimiento=date(2024, 1, 1), fecha_calculo=timezone.now()
+        )
+
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = PronosticoService().actualizar(hoy=self.hoy)
+        self.assertEqual(
+            len([q for q in consultas.captured_queries if 'movimientos_movimiento' in q['sql']]), 1
+        )
+        self.assertEqual(resultado['productos'], 2)
+
+        # Suavizado exponencial día a día sobre los 60 días de historia
+        salidas = {59: 12, 57: 4, 49: 6}
+        suavizado = 0.0
+        for dia in range(60):
+            suavizado = 0.5 * salidas.get(dia, 0) + 0.5 * suavizado
+
+        calculado = PronosticoConsumo.objects.get(producto=self.producto)
+        self.assertEqual(calculado.consumo_promedio, Decimal('2.286'))
+        self.assertEqual(calculado.consumo_suavizado, Decimal(f'{suavizado:.3f}'))
+        self.assertEqual(calculado.dias_cobertura, Decimal(f'{100 / suavizado:.1f}'))
+        self.assertEqual(calculado.ultimo_movimiento, self.hoy)
+
+        # Sin movimientos en la historia conserva el último conocido
+        quieto = PronosticoConsumo.objects.get(producto=self.quieto)
+        self.assertEqual(quieto.consumo_suavizado, 0)
+        self.assertIsNone(quieto.dias_cobertura)
+        self.assertEqual(quieto.ultimo_movimiento, date(2024, 1, 1))
+
+        # Recalcular actualiza las filas existentes
+        self._mover(self.quieto, 'entrada', 5, 3)
+        PronosticoService().actualizar(hoy=self.hoy)
+        self.assertEqual(PronosticoConsumo.objects.count(), 2)
+        self.assertEqual(
+            PronosticoConsumo.objects.get(producto=self.quieto).ultimo_movimiento,
+            self.hoy - timedelta(days=3),
+        )
+
+    def test_numpy_y_python_coinciden(self):
+        inicio = date(2025, 1, 1)
+        filas = (
+            [1, 1, 2, 2, 9],
+            [inicio, inicio + timedelta(days=50), inicio + timedelta(days=58), inicio + timedelta(days=59), inicio],
+            [3, 5, 0, 7, 100],
+        )
+        argumentos = ([1, 2, 3], [10, 0, 4], *filas, inicio, 60, 7, 0.3)
+        self.assertEqual(
+            pronostico._calcular_numpy(*argumentos), pronostico._calcular_python(*argumentos)
+        )
+
+
+@override_settings(REPOSICION_DIAS_ENTREGA=7)
+class ReposicionTests(APITestCase):
+    """Pedido sugerido por proveedor con el consumo previsto durante la entrega"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='compras', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        Proveedor.objects.create(nombre='Agro Sur', dias_entrega=10)
+        categoria = CategoriaProducto.objects.create(nombre='Abonos reposición', tipo='ABONO')
+
+        def producto(codigo, proveedor, stock, minimo, maximo, consumo=None, activo=True):
+            nuevo = Producto.objects.create(
+                codigo=codigo, nombre=f'Producto {codigo}', categoria=categoria,
+                stock_actual=stock, stock_minimo=minimo, stock_maximo=maximo,
+                unidad_medida='KG', precio_compra=10, precio_venta=15,
+                proveedor_principal=proveedor, activo=activo,
+            )
+            if consumo is not None:
+                PronosticoConsumo.objects.create(
+                    producto=nuevo, consumo_promedio=consumo, consumo_suavizado=consumo,
+                    fecha_calculo=timezone.now(),
+                )
+            return nuevo
+
+        # Al recibir el pedido quedarán 20 - 1.5 * 10 = 5, por debajo del mínimo
+        self.pronto = producto('REP001', 'agro sur', 20, 10, 100, consumo=Decimal('1.5'))
+        # Quedarán 15 - 0.2 * 10 = 13: no hace falta pedir
+        producto('REP002', 'Agro Sur', 15, 10, 50, consumo=Decimal('0.2'))
+        # Sin proveedor ni pronóstico ni máximo: se repone hasta el mínimo
+        self.sin_proveedor = producto('REP003', '', 4, 10, 0)
+        producto('REP004', 'Agro Sur', 0, 10, 100, activo=False)
+
+    def test_sugerencias_agrupadas_por_proveedor(self):
+        with CaptureQueriesContext(connection) as consultas:
+            filas = list(ReposicionService().sugerencias())
+        self.assertEqual(len(consultas.captured_queries), 1)
+        self.assertEqual([fila['id'] for fila in filas], [self.sin_proveedor.pk, self.pronto.pk])
+
+        response = self.client.get('/api/movimientos/reposicion/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['productos'], 2)
+        self.assertEqual(response.data['importe_total'], '1010.00')
+        sin_proveedor, agro_sur = response.data['proveedores']
+        self.assertEqual(sin_proveedor['proveedor'], '')
+        self.assertEqual(sin_proveedor['lineas'][0]['dias_entrega'], 7)
+        self.assertEqual(sin_proveedor['lineas'][0]['cantidad_sugerida'], '6.000')
+        self.assertEqual(agro_sur['proveedor'], 'agro sur')
+        self.assertEqual(agro_sur['importe_total'], '950.00')
+        linea = agro_sur['lineas'][0]
+        self.assertEqual(linea['dias_entrega'], 10)
+        self.assertEqual(linea['consumo_entrega'], '15.000')
+        self.assertEqual(linea['cantidad_sugerida'], '95.000')
+
+        response = self.client.get('/api/movimientos/reposicion/', {'proveedor': 'AGRO SUR'})
+        self.assertEqual([p['proveedor'] for p in response.data['proveedores']], ['agro sur'])
+
+    def test_csv(self):
+        response = self.client.get('/api/movimientos/reposicion/', {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment', response['Content-Disposition'])
+        lineas = response.content.decode().splitlines()
+        self.assertEqual(len(lineas), 3)
+        self.assertTrue(lineas[2].startswith('agro sur,REP001,'))
+        self.assertIn('95.000', lineas[2])
+
+    def test_cache_hasta_el_proximo_cambio_de_stock(self):
+        self.client.get('/api/movimientos/reposicion/')
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get('/api/movimientos/reposicion/')
+        self.assertEqual(len(consultas.captured_queries), 0)
+        self.assertEqual(response.data['productos'], 2)
+
+        self.pronto.stock_actual = 100
+        self.pronto.save(update_fields=['stock_actual'])
+        response = self.client.get('/api/movimientos/reposicion/')
+        self.assertEqual(response.data['productos'], 1)
+
+        # update() no envía señales: la respuesta sigue cacheada hasta que
+        # recalcular el pronóstico invalida las sugerencias
+        Producto.objects.filter(pk=self.pronto.pk).update(stock_actual=5)
+        self.assertEqual(self.client.get('/api/movimientos/reposicion/').data['productos'], 1)
+        PronosticoService().actualizar()
+        response = self.client.get('/api/movimientos/reposicion/')
+        self.assertEqual(response.data['productos'], 2)
+        self.assertEqual(
+            response.data['proveedores'][1]['lineas'][0]['cantidad_sugerida'], '95.000'
+        )
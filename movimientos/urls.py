@@ -1,7 +1,9 @@
 from rest_framework.routers import DefaultRouter
-from .views import MovimientoViewSet
+from .views import MovimientoViewSet, ReposicionViewSet, ValoracionViewSet
 
 router = DefaultRouter()
 router.register(r'movimientos', MovimientoViewSet, basename='movimiento')
+router.register(r'valoracion', ValoracionViewSet, basename='valoracion')
+router.register(r'reposicion', ReposicionViewSet, basename='reposicion')
 
 urlpatterns = router.urls
@@ -1,11 +1,24 @@
 from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import OperationalError
+from decimal import Decimal
 
 from .models import Movimiento
-from .serializers import MovimientoSerializer
+from .renderers import PedidoCSVRenderer
+from .serializers import InformePedidoSerializer, MovimientoSerializer, ValoracionProductoSerializer
+from .services import METODOS_VALORACION, ReposicionService, ValoracionService
 from Productos.models import Producto
+from Productos.services import LoteService
+from comun.cache import cachear_respuesta
+from comun.metricas import conflictos_stock, movimientos_aplicados
+from comun.replicas import lectura_replica
+from comun.transacciones import transaccion_escritura
 
 
 class MovimientoViewSet(viewsets.ModelViewSet):
@@ -17,20 +30,47 @@ class MovimientoViewSet(viewsets.ModelViewSet):
     ordering_fields = ['fecha', 'cantidad']
     
     def perform_create(self, serializer):
-        """Guarda el movimiento y actualiza el stock del producto"""
-        movimiento = serializer.save()
+        """Guarda el movimiento y actualiza el stock del producto.
         
-        # Actualizar stock del producto
-        producto = movimiento.producto
-        if movimiento.tipo == 'entrada':
-            producto.stock_actual += movimiento.cantidad
-        elif movimiento.tipo == 'salida':
-            if producto.stock_actual >= movimiento.cantidad:
-                producto.stock_actual -= movimiento.cantidad
-            else:
-                raise ValueError(f"Stock insuficiente. Disponible: {producto.stock_actual}")
+        Las salidas consumen primero los lotes que vencen antes (FEFO) y el
+        estado de valoración del producto se actualiza con el movimiento. Todo
+        ocurre en una sola transacción: los lotes se bloquean en orden de
+        vencimiento y después el producto, el mismo orden que usan los
+        ajustes de stock por lote. En SQLite la transacción empieza con
+        ``BEGIN IMMEDIATE`` para que los movimientos concurrentes esperen en
+        lugar de fallar con "database is locked".
+        """
+        tipo = serializer.validated_data['tipo']
+        cantidad = serializer.validated_data['cantidad']
+        producto_id = serializer.validated_data['producto'].pk
         
-        producto.save()
+        with transaccion_escritura():
+            asignacion = []
+            if tipo == 'salida':
+                asignacion, _ = LoteService().consumir_fefo(producto_id, cantidad)
+            
+            # Actualizar stock del producto
+            producto = Producto.objects.select_for_update().get(pk=producto_id)
+            stock_anterior = producto.stock_actual
+            if tipo == 'entrada':
+                producto.stock_actual += cantidad
+            elif tipo == 'salida':
+                if producto.stock_actual >= cantidad:
+                    producto.stock_actual -= cantidad
+                else:
+                    raise ValueError(f"Stock insuficiente. Disponible: {producto.stock_actual}")
+            
+            extra = {}
+            if tipo == 'entrada' and serializer.validated_data.get('costo_unitario') is None:
+                extra['costo_unitario'] = producto.precio_compra
+            movimiento = serializer.save(producto=producto, **extra)
+            # Antes de guardar el producto, para que la conciliación de la
+            # valoración al guardarlo ya encuentre el movimiento aplicado
+            ValoracionService().registrar_movimiento(movimiento, stock_anterior)
+            producto.save(update_fields=['stock_actual', 'estado', 'fecha_actualizacion'])
+        
+        movimientos_aplicados.inc(tipo=tipo)
+        movimiento.asignacion_lotes = asignacion
         return movimiento
     
     def create(self, request, *args, **kwargs):
@@ -43,7 +83,85 @@ class MovimientoViewSet(viewsets.ModelViewSet):
             headers = self.get_success_headers(serializer.data)
             return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
         except ValueError as e:
+            conflictos_stock.inc(motivo='stock_insuficiente')
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
+            if isinstance(e, OperationalError):
+                # Bloqueo de filas agotado o interbloqueo al actualizar stock
+                conflictos_stock.inc(motivo='bloqueo')
             return Response({'error': f'Error al crear movimiento: {str(e)}'}, 
                           status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+class ValoracionViewSet(viewsets.GenericViewSet):
+    """Informe de valoración del inventario (``?metodo=promedio|fifo``).
+
+    Lee el estado de costo que mantienen los movimientos; no recorre el
+    historial.
+    """
+    serializer_class = ValoracionProductoSerializer
+    permission_classes = [IsAuthenticated]
+    class StandardResultsSetPagination(PageNumberPagination):
+        page_size = 10
+
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['categoria']
+
+    def get_queryset(self):
+        queryset = Producto.objects.filter(activo=True)
+        if self.action == 'list':
+            queryset = ValoracionService().anotar_valoracion(queryset, self._metodo()).values(
+                'id', 'codigo', 'nombre', 'categoria__nombre', 'stock_actual',
+                'cantidad_valorada', 'costo_unitario', 'valor', 'valor_precio_compra',
+            )
+        return queryset.order_by('nombre', 'id')
+
+    def _metodo(self):
+        metodo = self.request.query_params.get('metodo', 'promedio')
+        if metodo not in METODOS_VALORACION:
+            raise ValidationError({'metodo': f"Valores válidos: {', '.join(METODOS_VALORACION)}"})
+        return metodo
+
+    @lectura_replica
+    def list(self, request):
+        productos = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(productos)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(productos, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    @lectura_replica
+    def resumen(self, request):
+        """Valor total del inventario por promedio, FIFO y precio de compra"""
+        totales = ValoracionService().resumen(self.filter_queryset(self.get_queryset()))
+        return Response({
+            'productos': totales['productos'],
+            **{
+                clave: str(totales[clave].quantize(Decimal('0.01')))
+                for clave in ('valor_promedio', 'valor_fifo', 'valor_precio_compra')
+            },
+        })
+
+
+class ReposicionViewSet(viewsets.GenericViewSet):
+    """Pedido sugerido por proveedor (``?proveedor=``, ``?format=csv``).
+
+    La respuesta se cachea hasta el próximo cambio de stock, de pronóstico o
+    de proveedores.
+    """
+    serializer_class = InformePedidoSerializer
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, PedidoCSVRenderer]
+
+    @cachear_respuesta(['productos', 'pronostico', 'proveedores'])
+    @lectura_replica
+    def list(self, request):
+        proveedor = request.query_params.get('proveedor') or None
+        informe = ReposicionService().informe(proveedor)
+        return Response(self.get_serializer(informe).data)
@@ -4,6 +4,6 @@ from .models import Proveedor
 
 @admin.register(Proveedor)
 class ProveedorAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'contacto', 'telefono', 'email', 'activo')
+    list_display = ('nombre', 'contacto', 'telefono', 'email', 'dias_entrega', 'activo')
     search_fields = ('nombre', 'contacto', 'telefono', 'email')
     list_filter = ('activo',)
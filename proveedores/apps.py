@@ -7,5 +7,7 @@ class ProveedoresConfig(AppConfig):
     verbose_name = 'Proveedores'
 
     def ready(self):
-        # place for signals if needed later
-        pass
+        from comun.signals import conectar_invalidacion
+        from .models import Proveedor
+
+        conectar_invalidacion(Proveedor, lambda instance, **kwargs: ['proveedores'])
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 20:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proveedores', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proveedor',
+            name='dias_entrega',
+            field=models.PositiveIntegerField(blank=True, help_text='Días desde el pedido hasta la recepción (vacío: REPOSICION_DIAS_ENTREGA)', null=True),
+        ),
+    ]
@@ -8,6 +8,10 @@ class Proveedor(models.Model):
     email = models.EmailField(blank=True)
     direccion = models.TextField(blank=True)
     activo = models.BooleanField(default=True)
+    dias_entrega = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Días desde el pedido hasta la recepción (vacío: REPOSICION_DIAS_ENTREGA)"
+    )
     fecha_creacion = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -8,7 +8,7 @@ class ProveedorSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Proveedor
-        fields = ['id', 'nombre', 'contacto', 'telefono', 'email', 'direccion', 'total_productos']
+        fields = ['id', 'nombre', 'contacto', 'telefono', 'email', 'direccion', 'dias_entrega', 'total_productos']
         read_only_fields = []
     
     def get_total_productos(self, obj):